@@ -0,0 +1,112 @@
+"""
+Cache de la representación serializada del detalle de artículos.
+
+Cada artículo tiene una única entrada en cache (por slug y generación) con
+sus variantes (esquema + host, porque las URLs de imágenes son absolutas, y
+los campos pedidos con ?fields=, ?omit= y ?expand=). Las señales de
+`articles.models` cambian la generación del artículo cuando cambia él, sus
+tags, valoraciones, comentarios, su autor o su continente, por lo que no hace
+falta consultar la base de datos para validar la entrada en cada petición.
+
+La generación se lee antes de consultar la base de datos: si otra petición
+invalida el artículo mientras tanto, la entrada se guarda bajo la generación
+anterior y ya nadie la lee, en lugar de volver a cachear datos viejos.
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from blog_viaje.cache import namespaced_key
+from blog_viaje.metrics import record_cache
+from blog_viaje.sparse import sparse_cache_variant
+
+ARTICLE_DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Límite de variantes con ?fields=/?omit=/?expand= por artículo para que la
+# entrada no crezca sin control; al superarlo se descartan solo esas variantes
+MAX_SPARSE_VARIANTS = 8
+
+
+def article_generation_key(slug):
+    return namespaced_key('articles', 'detail-generation', slug)
+
+
+def _detail_key(slug, generation):
+    return namespaced_key('articles', 'detail', slug, generation)
+
+
+def article_detail_cache_key(slug):
+    """
+    Clave de la entrada vigente del artículo. Hay que obtenerla antes de leer
+    la base de datos y usar la misma para guardar la entrada.
+    """
+    generation_key = article_generation_key(slug)
+    generation = cache.get(generation_key)
+    if generation is None:
+        cache.add(generation_key, uuid.uuid4().hex, ARTICLE_DETAIL_CACHE_TIMEOUT)
+        generation = cache.get(generation_key)
+    return _detail_key(slug, generation)
+
+
+def get_detail_variant(request, serializer_class):
+    variant = f'{request.scheme}://{request.get_host()}'
+    sparse = sparse_cache_variant(request, serializer_class)
+    return f'{variant}?{sparse}' if sparse else variant
+
+
+def is_sparse_variant(variant):
+    return '?' in variant
+
+
+def get_cached_article_detail(key, variant):
+    variants = cache.get(key)
+    entry = variants.get(variant) if variants else None
+    record_cache(entry is not None)
+    return entry
+
+
+def cache_article_detail(key, variant, data):
+    """
+    Guarda la representación serializada junto con su ETag y fecha de
+    modificación y devuelve la entrada creada.
+    """
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    entry = {
+        'data': data,
+        'etag': '"%s"' % hashlib.md5(payload.encode('utf-8')).hexdigest(),
+        # Las valoraciones no modifican updated_at, así que se usa el momento en
+        # que se generó la entrada: siempre es posterior al último cambio
+        'last_modified': int(timezone.now().timestamp()),
+    }
+
+    variants = cache.get(key) or {}
+    if is_sparse_variant(variant) and sum(map(is_sparse_variant, variants)) >= MAX_SPARSE_VARIANTS:
+        # Las variantes completas (una por host) se conservan
+        variants = {name: value for name, value in variants.items() if not is_sparse_variant(name)}
+    variants[variant] = entry
+    cache.set(key, variants, ARTICLE_DETAIL_CACHE_TIMEOUT)
+    return entry
+
+
+def _new_generations(slugs):
+    keys = {article_generation_key(slug): slug for slug in slugs}
+    previous = cache.get_many(list(keys))
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, ARTICLE_DETAIL_CACHE_TIMEOUT)
+    # Las entradas de la generación anterior ya no se leen; se borran para no
+    # ocupar memoria hasta que caduquen
+    cache.delete_many([_detail_key(keys[key], generation) for key, generation in previous.items()])
+
+
+def invalidate_article_detail(*slugs):
+    """
+    Cambia la generación del detalle de los artículos indicados una vez
+    confirmada la transacción en curso.
+    """
+    slugs = {slug for slug in slugs if slug}
+    if slugs:
+        transaction.on_commit(lambda: _new_generations(slugs))
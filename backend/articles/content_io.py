@@ -0,0 +1,301 @@
+"""
+Exportación e importación de contenido (artículos y destinos) en NDJSON.
+
+Cada línea es un objeto JSON con un campo "type" ('article' o 'destination').
+Las relaciones se guardan con claves naturales (email del autor, slug de tags
+y continente) para poder mover el contenido entre entornos con ids distintos:
+
+    {"type": "article", "slug": "...", "title": "...", "content": "<p>...</p>",
+     "author": "autor@example.com", "tags": [{"slug": "playas", "name": "Playas"}],
+     "continent": {"slug": "europa", "name": "Europa"}, "is_destination": false,
+     "image": "articles/foto.jpg", "created_at": "...", "updated_at": "..."}
+
+La exportación recorre las tablas con iterator() por bloques y la importación
+procesa las líneas en lotes con upserts por slug, así que la memoria usada no
+depende del tamaño del fichero. Los ficheros de imagen no se copian: solo se
+conserva su ruta en el almacenamiento.
+"""
+import gzip
+import json
+import sys
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from destinations.cache import invalidate_destinations_by_continent
+from destinations.models import Continent, Destination
+from users.models import User
+from .cache import invalidate_article_detail
+from .models import SUMMARY_FIELDS, Article, Tag
+from .sanitize import sanitize_content
+
+ARTICLE = 'article'
+DESTINATION = 'destination'
+CONTENT_TYPES = (ARTICLE, DESTINATION)
+
+ARTICLE_FIELDS = [
+    'title', 'content', 'content_hash', 'image', 'author', 'is_destination', 'continent', 'search_document',
+    *SUMMARY_FIELDS,
+]
+DESTINATION_FIELDS = ['name', 'description', 'country', 'city', 'continent', 'image']
+
+
+def open_stream(path, mode):
+    """
+    Abre un fichero (comprimido con gzip si termina en .gz) o stdin/stdout con '-'
+    """
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _continent(continent):
+    if continent is None:
+        return None
+    return {'slug': continent.slug, 'name': continent.name}
+
+
+def article_records(chunk_size=1000):
+    queryset = Article.objects.select_related('author', 'continent').prefetch_related('tags').order_by('pk')
+    for article in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'type': ARTICLE,
+            'slug': article.slug,
+            'title': article.title,
+            'content': article.content,
+            'author': article.author.email,
+            'tags': [{'slug': tag.slug, 'name': tag.name} for tag in article.tags.all()],
+            'continent': _continent(article.continent),
+            'is_destination': article.is_destination,
+            'image': article.image.name or None,
+            'created_at': article.created_at,
+            'updated_at': article.updated_at,
+        }
+
+
+def destination_records(chunk_size=1000):
+    queryset = Destination.objects.select_related('continent').order_by('pk')
+    for destination in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'type': DESTINATION,
+            'slug': destination.slug,
+            'name': destination.name,
+            'description': destination.description,
+            'country': destination.country,
+            'city': destination.city,
+            'continent': _continent(destination.continent),
+            'image': destination.image.name or None,
+            'created_at': destination.created_at,
+            'updated_at': destination.updated_at,
+        }
+
+
+def export_content(stream, types=CONTENT_TYPES, chunk_size=1000):
+    """
+    Escribe una línea JSON por registro y devuelve {tipo: número de registros}
+    """
+    sources = {ARTICLE: article_records, DESTINATION: destination_records}
+    counts = {}
+    for content_type in types:
+        counts[content_type] = 0
+        for record in sources[content_type](chunk_size):
+            stream.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False))
+            stream.write('\n')
+            counts[content_type] += 1
+    return counts
+
+
+class ContentImporter:
+    """
+    Importa registros por lotes. Los artículos y destinos se insertan o
+    actualizan por slug; los tags y continentes que no existen se crean y los
+    autores se buscan por email (`default_author` si no existe).
+    """
+
+    def __init__(self, batch_size=500, default_author=None):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.counts = {ARTICLE: 0, DESTINATION: 0, 'skipped': 0}
+        self.errors = []
+
+    def run(self, lines):
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                self._skip(line_number, f'JSON no válido: {error}')
+                continue
+            if record.get('type') not in CONTENT_TYPES or not record.get('slug'):
+                self._skip(line_number, 'falta "slug" o "type" no es article/destination')
+                continue
+            batch.append((line_number, record))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+        return self.counts
+
+    def _skip(self, line_number, reason):
+        self.counts['skipped'] += 1
+        self.errors.append((line_number, reason))
+
+    def _import_batch(self, batch):
+        # Un mismo slug repetido en el lote: gana la última línea (un upsert no
+        # puede modificar dos veces la misma fila en una sentencia)
+        latest = {(record['type'], record['slug']): (number, record) for number, record in batch}
+        self.counts['skipped'] += len(batch) - len(latest)
+        batch = list(latest.values())
+        articles = [(number, record) for number, record in batch if record['type'] == ARTICLE]
+        destinations = [(number, record) for number, record in batch if record['type'] == DESTINATION]
+        with transaction.atomic():
+            continents = self._continents(record.get('continent') for _, record in batch)
+            if articles:
+                self._import_articles(articles, continents)
+            if destinations:
+                self._import_destinations(destinations, continents)
+
+    def _continents(self, references):
+        wanted = {reference['slug']: reference for reference in references if reference}
+        if not wanted:
+            return {}
+        existing = dict(Continent.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+        missing = [
+            Continent(slug=slug, name=reference.get('name') or slug)
+            for slug, reference in wanted.items() if slug not in existing
+        ]
+        if missing:
+            Continent.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = dict(Continent.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+            invalidate_destinations_by_continent()
+        return existing
+
+    def _tags(self, records):
+        wanted = {tag['slug']: tag for record in records for tag in record.get('tags') or []}
+        if not wanted:
+            return {}
+        existing = {tag.slug: tag for tag in Tag.objects.filter(slug__in=wanted)}
+        missing = [
+            Tag(slug=slug, name=tag.get('name') or slug)
+            for slug, tag in wanted.items() if slug not in existing
+        ]
+        if missing:
+            Tag.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = {tag.slug: tag for tag in Tag.objects.filter(slug__in=wanted)}
+        return existing
+
+    def _import_articles(self, batch, continents):
+        records = [record for _, record in batch]
+        tags = self._tags(records)
+        authors = dict(
+            User.objects.filter(email__in={record.get('author') for record in records}).values_list('email', 'pk')
+        )
+        default_author_id = authors.get(self.default_author)
+        if self.default_author and default_author_id is None:
+            default_author_id = User.objects.filter(email=self.default_author).values_list('pk', flat=True).first()
+
+        articles = []
+        article_tags = {}
+        for line_number, record in batch:
+            author_id = authors.get(record.get('author'), default_author_id)
+            if author_id is None:
+                self._skip(line_number, f'no existe el autor {record.get("author")}')
+                continue
+            record_tags = [tags[tag['slug']] for tag in record.get('tags') or [] if tag['slug'] in tags]
+            continent = record.get('continent')
+            # bulk_create no pasa por save(): el contenido se sanitiza aquí
+            content, content_hash = sanitize_content(record.get('content', ''))
+            article = Article(
+                slug=record['slug'],
+                title=record.get('title', ''),
+                content=content,
+                content_hash=content_hash,
+                image=record.get('image') or None,
+                author_id=author_id,
+                is_destination=bool(record.get('is_destination')),
+                continent_id=continents.get(continent['slug']) if continent else None,
+            )
+            article.update_summary()
+            article.search_document = article.build_search_document_from(' '.join(tag.name for tag in record_tags))
+            article._timestamps = (record.get('created_at'), record.get('updated_at'))
+            articles.append(article)
+            article_tags[article.slug] = record_tags
+
+        if not articles:
+            return
+
+        Article.objects.bulk_create(
+            articles,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=ARTICLE_FIELDS,
+        )
+        ids = dict(Article.objects.filter(slug__in=article_tags).values_list('slug', 'pk'))
+        for article in articles:
+            article.pk = ids[article.slug]
+        self._restore_timestamps(Article, articles)
+
+        # Las etiquetas del fichero sustituyen a las que tuviera el artículo
+        Through = Article.tags.through
+        Through.objects.filter(article_id__in=ids.values()).delete()
+        Through.objects.bulk_create([
+            Through(article_id=ids[slug], tag_id=tag.pk)
+            for slug, record_tags in article_tags.items()
+            for tag in record_tags
+        ], ignore_conflicts=True)
+
+        invalidate_article_detail(*ids)
+        self.counts[ARTICLE] += len(articles)
+
+    def _import_destinations(self, batch, continents):
+        destinations = []
+        for _, record in batch:
+            continent = record.get('continent')
+            destination = Destination(
+                slug=record['slug'],
+                name=record.get('name', ''),
+                description=record.get('description', ''),
+                country=record.get('country', ''),
+                city=record.get('city', ''),
+                continent_id=continents.get(continent['slug']) if continent else None,
+                image=record.get('image') or None,
+            )
+            destination._timestamps = (record.get('created_at'), record.get('updated_at'))
+            destinations.append(destination)
+
+        Destination.objects.bulk_create(
+            destinations,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=DESTINATION_FIELDS,
+        )
+        ids = dict(
+            Destination.objects.filter(slug__in=[d.slug for d in destinations]).values_list('slug', 'pk')
+        )
+        for destination in destinations:
+            destination.pk = ids[destination.slug]
+        self._restore_timestamps(Destination, destinations)
+        invalidate_destinations_by_continent()
+        self.counts[DESTINATION] += len(destinations)
+
+    def _restore_timestamps(self, model, instances):
+        """
+        bulk_create aplica auto_now/auto_now_add; se recuperan las fechas del
+        fichero con un bulk_update (que no las modifica)
+        """
+        dated = []
+        for instance in instances:
+            created_at, updated_at = (parse_datetime(value) if value else None for value in instance._timestamps)
+            if created_at:
+                instance.created_at = created_at
+                instance.updated_at = updated_at or created_at
+                dated.append(instance)
+        if dated:
+            model.objects.bulk_update(dated, ['created_at', 'updated_at'])
@@ -0,0 +1,29 @@
+"""
+Índices que las migraciones referencian por su ruta: no cambiar de módulo.
+"""
+import copy
+
+from django.db import models
+from django.db.models.expressions import OrderBy
+
+# En estos motores NULL es menor que cualquier valor, así que en orden
+# descendente ya va al final; además no aceptan NULLS LAST en un índice
+NULLS_SORT_LOW_VENDORS = ('sqlite', 'mysql')
+
+
+class NullsLastIndex(models.Index):
+    """
+    Índice de expresiones con .desc(nulls_last=True) que en SQLite y MySQL
+    se crea sin el modificador NULLS LAST (el orden resultante es el mismo)
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor in NULLS_SORT_LOW_VENDORS:
+            index = copy.copy(self)
+            index.expressions = tuple(
+                OrderBy(expression.expression, descending=expression.descending)
+                if isinstance(expression, OrderBy) else expression
+                for expression in self.expressions
+            )
+            return super(NullsLastIndex, index).create_sql(model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
@@ -0,0 +1,383 @@
+"""
+Clasificaciones precalculadas de artículos populares y en tendencia.
+
+- popular: ordena como `order_by('-avg_rating', '-ratings_count')` con los
+  artículos sin valorar al final. La puntuación codifica ambos valores
+  (ver popularity_score), así que no hace falta consultar la base de datos para
+  recuperar la media.
+- trending: suma de las valoraciones con decaimiento exponencial según su
+  antigüedad (settings.TRENDING_HALF_LIFE_HOURS). Para no recalcular todas las
+  puntuaciones con el paso del tiempo, cada valoración aporta
+  score / 5 * 2 ** ((creada - epoch) / vida_media), que mantiene el orden
+  relativo; el epoch se fija al reconstruir la clasificación. Como los pesos
+  crecen exponencialmente, cuando pasan REBASE_HALF_LIVES vidas medias se
+  adelanta el epoch y se reescalan las puntuaciones guardadas.
+
+Ambas se actualizan de forma incremental al guardar o borrar valoraciones
+(`articles.models`). Leer los N primeros es O(log n + N) en Redis y
+O(n log N) en memoria. Si Redis falla, `top_articles` ordena en la base de
+datos por popularidad; si se ha expulsado alguna clasificación, la reconstruye.
+
+Backends (settings.ARTICLES_LEADERBOARD_BACKEND): 'redis' (sorted sets en el
+Redis de la cache, compartidos entre workers) o 'memory' (local al proceso).
+"""
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.db import transaction
+from django.db.models import F
+
+from blog_viaje.cache import namespaced_key
+
+try:
+    from redis import RedisError
+except ImportError:  # Sin redis instalado solo existe el backend en memoria
+    RedisError = ()
+
+logger = logging.getLogger(__name__)
+
+POPULAR = 'popular'
+TRENDING = 'trending'
+
+# La media (con 3 decimales) ocupa las cifras altas y el número de valoraciones las bajas
+POPULARITY_COUNT_RANGE = 10 ** 7
+
+# Vidas medias tras las que se adelanta el epoch de trending (pesos hasta 2 ** 16)
+REBASE_HALF_LIVES = 16
+
+
+def popularity_score(avg_rating, ratings_count):
+    if avg_rating is None or not ratings_count:
+        return 0
+    return round(avg_rating * 1000) * POPULARITY_COUNT_RANGE + min(ratings_count, POPULARITY_COUNT_RANGE - 1)
+
+
+def avg_rating_from_score(score):
+    if score < POPULARITY_COUNT_RANGE:
+        return None
+    return (score // POPULARITY_COUNT_RANGE) / 1000
+
+
+def half_life_seconds():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72) * 3600
+
+
+def trending_weight(score, rated_at, epoch):
+    return score / 5 * 2 ** ((rated_at - epoch) / half_life_seconds())
+
+
+def needs_rebase(epoch, now):
+    return now - epoch > REBASE_HALF_LIVES * half_life_seconds()
+
+
+def rebase_factor(epoch, new_epoch):
+    """
+    Factor por el que se multiplican las puntuaciones de trending al pasar de
+    `epoch` a `new_epoch`
+    """
+    return 2 ** ((epoch - new_epoch) / half_life_seconds())
+
+
+class MemoryLeaderboard:
+    """
+    Puntuaciones en diccionarios; al leer se eligen los N primeros con
+    heapq.nlargest, O(n log N), sin mantener la clasificación ordenada.
+    """
+
+    def __init__(self):
+        self._scores = {POPULAR: {}, TRENDING: {}}
+        self._epoch = None
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        return self._epoch is not None
+
+    def epoch(self):
+        return self._epoch
+
+    def rebuild(self, popular, trending, epoch):
+        with self._lock:
+            self._scores = {POPULAR: dict(popular), TRENDING: dict(trending)}
+            self._epoch = epoch
+
+    def set_score(self, board, article_id, score):
+        with self._lock:
+            self._scores[board][article_id] = score
+
+    def add_trending(self, article_id, score_delta, rated_at):
+        with self._lock:
+            scores = self._scores[TRENDING]
+            scores[article_id] = scores.get(article_id, 0) + trending_weight(score_delta, rated_at, self._epoch)
+
+    def rebase(self, now):
+        with self._lock:
+            if self._epoch is None or not needs_rebase(self._epoch, now):
+                return
+            factor = rebase_factor(self._epoch, now)
+            self._scores[TRENDING] = {
+                article_id: score * factor for article_id, score in self._scores[TRENDING].items()
+            }
+            self._epoch = now
+
+    def remove(self, article_id):
+        with self._lock:
+            for scores in self._scores.values():
+                scores.pop(article_id, None)
+
+    def top(self, board, count):
+        if count <= 0:
+            return []
+        with self._lock:
+            return heapq.nlargest(count, self._scores[board].items(), key=lambda item: (item[1], item[0]))
+
+
+class LeaderboardUnavailable(Exception):
+    pass
+
+
+class RedisLeaderboard:
+    """
+    Un sorted set por clasificación. Cada uno lleva el miembro SENTINEL
+    (puntuación -inf, siempre el último) para distinguir una clasificación
+    expulsada por Redis, o recreada a medias por una actualización posterior,
+    de una vacía.
+    """
+    ready_key = namespaced_key('articles', 'leaderboard', 'epoch')
+    SENTINEL = '_'
+
+    def __init__(self, connection):
+        self.redis = connection
+
+    def board_key(self, board):
+        return namespaced_key('articles', 'leaderboard', board)
+
+    def is_ready(self):
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.exists(self.ready_key)
+        for board in (POPULAR, TRENDING):
+            pipeline.zscore(self.board_key(board), self.SENTINEL)
+        ready, *sentinels = pipeline.execute()
+        return bool(ready) and None not in sentinels
+
+    def epoch(self):
+        value = self.redis.get(self.ready_key)
+        return float(value) if value is not None else None
+
+    def rebuild(self, popular, trending, epoch, batch_size=5000):
+        pipeline = self.redis.pipeline(transaction=True)
+        for board, scores in ((POPULAR, popular), (TRENDING, trending)):
+            key = self.board_key(board)
+            pipeline.delete(key)
+            pipeline.zadd(key, {self.SENTINEL: float('-inf')})
+            items = list(scores.items())
+            for start in range(0, len(items), batch_size):
+                pipeline.zadd(key, dict(items[start:start + batch_size]))
+        pipeline.set(self.ready_key, epoch)
+        pipeline.execute()
+
+    def set_score(self, board, article_id, score):
+        self.redis.zadd(self.board_key(board), {article_id: score})
+
+    def add_trending(self, article_id, score_delta, rated_at):
+        """
+        Suma el peso de la valoración con el epoch vigente. WATCH sobre el epoch
+        repite la operación si otro worker lo adelanta o reconstruye entre medias.
+        """
+        key = self.board_key(TRENDING)
+
+        def apply(pipeline):
+            epoch = pipeline.get(self.ready_key)
+            if epoch is None:
+                return
+            weight = trending_weight(score_delta, rated_at, float(epoch))
+            pipeline.multi()
+            pipeline.zincrby(key, weight, article_id)
+
+        self.redis.transaction(apply, self.ready_key)
+
+    def rebase(self, now):
+        key = self.board_key(TRENDING)
+
+        def apply(pipeline):
+            epoch = pipeline.get(self.ready_key)
+            # Otro worker puede haberlo adelantado ya
+            if epoch is None or not needs_rebase(float(epoch), now):
+                return
+            pipeline.multi()
+            pipeline.zunionstore(key, {key: rebase_factor(float(epoch), now)})
+            pipeline.set(self.ready_key, now)
+
+        self.redis.transaction(apply, self.ready_key)
+
+    def remove(self, article_id):
+        pipeline = self.redis.pipeline(transaction=False)
+        for board in (POPULAR, TRENDING):
+            pipeline.zrem(self.board_key(board), article_id)
+        pipeline.execute()
+
+    def top(self, board, count):
+        if count <= 0:
+            return []
+        key = self.board_key(board)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zscore(key, self.SENTINEL)
+        # Uno más por si entra SENTINEL
+        pipeline.zrevrange(key, 0, count, withscores=True)
+        sentinel, members = pipeline.execute()
+        if sentinel is None:
+            # Clasificación expulsada: la siguiente lectura la reconstruye
+            self.redis.delete(self.ready_key)
+            raise LeaderboardUnavailable(f'Falta la clasificación {board} en Redis')
+        return [
+            (int(member), score) for member, score in members if member != self.SENTINEL.encode()
+        ][:count]
+
+
+def load_scores():
+    """
+    Calcula las dos clasificaciones desde la base de datos.
+    Devuelve (popular, trending, epoch).
+    """
+    from .models import Article, Rating
+
+    epoch = time.time()
+    popular = {
+        article_id: popularity_score(avg_rating, ratings_count)
+        for article_id, avg_rating, ratings_count in Article.objects.order_by().values_list(
+            'id', 'avg_rating', 'ratings_count'
+        ).iterator(chunk_size=5000)
+    }
+
+    trending = {}
+    for article_id, score, created_at in Rating.objects.order_by().values_list(
+        'article_id', 'score', 'created_at'
+    ).iterator(chunk_size=5000):
+        weight = trending_weight(score, created_at.timestamp(), epoch)
+        trending[article_id] = trending.get(article_id, 0) + weight
+
+    return popular, trending, epoch
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def _get_backend():
+    global _leaderboard
+    if _leaderboard is None:
+        backend = getattr(settings, 'ARTICLES_LEADERBOARD_BACKEND', 'memory')
+        if backend == 'redis':
+            from django_redis import get_redis_connection
+
+            _leaderboard = RedisLeaderboard(get_redis_connection('default'))
+        else:
+            _leaderboard = MemoryLeaderboard()
+    return _leaderboard
+
+
+def get_leaderboard():
+    """
+    Clasificación configurada; la primera vez se construye desde la base de
+    datos (también con `manage.py rebuild_leaderboards`).
+    """
+    with _leaderboard_lock:
+        leaderboard = _get_backend()
+        if not leaderboard.is_ready():
+            leaderboard.rebuild(*load_scores())
+        return leaderboard
+
+
+def rebuild_leaderboards():
+    with _leaderboard_lock:
+        leaderboard = _get_backend()
+        leaderboard.rebuild(*load_scores())
+        return leaderboard
+
+
+def _refresh_article(article_id, score_delta, rated_at):
+    from .models import Article
+
+    try:
+        leaderboard = get_leaderboard()
+        aggregates = Article.objects.filter(pk=article_id).values_list('avg_rating', 'ratings_count').first()
+        if aggregates is None:
+            leaderboard.remove(article_id)
+            return
+        leaderboard.set_score(POPULAR, article_id, popularity_score(*aggregates))
+        if score_delta:
+            now = time.time()
+            if needs_rebase(leaderboard.epoch(), now):
+                leaderboard.rebase(now)
+            leaderboard.add_trending(article_id, score_delta, rated_at)
+    except Exception:
+        logger.exception('No se pudo actualizar la clasificación del artículo %s', article_id)
+
+
+def record_rating(article_id, score_delta, rated_at):
+    """
+    Actualiza las clasificaciones del artículo al confirmarse la transacción.
+    `score_delta` es la variación de puntuación (negativa al borrar una
+    valoración) y `rated_at` la fecha de creación de la valoración.
+    """
+    timestamp = rated_at.timestamp()
+    transaction.on_commit(lambda: _refresh_article(article_id, score_delta, timestamp))
+
+
+def track_article(article_id):
+    transaction.on_commit(lambda: _refresh_article(article_id, 0, None))
+
+
+def forget_article(article_id):
+    def remove():
+        try:
+            get_leaderboard().remove(article_id)
+        except Exception:
+            logger.exception('No se pudo quitar el artículo %s de las clasificaciones', article_id)
+
+    transaction.on_commit(remove)
+
+
+def top_from_database(count):
+    """
+    Los `count` artículos más populares según la base de datos, con la misma
+    puntuación que la clasificación popular
+    """
+    from .models import Article
+
+    rows = Article.objects.order_by(
+        F('avg_rating').desc(nulls_last=True), '-ratings_count', '-id'
+    ).values_list('id', 'avg_rating', 'ratings_count')[:count]
+    return [(article_id, popularity_score(avg_rating, ratings_count)) for article_id, avg_rating, ratings_count in rows]
+
+
+def top_articles(board, count):
+    """
+    Los `count` primeros artículos de una clasificación como (article_id, score).
+    Si Redis no responde se usa la base de datos (también para trending, que
+    no se puede calcular ahí de forma barata).
+    """
+    try:
+        try:
+            return get_leaderboard().top(board, count)
+        except LeaderboardUnavailable:
+            logger.warning('Clasificación %s expulsada de Redis; se reconstruye', board)
+            return get_leaderboard().top(board, count)
+    except (RedisError, LeaderboardUnavailable):
+        logger.exception('No se pudo leer la clasificación %s; se ordena en la base de datos', board)
+        return top_from_database(count)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    """
+    Descarta la instancia creada con la configuración anterior (override_settings)
+    """
+    global _leaderboard
+    if setting in ('ARTICLES_LEADERBOARD_BACKEND', 'CACHES'):
+        with _leaderboard_lock:
+            _leaderboard = None
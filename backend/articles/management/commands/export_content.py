@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.content_io import CONTENT_TYPES, export_content, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Exporta artículos y destinos en NDJSON (una línea JSON por registro) sin cargarlos en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Fichero de salida (.ndjson o .ndjson.gz) o '-' para stdout")
+        parser.add_argument(
+            '--type', action='append', dest='types', choices=CONTENT_TYPES,
+            help='Exportar solo este tipo de contenido (se puede repetir)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Filas leídas por consulta')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stream = open_stream(options['output'], 'w')
+        try:
+            counts = export_content(stream, options['types'] or CONTENT_TYPES, options['chunk_size'])
+        finally:
+            if options['output'] != '-':
+                stream.close()
+
+        summary = ', '.join(f'{count} {content_type}' for content_type, count in counts.items())
+        # Con '-' la salida de datos es stdout, así que el resumen va a stderr
+        self.stderr.write(self.style.SUCCESS(f'Exportado: {summary} en {time.perf_counter() - started:.1f}s'))
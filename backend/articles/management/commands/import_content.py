@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.content_io import ContentImporter, open_stream
+from articles.leaderboard import rebuild_leaderboards
+from articles.search import rebuild_sqlite_index
+from recommendations.tag_index import rebuild_tag_index
+
+
+class Command(BaseCommand):
+    help = 'Importa artículos y destinos desde NDJSON (export_content) insertando o actualizando por slug'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Fichero de entrada (.ndjson o .ndjson.gz) o '-' para stdin")
+        parser.add_argument('--batch-size', type=int, default=500, help='Registros por lote y transacción')
+        parser.add_argument('--default-author', help='Email del autor para los artículos cuyo autor no existe')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        importer = ContentImporter(options['batch_size'], options['default_author'])
+        stream = open_stream(options['input'], 'r')
+        try:
+            counts = importer.run(stream)
+        finally:
+            if options['input'] != '-':
+                stream.close()
+
+        # Los upserts por lotes no envían señales: se reconstruyen los índices derivados
+        if counts['article']:
+            rebuild_sqlite_index()
+            rebuild_tag_index()
+            rebuild_leaderboards()
+
+        for line_number, reason in importer.errors[:20]:
+            self.stderr.write(self.style.WARNING(f'  línea {line_number}: {reason}'))
+        if len(importer.errors) > 20:
+            self.stderr.write(self.style.WARNING(f'  ... y {len(importer.errors) - 20} más'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Importado: {counts['article']} artículos y {counts['destination']} destinos "
+            f"({counts['skipped']} omitidos) en {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from articles.models import SUMMARY_FIELDS, Article
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el resumen de las tarjetas de todos los artículos '
+        '(extracto, número de palabras, tiempo de lectura y primera imagen)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Solo los artículos que todavía no tienen resumen',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Article.objects.only('pk', 'content', *SUMMARY_FIELDS).order_by('pk')
+        if options['missing']:
+            queryset = queryset.filter(excerpt='', word_count=0)
+
+        batch = []
+        total = 0
+        for article in queryset.iterator(chunk_size=batch_size):
+            article.update_summary()
+            batch.append(article)
+            if len(batch) >= batch_size:
+                Article.objects.bulk_update(batch, SUMMARY_FIELDS)
+                total += len(batch)
+                batch = []
+
+        if batch:
+            Article.objects.bulk_update(batch, SUMMARY_FIELDS)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Resumen recalculado para {total} artículos'))
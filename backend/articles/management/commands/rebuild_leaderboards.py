@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.leaderboard import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las clasificaciones de artículos populares y en tendencia (y reinicia el epoch del decaimiento)'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        leaderboard = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(
+            f'Clasificaciones ({type(leaderboard).__name__}) reconstruidas en {time.perf_counter() - started:.2f}s'
+        ))
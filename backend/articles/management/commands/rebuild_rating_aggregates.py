@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from articles.leaderboard import rebuild_leaderboards
+from articles.models import Article, rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los agregados de valoraciones (suma, número y media) de los artículos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slug',
+            action='append',
+            dest='slugs',
+            help='Limitar el recálculo a los artículos con este slug (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.all()
+        if options['slugs']:
+            queryset = queryset.filter(slug__in=options['slugs'])
+
+        updated = rebuild_rating_aggregates(queryset)
+        # La clasificación de populares depende de los agregados
+        rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f'Agregados de valoraciones recalculados para {updated} artículos'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from articles.models import Article
+from articles.search import rebuild_sqlite_index
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el documento de búsqueda de todos los artículos y reconstruye el índice de texto completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        total = 0
+
+        for article in Article.objects.prefetch_related('tags').iterator(chunk_size=batch_size):
+            tag_names = ' '.join(tag.name for tag in article.tags.all())
+            article.search_document = article.build_search_document_from(tag_names)
+            batch.append(article)
+            if len(batch) >= batch_size:
+                Article.objects.bulk_update(batch, ['search_document'])
+                total += len(batch)
+                batch = []
+
+        if batch:
+            Article.objects.bulk_update(batch, ['search_document'])
+            total += len(batch)
+
+        # En PostgreSQL el índice GIN es de expresión y no necesita reconstruirse
+        rebuild_sqlite_index()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido para {total} artículos'))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from articles.cache import invalidate_article_detail
+from articles.models import SUMMARY_FIELDS, Article, Comment
+from articles.sanitize import sanitize_content
+from articles.search import rebuild_sqlite_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Sanitiza el contenido de artículos y comentarios guardado antes de limpiarse al escribir '
+        '(o con una versión anterior del sanitizador) y guarda su hash'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        articles = self._sanitize(
+            Article.objects.prefetch_related('tags'), batch_size, self._refresh_article,
+            ['content', 'content_hash', 'search_document', *SUMMARY_FIELDS],
+        )
+        comments = self._sanitize(Comment.objects.all(), batch_size, None, ['content', 'content_hash'])
+
+        if articles:
+            rebuild_sqlite_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Contenido sanitizado: {articles} artículos y {comments} comentarios actualizados'
+        ))
+
+    def _sanitize(self, queryset, batch_size, on_change, fields):
+        """
+        Recorre el queryset por bloques y actualiza solo las filas cuyo hash no
+        corresponde a su contenido actual. Devuelve el número de filas actualizadas.
+        """
+        batch = []
+        total = 0
+        for instance in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            content, content_hash = sanitize_content(instance.content, instance.content_hash)
+            if content_hash == instance.content_hash:
+                continue
+            instance.content, instance.content_hash = content, content_hash
+            if on_change is not None:
+                on_change(instance)
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                queryset.model.objects.bulk_update(batch, fields)
+                total += len(batch)
+                batch = []
+
+        if batch:
+            queryset.model.objects.bulk_update(batch, fields)
+            total += len(batch)
+        return total
+
+    def _refresh_article(self, article):
+        article.update_summary()
+        tag_names = ' '.join(tag.name for tag in article.tags.all())
+        article.search_document = article.build_search_document_from(tag_names)
+        invalidate_article_detail(article.slug)
@@ -0,0 +1,399 @@
+import contextlib
+import time
+import weakref
+from pathlib import Path
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils.text import slugify
+
+from articles.leaderboard import rebuild_leaderboards
+from articles.models import Article, Comment, Rating, Tag, rebuild_rating_aggregates
+from articles.search import rebuild_sqlite_index
+from destinations.cache import invalidate_destinations_by_continent
+from destinations.models import Continent, Destination
+from recommendations.tag_index import rebuild_tag_index
+from users.models import Profile, User, UserRole
+
+CONTINENTS = ['Europa', 'Asia', 'África', 'América del Norte', 'América del Sur', 'Oceanía']
+
+PLACES = [
+    ('Lisboa', 'Portugal', 'Europa'), ('Oporto', 'Portugal', 'Europa'), ('Sevilla', 'España', 'Europa'),
+    ('Granada', 'España', 'Europa'), ('San Sebastián', 'España', 'Europa'), ('Roma', 'Italia', 'Europa'),
+    ('Florencia', 'Italia', 'Europa'), ('Praga', 'República Checa', 'Europa'), ('Reikiavik', 'Islandia', 'Europa'),
+    ('Kioto', 'Japón', 'Asia'), ('Tokio', 'Japón', 'Asia'), ('Hanói', 'Vietnam', 'Asia'),
+    ('Bangkok', 'Tailandia', 'Asia'), ('Bali', 'Indonesia', 'Asia'), ('Katmandú', 'Nepal', 'Asia'),
+    ('Marrakech', 'Marruecos', 'África'), ('Ciudad del Cabo', 'Sudáfrica', 'África'), ('Zanzíbar', 'Tanzania', 'África'),
+    ('Nairobi', 'Kenia', 'África'), ('Nueva York', 'Estados Unidos', 'América del Norte'),
+    ('Ciudad de México', 'México', 'América del Norte'), ('Oaxaca', 'México', 'América del Norte'),
+    ('Vancouver', 'Canadá', 'América del Norte'), ('Cusco', 'Perú', 'América del Sur'),
+    ('Cartagena', 'Colombia', 'América del Sur'), ('Buenos Aires', 'Argentina', 'América del Sur'),
+    ('Ushuaia', 'Argentina', 'América del Sur'), ('Sídney', 'Australia', 'Oceanía'),
+    ('Queenstown', 'Nueva Zelanda', 'Oceanía'), ('Melbourne', 'Australia', 'Oceanía'),
+]
+
+TOPICS = [
+    'Playas', 'Montañas', 'Ciudades', 'Gastronomía', 'Aventura', 'Cultural', 'Senderismo', 'Museos',
+    'Mochilero', 'Lujo', 'Familia', 'Fotografía', 'Naturaleza', 'Islas', 'Invierno', 'Verano',
+    'Road trip', 'Vino', 'Arquitectura', 'Festivales', 'Buceo', 'Safari', 'Historia', 'Mercados',
+]
+
+TITLE_TEMPLATES = [
+    'Qué ver en {place} en {days} días',
+    'Guía de {topic} en {place}',
+    '{place}: {topic} fuera de los circuitos turísticos',
+    'Ruta de {topic} por {country}',
+    'Mis rincones favoritos de {place}',
+    'Presupuesto para viajar a {country}',
+]
+
+SENTENCES = [
+    'Llegamos a {place} con la idea de quedarnos un par de días y acabamos alargando la estancia.',
+    'El transporte público funciona bien y permite moverse sin alquilar coche.',
+    'La mejor época para visitar {country} es la primavera, cuando hay menos turistas.',
+    'No te pierdas los mercados locales, donde se come bien y barato.',
+    'Reserva con antelación el alojamiento si viajas en temporada alta.',
+    'Las vistas al atardecer compensan cualquier madrugón.',
+    'Conviene llevar calzado cómodo: casi todo se recorre a pie.',
+    'Los barrios históricos guardan los rincones más fotogénicos de {place}.',
+    'Si te gusta {topic}, aquí encontrarás planes para varios días.',
+    'Pregunta a los vecinos: siempre conocen algún sitio que no aparece en las guías.',
+]
+
+COMMENTS = [
+    '¡Muy útil, gracias por compartir!', 'Estuve el año pasado y coincido en todo.',
+    '¿Qué presupuesto diario recomendarías?', 'Me lo apunto para el próximo viaje.',
+    'Las fotos son preciosas.', '¿Es seguro viajar con niños?', 'Echo en falta información sobre el transporte.',
+    'Gran artículo, muy bien explicado.',
+]
+
+
+def project_modules():
+    """
+    Paquetes de las aplicaciones del proyecto (las que están bajo BASE_DIR)
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    return {
+        config.name.split('.')[0]
+        for config in apps.get_app_configs()
+        if Path(config.path).resolve().is_relative_to(base_dir)
+    }
+
+
+def _is_project_receiver(entry, modules):
+    receiver = entry[1]
+    if isinstance(receiver, weakref.ReferenceType):
+        receiver = receiver()
+    module = getattr(receiver, '__module__', None) or ''
+    return module.split('.')[0] in modules
+
+
+@contextlib.contextmanager
+def muted_signals(*signals):
+    """
+    Desconecta temporalmente los receptores del proyecto conectados a las
+    señales indicadas; los de Django y de terceros siguen activos
+    """
+    modules = project_modules()
+    muted = []
+    for signal in signals:
+        with signal.lock:
+            entries, kept = [], []
+            for entry in signal.receivers:
+                (entries if _is_project_receiver(entry, modules) else kept).append(entry)
+            signal.receivers = kept
+            signal.sender_receivers_cache.clear()
+        muted.append((signal, entries))
+    try:
+        yield
+    finally:
+        for signal, entries in muted:
+            with signal.lock:
+                signal.receivers = entries + signal.receivers
+                signal.sender_receivers_cache.clear()
+
+
+def chunked(total, chunk_size):
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un conjunto de datos sintético (usuarios, perfiles, tags, artículos, valoraciones, '
+        'comentarios y destinos) con bulk_create por bloques, para pruebas de carga'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=60)
+        parser.add_argument('--ratings-per-user', type=float, default=10, help='Media de valoraciones por usuario')
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--destinations', type=int, default=200)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Filas por INSERT y transacción')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed', help='Prefijo de emails y slugs (permite varias cargas)')
+        parser.add_argument('--password', default='password123', help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--skip-rebuild', action='store_true', help='No reconstruir agregados e índices al terminar')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.prefix = slugify(options['prefix'])
+        self.rng = np.random.default_rng(options['seed'])
+        self.stats = []
+
+        if User.objects.filter(email__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Ya existen datos con el prefijo "{self.prefix}"; usa otro con --prefix')
+
+        started = time.perf_counter()
+        # bulk_create no envía post_save, pero las tablas intermedias sí envían
+        # m2m_changed; los receptores del proyecto se sustituyen por _rebuild()
+        with muted_signals(pre_save, post_save, pre_delete, post_delete, m2m_changed):
+            continents = self._continents()
+            tags = self._tags(options['tags'])
+            user_ids, writer_ids = self._users(options['users'], options['password'], tags)
+            article_ids = self._articles(options['articles'], writer_ids, tags, continents)
+            self._ratings(user_ids, article_ids, options['ratings_per_user'])
+            self._comments(options['comments'], user_ids, article_ids)
+            self._destinations(options['destinations'], continents)
+
+        if not options['skip_rebuild']:
+            self._rebuild()
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(rows for _, rows, _ in self.stats)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_rows} filas en {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.0f} filas/s)'
+        ))
+
+    def _insert(self, label, model, objects):
+        """
+        Inserta una lista de instancias por bloques, cada uno en su transacción.
+        Devuelve las instancias (con pk en PostgreSQL y SQLite).
+        """
+        started = time.perf_counter()
+        created = []
+        for start, end in chunked(len(objects), self.chunk_size):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(objects[start:end]))
+        self._report(label, len(objects), time.perf_counter() - started)
+        return created
+
+    def _report(self, label, rows, elapsed):
+        self.stats.append((label, rows, elapsed))
+        self.stdout.write(f'  {label}: {rows} filas en {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} filas/s)')
+
+    def _continents(self):
+        continents = {}
+        for name in CONTINENTS:
+            continent, _ = Continent.objects.get_or_create(slug=slugify(name), defaults={'name': name})
+            continents[name] = continent.pk
+        return continents
+
+    def _tags(self, count):
+        names = [TOPICS[i % len(TOPICS)] if i < len(TOPICS) else f'{TOPICS[i % len(TOPICS)]} {i // len(TOPICS)}' for i in range(count)]
+        existing = set(Tag.objects.filter(name__in=names).values_list('name', flat=True))
+        self._insert('tags', Tag, [Tag(name=name, slug=slugify(name)) for name in names if name not in existing])
+        return list(Tag.objects.filter(name__in=names).values_list('pk', 'name'))
+
+    def _users(self, count, password, tags):
+        """
+        Crea usuarios, perfiles e intereses bloque a bloque para no tener todas
+        las instancias en memoria. Devuelve (ids de usuario, ids de escritores).
+        """
+        hashed = make_password(password)
+        writers = max(1, count // 20)
+        tag_ids = np.array([pk for pk, _ in tags], dtype=np.int64)
+
+        started = time.perf_counter()
+        user_ids = []
+        rows = 0
+        for start, end in chunked(count, self.chunk_size):
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        email=f'{self.prefix}-{i}@example.com',
+                        password=hashed,
+                        first_name=f'Usuario {i}',
+                        role=UserRole.WRITER if i < writers else UserRole.READER,
+                    )
+                    for i in range(start, end)
+                ])
+                profiles = Profile.objects.bulk_create([Profile(user_id=user.pk) for user in users])
+                interests = [
+                    Profile.interests.through(profile_id=profile.pk, tag_id=int(tag_id))
+                    for profile in profiles
+                    for tag_id in self.rng.choice(
+                        tag_ids, size=min(int(self.rng.integers(1, 6)), tag_ids.size), replace=False,
+                    )
+                ]
+                Profile.interests.through.objects.bulk_create(interests)
+            user_ids.extend(user.pk for user in users)
+            rows += len(users) + len(profiles) + len(interests)
+
+        self._report('usuarios, perfiles e intereses', rows, time.perf_counter() - started)
+        user_ids = np.array(user_ids, dtype=np.int64)
+        return user_ids, user_ids[:writers]
+
+    def _article_content(self, place, country, topic):
+        paragraphs = []
+        for _ in range(int(self.rng.integers(3, 7))):
+            sentences = self.rng.choice(SENTENCES, size=3, replace=False)
+            paragraphs.append('<p>' + ' '.join(
+                sentence.format(place=place, country=country, topic=topic.lower()) for sentence in sentences
+            ) + '</p>')
+        paragraphs.insert(1, f'<h2>Cómo llegar a {place}</h2>')
+        paragraphs.append(
+            '<ul>' + ''.join(f'<li>{item}</li>' for item in ('Alojamiento', 'Transporte', 'Presupuesto')) + '</ul>'
+        )
+        return ''.join(paragraphs)
+
+    def _articles(self, count, writer_ids, tags, continents):
+        tag_ids = np.array([pk for pk, _ in tags], dtype=np.int64)
+        tag_names = dict(tags)
+        # Unos pocos tags acumulan la mayoría de artículos, como en un blog real
+        weights = 1.0 / np.arange(1, tag_ids.size + 1)
+        weights /= weights.sum()
+
+        started = time.perf_counter()
+        article_ids = []
+        rows = 0
+        for start, end in chunked(count, self.chunk_size):
+            articles = []
+            article_tags = []
+            places = []
+            for i in range(start, end):
+                place, country, continent = PLACES[int(self.rng.integers(len(PLACES)))]
+                chosen_tags = self.rng.choice(tag_ids, size=min(int(self.rng.integers(1, 5)), tag_ids.size), replace=False, p=weights)
+                topic = tag_names[int(chosen_tags[0])]
+                title = TITLE_TEMPLATES[int(self.rng.integers(len(TITLE_TEMPLATES)))].format(
+                    place=place, country=country, topic=topic.lower(), days=int(self.rng.integers(2, 8)),
+                )
+                is_destination = bool(self.rng.random() < 0.1)
+                article = Article(
+                    title=title,
+                    # Los slugs admiten 50 caracteres; el índice va delante para que sigan siendo únicos
+                    slug=f'{self.prefix}-{i}-{slugify(title)}'[:50].rstrip('-'),
+                    author_id=int(self.rng.choice(writer_ids)),
+                    content=self._article_content(place, country, topic),
+                    is_destination=is_destination,
+                    continent_id=continents[continent] if is_destination else None,
+                )
+                article.update_summary()
+                article.search_document = article.build_search_document_from(
+                    ' '.join(tag_names[int(tag_id)] for tag_id in chosen_tags)
+                )
+                articles.append(article)
+                article_tags.append(chosen_tags)
+                places.append((place, country))
+
+            with transaction.atomic():
+                created = Article.objects.bulk_create(articles)
+                Article.tags.through.objects.bulk_create([
+                    Article.tags.through(article_id=article.pk, tag_id=int(tag_id))
+                    for article, chosen_tags in zip(created, article_tags)
+                    for tag_id in chosen_tags
+                ])
+                # Lo que haría create_destination_from_article con cada artículo de destino
+                destinations = Destination.objects.bulk_create([
+                    Destination(
+                        name=article.title,
+                        slug=article.slug,
+                        description=article.content,
+                        country=country,
+                        city=place,
+                        continent_id=article.continent_id,
+                    )
+                    for article, (place, country) in zip(created, places)
+                    if article.is_destination
+                ])
+            article_ids.extend(article.pk for article in created)
+            rows += len(created) + sum(len(chosen_tags) for chosen_tags in article_tags) + len(destinations)
+
+        self._report('artículos, tags y destinos de artículos', rows, time.perf_counter() - started)
+        return np.array(article_ids, dtype=np.int64)
+
+    def _ratings(self, user_ids, article_ids, ratings_per_user):
+        if not article_ids.size:
+            return
+        # Calidad latente de cada artículo: unos reciben mejores notas que otros
+        quality = self.rng.normal(0, 0.8, size=article_ids.size)
+
+        started = time.perf_counter()
+        rows = 0
+        batch = []
+        for user_id in user_ids.tolist():
+            size = min(int(self.rng.poisson(ratings_per_user)), article_ids.size)
+            if not size:
+                continue
+            positions = self.rng.choice(article_ids.size, size=size, replace=False)
+            scores = np.clip(np.rint(3.4 + quality[positions] + self.rng.normal(0, 0.9, size=size)), 1, 5)
+            batch.extend(
+                Rating(user_id=user_id, article_id=int(article_ids[position]), score=int(score))
+                for position, score in zip(positions, scores)
+            )
+            if len(batch) >= self.chunk_size:
+                rows += self._flush(Rating, batch)
+                batch = []
+        rows += self._flush(Rating, batch)
+        self._report('valoraciones', rows, time.perf_counter() - started)
+
+    def _comments(self, count, user_ids, article_ids):
+        if not article_ids.size:
+            return
+        started = time.perf_counter()
+        rows = 0
+        for start, end in chunked(count, self.chunk_size):
+            size = end - start
+            users = self.rng.choice(user_ids, size=size)
+            articles = self.rng.choice(article_ids, size=size)
+            texts = self.rng.choice(COMMENTS, size=size)
+            rows += self._flush(Comment, [
+                Comment(user_id=int(user_id), article_id=int(article_id), content=str(text))
+                for user_id, article_id, text in zip(users, articles, texts)
+            ])
+        self._report('comentarios', rows, time.perf_counter() - started)
+
+    def _destinations(self, count, continents):
+        destinations = []
+        for i in range(count):
+            city, country, continent = PLACES[i % len(PLACES)]
+            topic = TOPICS[int(self.rng.integers(len(TOPICS)))]
+            destinations.append(Destination(
+                name=f'{city} ({topic.lower()})',
+                slug=f'{self.prefix}-{slugify(city)}-{i}',
+                description=self._article_content(city, country, topic),
+                country=country,
+                city=city,
+                continent_id=continents[continent],
+            ))
+        self._insert('destinos', Destination, destinations)
+        invalidate_destinations_by_continent()
+
+    def _flush(self, model, objects):
+        if not objects:
+            return 0
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+        return len(objects)
+
+    def _rebuild(self):
+        """
+        Recalcula lo que las señales habrían mantenido durante una carga normal
+        """
+        steps = [
+            ('agregados de valoraciones', rebuild_rating_aggregates),
+            ('índice de búsqueda', rebuild_sqlite_index),
+            ('índice de tags', rebuild_tag_index),
+            ('clasificaciones', rebuild_leaderboards),
+        ]
+        for label, rebuild in steps:
+            started = time.perf_counter()
+            rebuild()
+            self.stdout.write(f'  {label} reconstruido en {time.perf_counter() - started:.1f}s')
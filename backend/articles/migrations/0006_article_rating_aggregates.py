@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-16 22:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+    Rating = apps.get_model('articles', 'Rating')
+    
+    ratings = Rating.objects.filter(article=OuterRef('pk')).order_by().values('article')
+    Article.objects.update(
+        ratings_sum=Coalesce(Subquery(ratings.annotate(total=Sum('score')).values('total')), 0),
+        ratings_count=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total')), 0),
+        avg_rating=Subquery(ratings.annotate(avg=Avg('score')).values('avg'), output_field=FloatField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0005_article_continent'),
+        ('destinations', '0002_continent_destination_continent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='avg_rating',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='ratings_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='ratings_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-avg_rating', '-ratings_count'], name='article_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-16 22:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_article_rating_aggregates'),
+        ('destinations', '0002_continent_destination_continent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-created_at', '-id'], name='article_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', '-created_at', '-id'], name='comment_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2 on 2026-10-16 22:31
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Copias de articles.search en el momento de esta migración: las migraciones
+# no deben depender de código que puede cambiar después
+SEARCH_CONFIG = 'es_unaccent'
+SQLITE_FTS_TABLE = 'articles_article_fts'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def html_to_text(value):
+    if not value:
+        return ''
+    text = html.unescape(strip_tags(value))
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def backfill_search_document(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+
+    for article in Article.objects.prefetch_related('tags').iterator(chunk_size=500):
+        tag_names = ' '.join(tag.name for tag in article.tags.all())
+        article.search_document = ' '.join(
+            part for part in (article.title, tag_names, html_to_text(article.content)) if part
+        )
+        article.save(update_fields=['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        # Configuración en español que ignora acentos ("montaña" == "montana")
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        schema_editor.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = spanish);
+                    ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+                END IF;
+            END
+            $$
+        """)
+        # Debe coincidir con la expresión que genera SearchVector('search_document', config=...)
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS article_search_idx ON articles_article '
+            f"USING GIN (to_tsvector('{SEARCH_CONFIG}'::regconfig, COALESCE(search_document, '')))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} '
+            "USING fts5(search_document, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document) '
+            'SELECT id, search_document FROM articles_article'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS article_search_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
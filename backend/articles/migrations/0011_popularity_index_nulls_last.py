@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-16 23:21
+
+import articles.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0010_article_summary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_popularity_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=articles.indexes.NullsLastIndex(models.OrderBy(models.F('avg_rating'), descending=True, nulls_last=True), models.OrderBy(models.F('ratings_count'), descending=True), name='article_popularity_idx'),
+        ),
+    ]
@@ -1,12 +1,27 @@
-from django.db import models
+import logging
+import threading
+
+from django.db import models, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
 from django.utils.text import slugify
 import unidecode
 from users.models import User, Profile
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from destinations.models import Continent
+from .sanitize import sanitize_content
+from .search import html_to_text, index_article, unindex_article
+from .summary import summarize_content
+from .cache import invalidate_article_detail
+from .indexes import NullsLastIndex
+from .leaderboard import forget_article, record_rating, track_article
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ('excerpt', 'word_count', 'reading_time', 'first_image')
 
 def create_unique_slug(instance, new_slug=None):
     """
@@ -30,30 +45,165 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nombre y slug con los que se cargó la etiqueta, para saber si ha cambiado
+        instance._loaded_name = instance.__dict__.get('name')
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = create_unique_slug(self)
         super().save(*args, **kwargs)
+        self._loaded_name, self._loaded_slug = self.name, self.slug
+
+class ArticleQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Plan de consulta para serializar artículos: une autor y continente en la
+        misma consulta y precarga los tags en una sola consulta adicional,
+        evitando una consulta por artículo al renderizar listados.
+        """
+        return self.select_related('author', 'continent').prefetch_related('tags')
+    
+    def for_cards(self):
+        """
+        with_related() sin las columnas de texto completo, que las tarjetas de
+        los listados no usan (ver ArticleListSerializer).
+        """
+        return self.with_related().defer('content', 'search_document')
 
 class Article(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='articles')
     content = models.TextField()
+    # Hash del contenido ya sanitizado (ver articles.sanitize)
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     image = models.ImageField(upload_to='articles/', null=True, blank=True)
     tags = models.ManyToManyField(Tag, related_name='articles')
     is_destination = models.BooleanField(default=False, help_text="Indica si este artículo debe ser tratado como un destino")
     continent = models.ForeignKey(Continent, on_delete=models.SET_NULL, null=True, blank=True, related_name='articles', help_text="Continente al que pertenece este artículo si es un destino")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Agregados de valoraciones desnormalizados: se mantienen con update_rating_aggregates
+    # para que los listados no tengan que agrupar la tabla de valoraciones en cada petición
+    ratings_sum = models.PositiveIntegerField(default=0, editable=False)
+    ratings_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(null=True, blank=True, editable=False)
+    # Texto plano (título, etiquetas y contenido sin HTML) sobre el que se indexa la búsqueda
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Resumen para las tarjetas de los listados (ver articles.summary)
+    excerpt = models.TextField(blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Minutos de lectura estimados")
+    first_image = models.CharField(max_length=500, blank=True, default='', editable=False)
+    
+    objects = ArticleQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Mismo orden que las consultas: las medias nulas (sin valoraciones) al final
+            NullsLastIndex(
+                F('avg_rating').desc(nulls_last=True), F('ratings_count').desc(),
+                name='article_popularity_idx',
+            ),
+            models.Index(fields=['-created_at', '-id'], name='article_feed_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Slug con el que se cargó el artículo, para invalidar la cache si cambia
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        previous_hash = self.content_hash
+        self.content, self.content_hash = sanitize_content(self.content, self.content_hash)
+        if self.content_hash != previous_hash:
+            self.update_summary()
+        self.search_document = self.build_search_document()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {'search_document'}
+            if 'content' in update_fields:
+                derived.update(('content_hash', *SUMMARY_FIELDS))
+            kwargs['update_fields'] = {*update_fields, *derived}
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.title
+    
+    def update_summary(self):
+        for field, value in summarize_content(self.content).items():
+            setattr(self, field, value)
+    
+    def build_search_document(self):
+        """
+        Texto plano que se indexa para la búsqueda: título, nombres de los tags y contenido sin HTML
+        """
+        tag_names = ' '.join(self.tags.values_list('name', flat=True)) if self.pk else ''
+        return self.build_search_document_from(tag_names)
+    
+    def build_search_document_from(self, tag_names):
+        return ' '.join(part for part in (self.title, tag_names, html_to_text(self.content)) if part)
+    
+    def refresh_search_document(self):
+        """
+        Recalcula el documento de búsqueda sin pasar por save() (ni por sus señales)
+        """
+        self.search_document = self.build_search_document()
+        Article.objects.filter(pk=self.pk).update(search_document=self.search_document)
+        index_article(self.pk, self.search_document)
+
+def update_rating_aggregates(article_id, score_delta, count_delta):
+    """
+    Actualiza de forma atómica los agregados de valoraciones de un artículo.
+    
+    Todo se resuelve en un único UPDATE con expresiones F, por lo que dos
+    valoraciones concurrentes no se pisan entre sí. La media se recalcula a
+    partir de los valores nuevos de suma y número de valoraciones.
+    """
+    if not score_delta and not count_delta:
+        return
+    
+    new_sum = F('ratings_sum') + score_delta
+    new_count = F('ratings_count') + count_delta
+    Article.objects.filter(pk=article_id).update(
+        ratings_sum=new_sum,
+        ratings_count=new_count,
+        avg_rating=Case(
+            When(ratings_count__lte=-count_delta, then=Value(None)),
+            default=Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+            output_field=FloatField(),
+        ),
+    )
+
+def rebuild_rating_aggregates(queryset=None):
+    """
+    Recalcula desde cero los agregados de valoraciones de los artículos indicados
+    (todos por defecto). Devuelve el número de artículos actualizados.
+    """
+    if queryset is None:
+        queryset = Article.objects.all()
+    
+    ratings = Rating.objects.filter(article=OuterRef('pk')).order_by().values('article')
+    ratings_sum = Subquery(ratings.annotate(total=Sum('score')).values('total'))
+    ratings_count = Subquery(ratings.annotate(total=Count('id')).values('total'))
+    
+    return queryset.update(
+        ratings_sum=Coalesce(ratings_sum, 0),
+        ratings_count=Coalesce(ratings_count, 0),
+        avg_rating=Subquery(
+            ratings.annotate(avg=Avg('score')).values('avg'),
+            output_field=FloatField(),
+        ),
+    )
 
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings')
@@ -71,11 +221,164 @@ class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['article', '-created_at', '-id'], name='comment_feed_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.content, self.content_hash = sanitize_content(self.content, self.content_hash)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.user.email} comentó en {self.article.title}"
 
+def save_rating(user, article, score):
+    """
+    Crea o actualiza la valoración de un usuario sobre un artículo y ajusta
+    los agregados desnormalizados del artículo en la misma transacción.
+    Devuelve la tupla (rating, created).
+    """
+    score = int(score)
+    with transaction.atomic():
+        rating = Rating.objects.select_for_update().filter(user=user, article=article).first()
+        
+        if rating is None:
+            rating = Rating.objects.create(user=user, article=article, score=score)
+            update_rating_aggregates(article.pk, score, 1)
+            record_rating(article.pk, score, rating.created_at)
+            return rating, True
+        
+        score_delta = score - rating.score
+        if score_delta:
+            rating.score = score
+            rating.save(update_fields=['score'])
+            update_rating_aggregates(article.pk, score_delta, 0)
+            record_rating(article.pk, score_delta, rating.created_at)
+        return rating, False
+
+# Artículos que se están borrando en este hilo: sus valoraciones y comentarios
+# se eliminan en cascada antes que ellos y no hace falta actualizar nada por fila.
+# El conjunto va ligado al `origin` del borrado, así que si este falla o se
+# revierte los ids que queden no afectan a los borrados posteriores.
+_deleting = threading.local()
+
+
+def _deleted_with_article(instance, origin):
+    return (
+        getattr(_deleting, 'origin', None) is origin
+        and instance.article_id in _deleting.article_ids
+    )
+
+@receiver(pre_delete, sender=Article)
+def mark_article_deletion(sender, instance, origin=None, **kwargs):
+    if getattr(_deleting, 'origin', None) is not origin:
+        _deleting.origin = origin
+        _deleting.article_ids = set()
+    _deleting.article_ids.add(instance.pk)
+
+@receiver(post_delete, sender=Rating)
+def discount_deleted_rating(sender, instance, origin=None, **kwargs):
+    """
+    Mantiene los agregados del artículo cuando se elimina una valoración
+    (desde el admin o en cascada al borrar un usuario)
+    """
+    if _deleted_with_article(instance, origin):
+        return
+    update_rating_aggregates(instance.article_id, -instance.score, -1)
+    record_rating(instance.article_id, -instance.score, instance.created_at)
+    invalidate_article_detail(instance.article.slug)
+
+@receiver(post_delete, sender=Comment)
+def invalidate_article_on_comment_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_with_article(instance, origin):
+        return
+    invalidate_article_detail(instance.article.slug)
+
+@receiver(post_save, sender=Article)
+def index_saved_article(sender, instance, created, **kwargs):
+    index_article(instance.pk, instance.search_document, using=kwargs.get('using', 'default'))
+    invalidate_article_detail(instance.slug, getattr(instance, '_loaded_slug', None))
+    if created:
+        track_article(instance.pk)
+
+@receiver(post_delete, sender=Article)
+def unindex_deleted_article(sender, instance, origin=None, **kwargs):
+    if getattr(_deleting, 'origin', None) is origin:
+        _deleting.article_ids.discard(instance.pk)
+        if not _deleting.article_ids:
+            _deleting.origin = None
+    unindex_article(instance.pk, using=kwargs.get('using', 'default'))
+    forget_article(instance.pk)
+    invalidate_article_detail(instance.slug)
+
+@receiver(post_save, sender=Rating)
+@receiver(post_save, sender=Comment)
+def invalidate_article_on_related_save(sender, instance, **kwargs):
+    invalidate_article_detail(instance.article.slug)
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def refresh_search_document_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Los tags forman parte del documento de búsqueda, así que se recalcula
+    cuando cambian las etiquetas de un artículo (en cualquier dirección de la relación)
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if not reverse:
+        instance.refresh_search_document()
+        invalidate_article_detail(instance.slug)
+    elif pk_set:
+        for article in Article.objects.filter(pk__in=pk_set):
+            article.refresh_search_document()
+            invalidate_article_detail(article.slug)
+
+@receiver(post_save, sender=Tag)
+def refresh_search_documents_on_tag_rename(sender, instance, created, **kwargs):
+    if created:
+        return
+    renamed = instance.name != getattr(instance, '_loaded_name', None)
+    if not renamed and instance.slug == getattr(instance, '_loaded_slug', None):
+        return
+    for article in instance.articles.all():
+        if renamed:
+            article.refresh_search_document()
+        invalidate_article_detail(article.slug)
+
+# Autor y continente aparecen en el detalle del artículo: campo del artículo
+# que los referencia y campos que se serializan
+DETAIL_RELATIONS = {
+    User: ('author', ('email', 'first_name', 'last_name')),
+    Continent: ('continent', ('name', 'slug')),
+}
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Continent)
+def detect_article_detail_change(sender, instance, update_fields=None, **kwargs):
+    _, fields = DETAIL_RELATIONS[sender]
+    instance._article_detail_changed = False
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(fields)):
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+    instance._article_detail_changed = (
+        previous is not None and previous != tuple(getattr(instance, field) for field in fields)
+    )
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Continent)
+def invalidate_articles_on_related_change(sender, instance, **kwargs):
+    if not getattr(instance, '_article_detail_changed', False):
+        return
+    relation, _ = DETAIL_RELATIONS[sender]
+    invalidate_article_detail(*Article.objects.filter(**{relation: instance}).values_list('slug', flat=True))
+
 @receiver(post_save, sender=Article)
 def create_destination_from_article(sender, instance, created, **kwargs):
     """
@@ -97,7 +400,7 @@ def create_destination_from_article(sender, instance, created, **kwargs):
                 # Lo más importante: Actualizar el continente
                 destination.continent = instance.continent
                 destination.save()
-                print(f"Destino actualizado: {destination.name}, Continente: {instance.continent.name if instance.continent else 'No definido'}")
+                logger.info('Destino actualizado: %s (continente: %s)', destination.name, instance.continent_id)
             except Destination.DoesNotExist:
                 # Usar el continente seleccionado por el usuario
                 continent = instance.continent
@@ -119,8 +422,9 @@ def create_destination_from_article(sender, instance, created, **kwargs):
                 )
                 destination.save()
                 
-                # Log para depuración
-                print(f"Destino creado: {destination.name}, País: {destination.country}, Ciudad: {destination.city}, Continente: {continent.name if continent else 'No definido'}")
-        except Exception as e:
-            # Log de error para depuración
-            print(f"Error al crear/actualizar destino: {str(e)}")
+                logger.info(
+                    'Destino creado: %s (país: %s, ciudad: %s, continente: %s)',
+                    destination.name, destination.country, destination.city, instance.continent_id,
+                )
+        except Exception:
+            logger.exception('Error al crear/actualizar el destino del artículo %s', instance.pk)
@@ -0,0 +1,44 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (created_at, id), de más reciente a más antiguo.
+    
+    A diferencia de la paginación por número de página no ejecuta COUNT(*) ni
+    usa OFFSET, por lo que el coste de una página no depende de su profundidad.
+    Los cursores next/previous son opacos (codificados en base64).
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class OptionalCursorPaginationMixin:
+    """
+    Permite que una vista use paginación por cursor cuando el cliente la pide
+    explícitamente con ?pagination=cursor (o al seguir un enlace con ?cursor=).
+    Sin esos parámetros se mantiene la paginación global por número de página.
+    
+    El cursor impone su propio orden, así que si la petición lleva alguno de los
+    parámetros de `cursor_incompatible_params` (p. ej. una búsqueda, que ordena
+    por relevancia) se ignora ?pagination=cursor y se pagina por número de página.
+    """
+    cursor_pagination_class = CreatedAtCursorPagination
+    pagination_mode_param = 'pagination'
+    cursor_incompatible_params = ()
+    
+    def uses_cursor_pagination(self):
+        params = self.request.query_params
+        if any(params.get(param, '').strip() for param in self.cursor_incompatible_params):
+            return False
+        return (
+            params.get(self.pagination_mode_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+    
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.uses_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,129 @@
+"""
+Sanitización del HTML de artículos y comentarios.
+
+El contenido se limpia al guardarlo (Article.save / Comment.save) con un
+`bleach.Cleaner` reutilizable: listas de etiquetas y atributos permitidos,
+estilos CSS filtrados con ALLOWED_STYLES y sin comentarios HTML. Junto al
+contenido se guarda `content_hash`, el hash del HTML ya limpio, de modo que
+volver a guardar el mismo contenido no lo analiza de nuevo.
+
+Además se memorizan en el proceso los resultados usados más recientemente
+(LRU) por hash del HTML de entrada, para los contenidos repetidos (citas,
+republicaciones). La memoria está limitada por el tamaño total del HTML guardado.
+
+Al cambiar las listas de permitidos hay que incrementar SANITIZER_VERSION (los
+hashes guardados dejan de coincidir) y ejecutar `manage.py sanitize_content`.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+
+SANITIZER_VERSION = 1
+
+ALLOWED_TAGS = [
+    'a', 'abbr', 'acronym', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul'
+]
+
+ALLOWED_ATTRIBUTES = {
+    '*': ['class', 'style'],
+    'a': ['href', 'title', 'target'],
+    'abbr': ['title'],
+    'acronym': ['title'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'table': ['width', 'border', 'align', 'cellpadding', 'cellspacing'],
+    'td': ['width', 'align', 'valign'],
+    'th': ['width', 'align', 'valign', 'scope'],
+}
+
+ALLOWED_STYLES = [
+    'color', 'background-color', 'font-size', 'text-align', 'margin', 'margin-left', 'margin-right',
+    'width', 'height', 'font-weight', 'font-style', 'text-decoration', 'border', 'padding', 'padding-left',
+    'padding-right'
+]
+
+# Caracteres de HTML limpio memorizados por proceso (unos 2 MB); los
+# contenidos más grandes que una cuarta parte no se memorizan
+MEMO_MAX_CHARS = 2_000_000
+MEMO_MAX_ENTRY_CHARS = MEMO_MAX_CHARS // 4
+
+_local = threading.local()
+_memo = OrderedDict()
+_memo_chars = 0
+_memo_lock = threading.Lock()
+
+
+def get_cleaner():
+    """
+    Cleaner del hilo actual (bleach.Cleaner no es seguro entre hilos)
+    """
+    cleaner = getattr(_local, 'cleaner', None)
+    if cleaner is None:
+        cleaner = bleach.Cleaner(
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            css_sanitizer=CSSSanitizer(allowed_css_properties=ALLOWED_STYLES),
+            strip=True,
+            strip_comments=True,
+        )
+        _local.cleaner = cleaner
+    return cleaner
+
+
+def content_hash(value):
+    return hashlib.sha256(f'{SANITIZER_VERSION}:{value}'.encode('utf-8')).hexdigest()
+
+
+def _recall(digest):
+    with _memo_lock:
+        cleaned = _memo.get(digest)
+        if cleaned is not None:
+            _memo.move_to_end(digest)
+        return cleaned
+
+
+def _remember(digest, cleaned):
+    global _memo_chars
+    if len(cleaned) > MEMO_MAX_ENTRY_CHARS:
+        return
+    with _memo_lock:
+        previous = _memo.pop(digest, None)
+        if previous is not None:
+            _memo_chars -= len(previous)
+        _memo[digest] = cleaned
+        _memo_chars += len(cleaned)
+        while _memo_chars > MEMO_MAX_CHARS:
+            _, evicted = _memo.popitem(last=False)
+            _memo_chars -= len(evicted)
+
+
+def sanitize_content(value, stored_hash=''):
+    """
+    Devuelve (html_limpio, hash del html limpio). Si `value` coincide con el
+    contenido ya limpio guardado (`stored_hash`) no se vuelve a analizar.
+    """
+    value = value or ''
+    digest = content_hash(value)
+    if digest == stored_hash:
+        return value, stored_hash
+
+    cleaned = _recall(digest)
+    if cleaned is None:
+        cleaned = get_cleaner().clean(value)
+        _remember(digest, cleaned)
+
+    cleaned_digest = digest if cleaned == value else content_hash(cleaned)
+    # El HTML limpio es su propio resultado: guardarlo evita limpiarlo otra vez
+    if cleaned_digest != digest:
+        _remember(cleaned_digest, cleaned)
+    return cleaned, cleaned_digest
+
+
+def sanitize_html(value):
+    """
+    Sanitizar el contenido HTML para prevenir ataques XSS y limpiar información de depuración
+    """
+    return sanitize_content(value)[0]
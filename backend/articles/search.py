@@ -0,0 +1,222 @@
+"""
+Búsqueda de texto completo sobre artículos.
+
+Cada artículo guarda en `search_document` una versión en texto plano de su
+título, etiquetas y contenido (sin HTML). Sobre esa columna:
+
+- En PostgreSQL se usa un índice GIN sobre `to_tsvector('es_unaccent', ...)`,
+  una configuración de búsqueda en español que además elimina acentos.
+- En SQLite (desarrollo local) se usa una tabla virtual FTS5 que se mantiene
+  desde las señales del modelo.
+- En cualquier otro motor se recurre a un `icontains` sobre `search_document`.
+"""
+import html
+import logging
+import re
+
+from django.db import connections
+from django.db.models import Case, FloatField, Q, TextField, Value, When
+from django.utils.html import escape, strip_tags
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_CONFIG = 'es_unaccent'
+SQLITE_FTS_TABLE = 'articles_article_fts'
+
+# Máximo de coincidencias que se ordenan por relevancia en SQLite. Las
+# coincidencias se traen de FTS5 a Python para anotar rango y fragmento, así
+# que una búsqueda en SQLite devuelve como mucho los SQLITE_MAX_MATCHES
+# artículos más relevantes (y el count de la paginación no pasa de ahí).
+# Si se alcanza el límite se registra un aviso.
+SQLITE_MAX_MATCHES = 500
+
+logger = logging.getLogger(__name__)
+
+# Marcadores internos para resaltar coincidencias; se sustituyen por <mark>
+# después de escapar el fragmento, de modo que el texto nunca se interpreta como HTML
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_STOP = '\x03'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def html_to_text(value):
+    """
+    Convierte HTML en texto plano normalizado para indexar
+    """
+    if not value:
+        return ''
+    text = html.unescape(strip_tags(value))
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def render_snippet(value):
+    """
+    Escapa un fragmento devuelto por el motor de búsqueda y resalta las coincidencias con <mark>
+    """
+    if not value:
+        return None
+    return (
+        escape(value)
+        .replace(_HIGHLIGHT_START, '<mark>')
+        .replace(_HIGHLIGHT_STOP, '</mark>')
+    )
+
+
+# Resultado de comprobar si existe la tabla FTS5, por base de datos
+_fts_available = {}
+
+
+def _uses_sqlite_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[key] = SQLITE_FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[key]
+
+
+def index_article(article_id, document, using='default'):
+    """
+    Actualiza la entrada del artículo en el índice FTS5 (solo SQLite; en
+    PostgreSQL el índice es de expresión y se mantiene solo).
+    """
+    connection = connections[using]
+    if not _uses_sqlite_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [article_id])
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document) VALUES (%s, %s)',
+            [article_id, document or ''],
+        )
+
+
+def unindex_article(article_id, using='default'):
+    connection = connections[using]
+    if not _uses_sqlite_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [article_id])
+
+
+def rebuild_sqlite_index(using='default'):
+    """
+    Vuelve a llenar la tabla FTS5 a partir de `articles_article.search_document`
+    """
+    connection = connections[using]
+    if not _uses_sqlite_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_document) '
+            'SELECT id, search_document FROM articles_article'
+        )
+
+
+def _fts5_query(terms):
+    """
+    Construye una consulta FTS5 segura: cada palabra se entrecomilla (para que
+    no se interprete la sintaxis de FTS5) y se busca como prefijo.
+    """
+    tokens = _TOKEN_RE.findall(terms)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _search_postgresql(queryset, terms):
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+    vector = SearchVector('search_document', config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search_vector=vector,
+    ).filter(
+        search_vector=query,
+    ).annotate(
+        search_rank=SearchRank(vector, query),
+        search_snippet=SearchHeadline(
+            'search_document',
+            query,
+            config=SEARCH_CONFIG,
+            start_sel=_HIGHLIGHT_START,
+            stop_sel=_HIGHLIGHT_STOP,
+            max_words=30,
+            min_words=15,
+        ),
+    ).order_by('-search_rank', '-created_at')
+
+
+def _search_sqlite(queryset, terms):
+    match = _fts5_query(terms)
+    if not match:
+        return queryset.none()
+
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({SQLITE_FTS_TABLE}), '
+            f"snippet({SQLITE_FTS_TABLE}, 0, %s, %s, '…', 24) "
+            f'FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({SQLITE_FTS_TABLE}) LIMIT %s',
+            [_HIGHLIGHT_START, _HIGHLIGHT_STOP, match, SQLITE_MAX_MATCHES],
+        )
+        matches = cursor.fetchall()
+
+    if not matches:
+        return queryset.none()
+    if len(matches) >= SQLITE_MAX_MATCHES:
+        logger.warning(
+            'La búsqueda %r alcanza el límite de %d coincidencias en SQLite; '
+            'el resto de resultados no se devuelve', match, SQLITE_MAX_MATCHES,
+        )
+
+    # bm25() devuelve valores negativos: cuanto menor, más relevante
+    return queryset.filter(pk__in=[row[0] for row in matches]).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(-rank)) for pk, rank, _ in matches],
+            output_field=FloatField(),
+        ),
+        search_snippet=Case(
+            *[When(pk=pk, then=Value(snippet)) for pk, _, snippet in matches],
+            output_field=TextField(),
+        ),
+    ).order_by('-search_rank', '-created_at')
+
+
+def _search_fallback(queryset, terms):
+    condition = Q()
+    for token in _TOKEN_RE.findall(terms):
+        condition &= Q(search_document__icontains=token)
+    return queryset.filter(condition)
+
+
+def search_articles(queryset, terms):
+    """
+    Filtra un queryset de artículos por texto libre y lo ordena por relevancia.
+
+    En PostgreSQL y SQLite los artículos resultantes llevan las anotaciones
+    `search_rank` y `search_snippet` (fragmento con las coincidencias resaltadas).
+    """
+    terms = (terms or '').strip()
+    if not terms:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, terms)
+    if _uses_sqlite_fts(connection):
+        return _search_sqlite(queryset, terms)
+    return _search_fallback(queryset, terms)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Sustituye a SearchFilter de DRF usando el índice de texto completo.
+    Usa el mismo parámetro `?search=` para no romper a los clientes existentes.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        return search_articles(queryset, request.query_params.get(self.search_param, ''))
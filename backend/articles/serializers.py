@@ -1,64 +1,19 @@
 from rest_framework import serializers
 import json
-import bleach
-import re
 from django.conf import settings
-from .models import Article, Tag, Rating, Comment
+from .models import Article, Tag, Rating, Comment, save_rating
+from .search import render_snippet
 from users.serializers import UserSerializer
 from users.models import User
-from django.db.models import Avg, Count
+from destinations.serializers import ContinentSerializer
+from blog_viaje.sparse import SparseFieldsMixin
 
-# Configuraciones para sanitizar el HTML
-ALLOWED_TAGS = [
-    'a', 'abbr', 'acronym', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-    'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul'
-]
-
-ALLOWED_ATTRIBUTES = {
-    '*': ['class', 'style'],
-    'a': ['href', 'title', 'target'],
-    'abbr': ['title'],
-    'acronym': ['title'],
-    'img': ['src', 'alt', 'title', 'width', 'height'],
-    'table': ['width', 'border', 'align', 'cellpadding', 'cellspacing'],
-    'td': ['width', 'align', 'valign'],
-    'th': ['width', 'align', 'valign', 'scope'],
-}
-
-ALLOWED_STYLES = [
-    'color', 'background-color', 'font-size', 'text-align', 'margin', 'margin-left', 'margin-right',
-    'width', 'height', 'font-weight', 'font-style', 'text-decoration', 'border', 'padding', 'padding-left',
-    'padding-right'
-]
-
-# Función común para sanitizar HTML
-def sanitize_html(value):
-    """
-    Sanitizar el contenido HTML para prevenir ataques XSS y limpiar información de depuración
-    """
-    # Eliminar comentarios HTML que pueden contener información de depuración
-    value = re.sub(r'<!--(.*?)-->', '', value, flags=re.DOTALL)
-    
-    # Eliminar atributos de data- que pueden contener información de depuración
-    value = re.sub(r' data-[a-zA-Z0-9\-_]+="[^"]*"', '', value)
-    
-    # Sanitizar el HTML
-    clean_value = bleach.clean(
-        value,
-        tags=ALLOWED_TAGS,
-        attributes=ALLOWED_ATTRIBUTES,
-        strip=True
-    )
-    
-    # Verificar que el HTML sea válido y corregir posibles etiquetas mal formadas
-    return clean_value
-
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     display_name = serializers.SerializerMethodField()
     
     class Meta:
@@ -81,11 +36,8 @@ class CommentSerializer(serializers.ModelSerializer):
     
     def get_author_name(self, obj):
         return obj.user.get_full_name()
-    
-    def validate_content(self, value):
-        return sanitize_html(value)
 
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     tag_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -110,6 +62,13 @@ class ArticleSerializer(serializers.ModelSerializer):
             'avg_rating', 'ratings_count', 'is_destination', 'continent', 'continent_name'
         ]
         read_only_fields = ['author', 'slug', 'created_at', 'updated_at']
+        # ?expand=continent devuelve el continente como objeto en lugar de su id
+        expandable_fields = {
+            'continent': lambda: ContinentSerializer(read_only=True),
+        }
+        method_field_sources = {
+            'continent_name': ['continent'],
+        }
     
     def get_continent_name(self, obj):
         """
@@ -239,15 +198,32 @@ class ArticleSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         
-        # Agregar calificaciones si no están presentes
-        if 'avg_rating' not in representation or representation['avg_rating'] is None:
-            representation['avg_rating'] = instance.ratings.aggregate(avg=Avg('score'))['avg']
-            
-        if 'ratings_count' not in representation or representation['ratings_count'] is None:
-            representation['ratings_count'] = instance.ratings.count()
-            
+        # Resultados de búsqueda: relevancia y fragmento con las coincidencias resaltadas
+        if hasattr(instance, 'search_rank'):
+            representation['search_rank'] = instance.search_rank
+            representation['search_snippet'] = render_snippet(getattr(instance, 'search_snippet', None))
+        
         return representation
 
+class ArticleListSerializer(ArticleSerializer):
+    """
+    Representación para tarjetas de listados: el resumen precalculado al
+    guardar (extracto, palabras, tiempo de lectura, primera imagen) en lugar
+    del HTML completo de `content`.
+    """
+    class Meta(ArticleSerializer.Meta):
+        fields = [
+            'id', 'title', 'slug', 'excerpt', 'word_count', 'reading_time', 'image', 'first_image',
+            'author', 'tags', 'created_at', 'updated_at',
+            'avg_rating', 'ratings_count', 'is_destination', 'continent', 'continent_name'
+        ]
+        read_only_fields = fields
+        # ?expand=content añade el HTML completo
+        expandable_fields = {
+            **ArticleSerializer.Meta.expandable_fields,
+            'content': lambda: serializers.CharField(read_only=True),
+        }
+
 class RatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rating
@@ -258,11 +234,6 @@ class RatingSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         article = validated_data.get('article')
         
-        # Check if user has already rated this article
-        try:
-            rating = Rating.objects.get(user=user, article=article)
-            rating.score = validated_data.get('score')
-            rating.save()
-            return rating
-        except Rating.DoesNotExist:
-            return Rating.objects.create(user=user, **validated_data) 
\ No newline at end of file
+        # Crea o actualiza la valoración manteniendo los agregados del artículo
+        rating, created = save_rating(user, article, validated_data.get('score'))
+        return rating
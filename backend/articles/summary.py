@@ -0,0 +1,42 @@
+"""
+Campos derivados del contenido de un artículo para las tarjetas de los
+listados: extracto en texto plano, número de palabras, tiempo de lectura y
+primera imagen del contenido. Se calculan al guardar (Article.save) para que
+los listados no tengan que enviar ni procesar el HTML completo.
+"""
+import math
+import re
+
+from .search import html_to_text
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+# El contenido ya está sanitizado: bleach siempre escribe los atributos con comillas dobles
+_IMAGE_SRC_RE = re.compile(r'<img\b[^>]*?\ssrc="([^"]+)"', re.IGNORECASE)
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """
+    Recorta el texto a `length` caracteres sin partir palabras
+    """
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0].rstrip(' ,;:.-')
+    return f'{cut or text[:length]}…'
+
+
+def summarize_content(content):
+    """
+    Devuelve los campos derivados del HTML (sanitizado) de un artículo
+    """
+    text = html_to_text(content)
+    word_count = len(_WORD_RE.findall(text))
+    image = _IMAGE_SRC_RE.search(content or '')
+    return {
+        'excerpt': make_excerpt(text),
+        'word_count': word_count,
+        'reading_time': math.ceil(word_count / WORDS_PER_MINUTE) if word_count else 0,
+        'first_image': image.group(1)[:500] if image else '',
+    }
@@ -1,3 +1,418 @@
+import io
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from redis import RedisError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from destinations.models import Continent, Destination
+from users.models import User
+from .cache import (
+    MAX_SPARSE_VARIANTS, article_detail_cache_key, cache_article_detail, get_cached_article_detail,
+    get_detail_variant,
+)
+from .content_io import ContentImporter, export_content
+from .leaderboard import POPULAR, RedisLeaderboard, rebuild_leaderboards, top_articles
+from .models import Article, Rating, Tag, save_rating
+from .sanitize import sanitize_html
+from .serializers import ArticleSerializer
+
+try:
+    import fakeredis
+except ImportError:  # fakeredis está en requirements-dev.txt
+    fakeredis = None
+
+
+class SparseFieldsTests(TestCase):
+    """
+    ?fields=, ?omit= y ?expand= (blog_viaje.sparse): contenido de la respuesta
+    y consultas que ejecuta el listado y el detalle de artículos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='autora@example.com', password='x', first_name='Ana')
+        cls.continent = Continent.objects.create(name='Europa', slug='europa')
+        tags = [Tag.objects.create(name=f'tag{i}', slug=f'tag{i}') for i in range(2)]
+        cls.articles = []
+        for i in range(3):
+            article = Article.objects.create(
+                title=f'Artículo {i}',
+                slug=f'articulo-{i}',
+                author=cls.author,
+                content=f'<p>Contenido del artículo {i}</p>',
+                continent=cls.continent,
+            )
+            article.tags.set(tags)
+            cls.articles.append(article)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url, queries):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), queries, [q['sql'] for q in context.captured_queries])
+        return response.json(), [query['sql'] for query in context.captured_queries]
+
+    def test_fields_selects_only_requested_columns(self):
+        data, queries = self.get('/api/articles/?fields=id,title', queries=2)
+        for item in data['results']:
+            self.assertEqual(set(item), {'id', 'title'})
+        # Sin join con autor ni prefetch de tags, y sin columnas pesadas
+        select = queries[-1]
+        self.assertNotIn('users_user', select)
+        self.assertNotIn('"excerpt"', select)
+
+    def test_omit_drops_fields_and_their_prefetch(self):
+        data, _ = self.get('/api/articles/?omit=tags,author', queries=2)
+        item = data['results'][0]
+        self.assertNotIn('tags', item)
+        self.assertNotIn('author', item)
+        self.assertIn('excerpt', item)
+
+    def test_expand_adds_nested_continent(self):
+        data, _ = self.get('/api/articles/?fields=id&expand=continent', queries=2)
+        self.assertEqual(
+            data['results'][0]['continent'],
+            {'id': self.continent.pk, 'name': 'Europa', 'slug': 'europa'},
+        )
+
+    def test_expand_content_on_list_does_not_add_queries(self):
+        data, _ = self.get('/api/articles/?fields=id&expand=content', queries=2)
+        self.assertIn('Contenido del artículo', data['results'][0]['content'])
+
+    def test_dotted_fields_apply_to_nested_serializers(self):
+        data, _ = self.get('/api/articles/?fields=id,tags.name,author.email', queries=3)
+        item = data['results'][0]
+        self.assertEqual(set(item), {'id', 'tags', 'author'})
+        self.assertEqual(item['tags'], [{'name': 'tag0'}, {'name': 'tag1'}])
+        self.assertEqual(item['author'], {'email': 'autora@example.com'})
+
+    def test_dotted_omit_keeps_the_nested_field(self):
+        data, _ = self.get('/api/articles/?fields=id,tags&omit=tags.slug', queries=3)
+        for tag in data['results'][0]['tags']:
+            self.assertEqual(set(tag), {'id', 'name'})
+
+    def test_unknown_names_are_ignored(self):
+        full, _ = self.get('/api/articles/', queries=3)
+        data, _ = self.get('/api/articles/?fields=nope&omit=nada&expand=tampoco', queries=3)
+        self.assertEqual(data, full)
+
+    def test_detail_trims_query(self):
+        article = self.articles[0]
+        data, queries = self.get(f'/api/articles/{article.slug}/?fields=id,title&expand=continent', queries=1)
+        self.assertEqual(set(data), {'id', 'title', 'continent'})
+        self.assertNotIn('"content"', queries[0])
+
+    def detail_variant(self, query):
+        request = Request(APIRequestFactory().get(f'/api/articles/articulo-0/{query}'))
+        return get_detail_variant(request, ArticleSerializer)
+
+    def test_unknown_names_do_not_create_cache_variants(self):
+        plain = self.detail_variant('')
+        self.assertEqual(self.detail_variant('?fields=a'), plain)
+        self.assertEqual(self.detail_variant('?fields=b&expand=c.d'), plain)
+        self.assertEqual(self.detail_variant('?fields=title,bogus'), self.detail_variant('?fields=title'))
+
+    def test_sparse_variants_do_not_evict_full_variant(self):
+        key = article_detail_cache_key(self.articles[0].slug)
+        plain = self.detail_variant('')
+        cache_article_detail(key, plain, {'id': 1})
+        for i in range(MAX_SPARSE_VARIANTS * 2):
+            cache_article_detail(key, f'{plain}?fields={i}', {'id': 1})
+        self.assertIsNotNone(get_cached_article_detail(key, plain))
+
+
+class RatingAggregateTests(TestCase):
+    """
+    avg_rating y ratings_count se mantienen al valorar, cambiar y borrar valoraciones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='autora@example.com', password='x')
+        cls.readers = [User.objects.create_user(email=f'lector{i}@example.com', password='x') for i in range(2)]
+        cls.article = Article.objects.create(title='Lisboa', slug='lisboa', author=cls.author, content='<p>Lisboa</p>')
+
+    def aggregates(self):
+        self.article.refresh_from_db()
+        return self.article.avg_rating, self.article.ratings_count
+
+    def test_save_rating_creates_and_updates(self):
+        save_rating(self.readers[0], self.article, 4)
+        save_rating(self.readers[1], self.article, 2)
+        self.assertEqual(self.aggregates(), (3.0, 2))
+        save_rating(self.readers[0], self.article, 5)
+        self.assertEqual(self.aggregates(), (3.5, 2))
+
+    def test_deleting_rating_discounts_it(self):
+        save_rating(self.readers[0], self.article, 4)
+        save_rating(self.readers[1], self.article, 2)
+        Rating.objects.get(user=self.readers[0]).delete()
+        self.assertEqual(self.aggregates(), (2.0, 1))
+        Rating.objects.get(user=self.readers[1]).delete()
+        self.assertEqual(self.aggregates(), (None, 0))
+
+    def test_deleting_article_does_not_update_it_per_rating(self):
+        for reader in self.readers:
+            save_rating(reader, self.article, 3)
+        with CaptureQueriesContext(connection) as context:
+            self.article.delete()
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE "articles_article"')]
+        self.assertEqual(updates, [])
+
+    def test_rate_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.readers[0])
+        response = client.post(f'/api/articles/{self.article.slug}/rate/', {'score': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.aggregates(), (5.0, 1))
+        response = client.post(f'/api/articles/{self.article.slug}/rate/', {'score': 9}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ArticleDetailCacheTests(TestCase):
+    """
+    Cache del detalle: ETag/304, invalidación al confirmar cambios del artículo
+    o de lo que muestra (valoraciones, tags, autor, continente)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='autora@example.com', password='x', first_name='Ana')
+        cls.reader = User.objects.create_user(email='lector@example.com', password='x')
+        cls.continent = Continent.objects.create(name='Europa', slug='europa')
+        cls.tag = Tag.objects.create(name='Playas', slug='playas')
+        cls.article = Article.objects.create(
+            title='Lisboa', slug='lisboa', author=cls.author, content='<p>Lisboa</p>', continent=cls.continent,
+        )
+        cls.article.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/articles/{self.article.slug}/'
+
+    def test_cached_detail_is_served_without_queries(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_rating_invalidates_detail(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            save_rating(self.reader, self.article, 4)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ratings_count'], 1)
+
+    def test_related_changes_invalidate_detail(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            continent = Continent.objects.get(pk=self.continent.pk)
+            continent.name = 'Europa occidental'
+            continent.save()
+        self.assertEqual(self.client.get(self.url).json()['continent_name'], 'Europa occidental')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author = User.objects.get(pk=self.author.pk)
+            author.first_name = 'Ana María'
+            author.save()
+        self.assertEqual(self.client.get(self.url).json()['author']['display_name'], 'Ana María')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.get(pk=self.tag.pk)
+            tag.slug = 'playas-y-costas'
+            tag.save()
+        self.assertEqual(self.client.get(self.url).json()['tags'][0]['slug'], 'playas-y-costas')
+
+    def test_unrelated_user_save_keeps_detail(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            author = User.objects.get(pk=self.author.pk)
+            author.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_fill_started_before_invalidation_is_not_served(self):
+        # Una petición lee la clave, otra invalida y la primera guarda datos viejos
+        key = article_detail_cache_key(self.article.slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            save_rating(self.reader, self.article, 4)
+        variant = get_detail_variant(Request(APIRequestFactory().get(self.url)), ArticleSerializer)
+        cache_article_detail(key, variant, {'stale': True})
+        self.assertNotIn('stale', self.client.get(self.url).json())
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='autora@example.com', password='x')
+        for i in range(5):
+            Article.objects.create(title=f'Artículo {i}', slug=f'articulo-{i}', author=author, content='<p>Texto</p>')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_cursor_pages_cover_every_article_once(self):
+        url = '/api/articles/?pagination=cursor&page_size=2&fields=id'
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(sorted(seen), sorted(Article.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_search_forces_page_number_pagination(self):
+        data = self.client.get('/api/articles/?pagination=cursor&search=texto').json()
+        self.assertIn('count', data)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='autora@example.com', password='x')
+        cls.mountains = Article.objects.create(
+            title='Rutas por la montaña', slug='montana', author=author, content='<p>Subida al <b>Teide</b></p>',
+        )
+        cls.beach = Article.objects.create(title='Playas', slug='playas', author=author, content='<p>Arena y sol</p>')
+
+    def search(self, terms):
+        data = APIClient().get('/api/articles/', {'search': terms}).json()
+        return data['results']
+
+    def test_matches_ignore_accents_and_html(self):
+        results = self.search('montana teide')
+        self.assertEqual([item['id'] for item in results], [self.mountains.pk])
+        self.assertIn('<mark>', results[0]['search_snippet'])
+
+    def test_rename_updates_index(self):
+        self.beach.title = 'Calas escondidas'
+        self.beach.save()
+        self.assertEqual([item['id'] for item in self.search('calas')], [self.beach.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search('glaciar'), [])
+
+
+class SanitizerTests(TestCase):
+    def test_strips_scripts_and_event_handlers(self):
+        cleaned = sanitize_html('<p onclick="robar()">Hola<script>alert(1)</script></p><a href="javascript:x">a</a>')
+        self.assertNotIn('script', cleaned)
+        self.assertNotIn('onclick', cleaned)
+        self.assertNotIn('javascript:', cleaned)
+        self.assertIn('<p>Hola', cleaned)
+
+    def test_article_content_is_sanitized_on_save(self):
+        author = User.objects.create_user(email='autora@example.com', password='x')
+        article = Article.objects.create(
+            title='XSS', slug='xss', author=author, content='<p>Texto</p><img src=x onerror="alert(1)">',
+        )
+        self.assertNotIn('onerror', article.content)
+        self.assertTrue(article.content_hash)
+
+
+class ContentRoundTripTests(TestCase):
+    """
+    Exportar a NDJSON e importar en una base de datos vacía conserva el contenido
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='autora@example.com', password='x')
+        continent = Continent.objects.create(name='Asia', slug='asia')
+        article = Article.objects.create(
+            title='Kioto', slug='kioto', author=cls.author, content='<p>Templos</p>', continent=continent,
+        )
+        article.tags.add(Tag.objects.create(name='Cultural', slug='cultural'))
+        Destination.objects.create(
+            name='Hanói', slug='hanoi', description='Ciudad', country='Vietnam', city='Hanói', continent=continent,
+        )
+
+    def snapshot(self):
+        return (
+            list(Article.objects.values_list('slug', 'title', 'content', 'author__email', 'continent__slug')),
+            list(Article.tags.through.objects.values_list('article__slug', 'tag__slug')),
+            sorted(Destination.objects.values_list('slug', 'name', 'continent__slug')),
+        )
+
+    def test_round_trip(self):
+        before = self.snapshot()
+        stream = io.StringIO()
+        counts = export_content(stream)
+        self.assertEqual(counts, {'article': 1, 'destination': 1})
+
+        Article.objects.all().delete()
+        Destination.objects.all().delete()
+        Tag.objects.all().delete()
+        Continent.objects.all().delete()
+
+        importer = ContentImporter()
+        importer.run(io.StringIO(stream.getvalue()))
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(self.snapshot(), before)
+
+    def test_invalid_lines_are_reported(self):
+        importer = ContentImporter()
+        importer.run(io.StringIO('no es json\n{"type": "article"}\n'))
+        self.assertEqual([line for line, _ in importer.errors], [1, 2])
+
+
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='autora@example.com', password='x')
+        readers = [User.objects.create_user(email=f'lector{i}@example.com', password='x') for i in range(2)]
+        cls.articles = [
+            Article.objects.create(title=f'Artículo {i}', slug=f'articulo-{i}', author=author, content='<p>x</p>')
+            for i in range(3)
+        ]
+        save_rating(readers[0], cls.articles[0], 3)
+        save_rating(readers[0], cls.articles[1], 5)
+        save_rating(readers[1], cls.articles[1], 4)
+
+    def setUp(self):
+        rebuild_leaderboards()
+
+    def expected(self):
+        # Mayor media primero, sin valoraciones al final
+        return [self.articles[1].pk, self.articles[0].pk, self.articles[2].pk]
+
+    def test_popular_order(self):
+        self.assertEqual([article_id for article_id, _ in top_articles(POPULAR, 3)], self.expected())
+
+    def test_redis_errors_fall_back_to_database(self):
+        with mock.patch('articles.leaderboard.get_leaderboard', side_effect=RedisError('caído')):
+            with self.assertLogs('articles.leaderboard', 'ERROR'):
+                ranked = top_articles(POPULAR, 3)
+        self.assertEqual([article_id for article_id, _ in ranked], self.expected())
 
-# Create your tests here.
+    @mock.patch('articles.leaderboard._leaderboard', None)
+    def test_evicted_redis_board_is_rebuilt(self):
+        if fakeredis is None:
+            self.skipTest('fakeredis no está instalado')
+        board = RedisLeaderboard(fakeredis.FakeRedis())
+        with mock.patch('articles.leaderboard._get_backend', return_value=board):
+            self.assertEqual([article_id for article_id, _ in top_articles(POPULAR, 3)], self.expected())
+            board.redis.delete(board.board_key(POPULAR))
+            # Una actualización posterior no la da por completa
+            board.set_score(POPULAR, self.articles[2].pk, 1)
+            self.assertFalse(board.is_ready())
+            self.assertEqual([article_id for article_id, _ in top_articles(POPULAR, 3)], self.expected())
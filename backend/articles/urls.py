@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     ArticleListView,
+    TrendingArticleListView,
     ArticleDetailView,
     ArticleCreateView,
     ArticleUpdateView,
@@ -17,6 +18,7 @@ from .views import (
 urlpatterns = [
     path('', ArticleListView.as_view(), name='article-list'),
     path('create/', ArticleCreateView.as_view(), name='article-create'),
+    path('trending/', TrendingArticleListView.as_view(), name='article-trending'),
     path('tags/', TagListView.as_view(), name='tag-list'),
     path('upload-image/', RichTextImageUploadView.as_view(), name='rich-text-image-upload'),
     path('editor-config/', RichTextEditorConfigView.as_view(), name='rich-text-editor-config'),
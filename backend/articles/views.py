@@ -4,21 +4,26 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg, Count
-from .models import Article, Tag, Rating, Comment
+from .models import Article, Tag, Rating, Comment, save_rating
 from .serializers import (
     ArticleSerializer, 
+    ArticleListSerializer,
     TagSerializer, 
     RatingSerializer,
     CommentSerializer,
-    ALLOWED_TAGS,
-    ALLOWED_ATTRIBUTES,
-    ALLOWED_STYLES,
 )
+from .sanitize import ALLOWED_TAGS, ALLOWED_ATTRIBUTES, ALLOWED_STYLES
 from .permissions import IsAuthorOrReadOnly, CanCreateContent
+from .pagination import OptionalCursorPaginationMixin
+from .search import FullTextSearchFilter
 from django_summernote.utils import get_attachment_model
 from django.conf import settings
 from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .cache import article_detail_cache_key, cache_article_detail, get_cached_article_detail, get_detail_variant
+from .leaderboard import POPULAR, TRENDING, top_articles
+from blog_viaje.sparse import SparseQuerysetMixin
 
 # Vista para obtener la configuración del editor de texto enriquecido
 class RichTextEditorConfigView(APIView):
@@ -89,36 +94,79 @@ class RichTextEditorDocsView(APIView):
 
 # Create your views here.
 
-class ArticleListView(generics.ListAPIView):
-    serializer_class = ArticleSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['title', 'content', 'tags__name']
+class ArticleListView(SparseQuerysetMixin, OptionalCursorPaginationMixin, generics.ListAPIView):
+    """
+    Listado de artículos. Con ?search= los resultados se ordenan por relevancia
+    y siempre se paginan por número de página (?pagination=cursor se ignora).
+    """
+    serializer_class = ArticleListSerializer
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
+    cursor_incompatible_params = (FullTextSearchFilter.search_param,)
     filterset_fields = ['tags__slug']
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
-        queryset = Article.objects.all().annotate(
-            avg_rating=Avg('ratings__score'),
-            ratings_count=Count('ratings')
-        )
+        queryset = Article.objects.for_cards()
         
         # Filtrar por tags si se proporciona en la URL
         tags = self.request.query_params.getlist('tags')
         if tags:
             queryset = queryset.filter(tags__slug__in=tags).distinct()
         
-        return queryset
+        return self.trim_queryset(queryset)
 
-class ArticleDetailView(generics.RetrieveAPIView):
-    queryset = Article.objects.all()
+class TrendingArticleListView(SparseQuerysetMixin, generics.ListAPIView):
+    """
+    Artículos en tendencia (o los más populares con ?board=popular) leídos de
+    la clasificación precalculada, sin paginar. ?limit= entre 1 y 50.
+    """
+    serializer_class = ArticleListSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    default_limit = 10
+    max_limit = 50
+    
+    def get_queryset(self):
+        board = POPULAR if self.request.query_params.get('board') == POPULAR else TRENDING
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = min(max(limit, 1), self.max_limit)
+        
+        ranked = [article_id for article_id, _ in top_articles(board, limit)]
+        articles = self.trim_queryset(Article.objects.for_cards()).in_bulk(ranked)
+        return [articles[article_id] for article_id in ranked if article_id in articles]
+
+class ArticleDetailView(SparseQuerysetMixin, generics.RetrieveAPIView):
+    queryset = Article.objects.with_related()
     serializer_class = ArticleSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
     
-    def get_queryset(self):
-        return Article.objects.all().annotate(
-            avg_rating=Avg('ratings__score'),
-            ratings_count=Count('ratings')
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Sirve el detalle desde la cache cuando es posible y responde 304 si el
+        cliente ya tiene la versión actual (If-None-Match / If-Modified-Since).
+        """
+        key = article_detail_cache_key(kwargs[self.lookup_field])
+        variant = get_detail_variant(request, self.get_serializer_class())
+        entry = get_cached_article_detail(key, variant)
+        
+        if entry is None:
+            instance = self.get_object()
+            entry = cache_article_detail(key, variant, self.get_serializer(instance).data)
+        
+        response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        
+        # Devuelve un 304 (conservando ETag y Last-Modified) o la propia respuesta
+        return get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=entry['last_modified'],
+            response=response,
         )
 
 class ArticleCreateView(generics.CreateAPIView):
@@ -127,7 +175,7 @@ class ArticleCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, CanCreateContent]
 
 class ArticleUpdateView(generics.UpdateAPIView):
-    queryset = Article.objects.all()
+    queryset = Article.objects.with_related()
     serializer_class = ArticleSerializer
     lookup_field = 'slug'
     permission_classes = [IsAuthorOrReadOnly]
@@ -152,7 +200,7 @@ class ArticleDeleteView(generics.DestroyAPIView):
         else:
             raise Http404("Se requiere un ID o slug para eliminar el artículo")
 
-class TagListView(generics.ListAPIView):
+class TagListView(SparseQuerysetMixin, generics.ListAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny]
@@ -174,11 +222,8 @@ class RateArticleView(generics.CreateAPIView):
                 )
             
             # Actualizar rating si ya existe, si no, crear uno nuevo
-            rating, created = Rating.objects.update_or_create(
-                user=request.user,
-                article=article,
-                defaults={'score': score}
-            )
+            # (los agregados del artículo se ajustan en la misma transacción)
+            rating, created = save_rating(request.user, article, score)
             
             serializer = self.get_serializer(rating)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -189,13 +234,13 @@ class RateArticleView(generics.CreateAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-class CommentListView(generics.ListAPIView):
+class CommentListView(OptionalCursorPaginationMixin, generics.ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
         slug = self.kwargs.get('slug')
-        return Comment.objects.filter(article__slug=slug)
+        return Comment.objects.filter(article__slug=slug).select_related('user')
 
 class CommentCreateView(generics.CreateAPIView):
     serializer_class = CommentSerializer
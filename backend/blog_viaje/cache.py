@@ -0,0 +1,10 @@
+from django.conf import settings
+
+
+def namespaced_key(namespace, *parts):
+    """
+    Construye una clave de cache con el espacio de nombres de una aplicación
+    y su versión (settings.CACHE_NAMESPACES), p. ej. 'articles:v1:detail:mi-slug'.
+    """
+    version = settings.CACHE_NAMESPACES.get(namespace, 1)
+    return ':'.join([namespace, f'v{version}', *(str(part) for part in parts)])
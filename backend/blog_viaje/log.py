@@ -0,0 +1,90 @@
+"""
+Piezas de la configuración de logging del proyecto (settings.LOGGING).
+
+- QueueStreamHandler: el hilo que registra el mensaje solo lo encola; un hilo
+  en segundo plano (QueueListener) lo formatea y lo escribe en stderr, así las
+  escrituras no bloquean la petición.
+- JsonFormatter: una línea JSON por registro, con los campos pasados en
+  `extra` (p. ej. las métricas de blog_viaje.metrics).
+- SamplingFilter: deja pasar solo una fracción de los registros de nivel bajo
+  (DEBUG por defecto) para los eventos de mucho volumen; los de nivel superior
+  pasan siempre.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Atributos estándar de LogRecord; el resto son campos añadidos con `extra`
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    QueueHandler con su propio QueueListener hacia un StreamHandler. El
+    formatter y el nivel configurados se aplican en el hilo del listener.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        # El formato (la parte cara) lo aplica el listener, no quien registra
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Interpola el mensaje (sus argumentos pueden cambiar después) pero deja
+        el formateo y la traza de la excepción para el listener.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            self.target.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(
+            (name, value) for name, value in vars(record).items()
+            if name not in RESERVED_ATTRS and not name.startswith('_')
+        )
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar una fracción `rate` (0-1) de los registros con nivel menor o
+    igual que `level`.
+    """
+
+    def __init__(self, rate=1.0, level='DEBUG'):
+        super().__init__()
+        self.rate = float(rate)
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+
+    def filter(self, record):
+        if record.levelno > self.level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
@@ -0,0 +1,301 @@
+"""
+Métricas por petición: consultas SQL, tiempo en base de datos, aciertos y
+fallos de cache, tiempo de serialización y latencia total.
+
+`RequestMetricsMiddleware` mide cada petición y:
+- añade la cabecera `Server-Timing` (visible en las herramientas del navegador),
+- escribe una línea de log estructurada en el logger 'blog_viaje.requests'
+  (WARNING si supera settings.REQUEST_METRICS_MAX_QUERIES, para detectar N+1),
+- acumula histogramas por ruta (el patrón de la URL, no la URL concreta) que
+  `/api/_metrics` publica en el formato de texto de Prometheus.
+
+Los histogramas son locales al proceso: con varios workers cada uno publica
+los suyos y Prometheus los agrega al consultar.
+
+Los aciertos y fallos de cache los registran los módulos de cache de cada
+aplicación con `record_cache()`.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('blog_viaje.requests')
+
+# Límites (en segundos o número de consultas) de los buckets de los histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_seconds = 0.0
+        self._serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_metrics():
+    """
+    Métricas de la petición en curso (None fuera de una petición)
+    """
+    return _current.get()
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Suma al tiempo de serialización solo el serializador más externo, para no
+    contar dos veces los anidados.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._serializer_depth -= 1
+        if not metrics._serializer_depth:
+            metrics.serializer_seconds += time.perf_counter() - started
+
+
+def _timed_data(data_property):
+    def data(self):
+        with serializer_timer():
+            return data_property.fget(self)
+    return property(data)
+
+
+_serializers_instrumented = False
+
+
+def instrument_serializers():
+    """
+    Mide `serializer.data` (donde DRF ejecuta to_representation) en todos los
+    serializadores sin tener que heredar de una clase propia.
+    """
+    global _serializers_instrumented
+    if _serializers_instrumented:
+        return
+    from rest_framework import serializers
+
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        serializer_class.data = _timed_data(serializer_class.data)
+    _serializers_instrumented = True
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Histogramas y contadores por (método, ruta) del proceso actual
+    """
+
+    histograms = {
+        'http_request_duration_seconds': ('Latencia total de la petición', LATENCY_BUCKETS),
+        'http_request_db_duration_seconds': ('Tiempo en consultas SQL por petición', LATENCY_BUCKETS),
+        'http_request_serializer_duration_seconds': ('Tiempo de serialización por petición', LATENCY_BUCKETS),
+        'http_request_db_queries': ('Consultas SQL por petición', QUERY_COUNT_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.histograms}
+            self._requests = {}
+            self._cache = {}
+
+    def observe(self, method, route, status, metrics, elapsed):
+        labels = (method, route)
+        observations = {
+            'http_request_duration_seconds': elapsed,
+            'http_request_db_duration_seconds': metrics.db_seconds,
+            'http_request_serializer_duration_seconds': metrics.serializer_seconds,
+            'http_request_db_queries': metrics.queries,
+        }
+        with self._lock:
+            for name, value in observations.items():
+                series = self._histograms[name]
+                if labels not in series:
+                    series[labels] = Histogram(self.histograms[name][1])
+                series[labels].observe(value)
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for result, count in (('hit', metrics.cache_hits), ('miss', metrics.cache_misses)):
+                if count:
+                    key = (method, route, result)
+                    self._cache[key] = self._cache.get(key, 0) + count
+
+    def render(self):
+        """
+        Exposición en el formato de texto de Prometheus (versión 0.0.4)
+        """
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Peticiones atendidas', '# TYPE http_requests_total counter']
+            for (method, route, status), count in sorted(self._requests.items()):
+                labels = _labels(method=method, route=route, status=status)
+                lines.append(f'http_requests_total{{{labels}}} {count}')
+
+            lines += ['# HELP http_request_cache_total Lecturas de cache por resultado', '# TYPE http_request_cache_total counter']
+            for (method, route, result), count in sorted(self._cache.items()):
+                labels = _labels(method=method, route=route, result=result)
+                lines.append(f'http_request_cache_total{{{labels}}} {count}')
+
+            for name, (description, _) in self.histograms.items():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for (method, route), histogram in sorted(self._histograms[name].items()):
+                    labels = _labels(method=method, route=route)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{_number(bound)}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+                    lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.total}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return '/' + match.route if match.route else match.view_name or UNMATCHED_ROUTE
+
+
+def _server_timing(metrics, elapsed):
+    return ', '.join([
+        f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+        f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+        f'serializer;dur={metrics.serializer_seconds * 1000:.1f}',
+        f'total;dur={elapsed * 1000:.1f}',
+    ])
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición (ver la documentación del módulo). Debe ir al principio
+    de settings.MIDDLEWARE para que la latencia incluya el resto de middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        elapsed = metrics.elapsed()
+        route = _route(request)
+        registry.observe(request.method, route, response.status_code, metrics, elapsed)
+
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = _server_timing(metrics, elapsed)
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.db_seconds * 1000, 1),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'serializer_ms': round(metrics.serializer_seconds * 1000, 1),
+        }
+        max_queries = getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', None)
+        level = logging.WARNING if max_queries and metrics.queries > max_queries else logging.INFO
+        logger.log(
+            level,
+            ' '.join(f'{name}={value}' for name, value in fields.items()),
+            extra={'request_metrics': fields},
+        )
+        return response
+
+
+def metrics_view(request):
+    """
+    Histogramas en formato Prometheus. Accesible para usuarios staff (sesión)
+    o con la cabecera `X-Metrics-Token` igual a settings.METRICS_TOKEN.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    user = getattr(request, 'user', None)
+    allowed = (token and constant_time_compare(request.headers.get('X-Metrics-Token', ''), token)) or (user is not None and user.is_staff)
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que la latencia medida incluya el resto de middlewares
+    "blog_viaje.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -70,11 +72,156 @@ DATABASES = {
 }
 
 # Cache para recomendaciones y sesiones
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake"
+# - redis: backend compartido por todos los workers de gunicorn (producción, usa REDIS_URL)
+# - fakeredis: mismo cliente de django-redis contra un Redis en memoria (tests,
+#   requiere requirements-dev.txt)
+# - locmem: cache local del proceso (desarrollo sin Redis)
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "redis" if REDIS_URL else "locmem")
+
+REDIS_CACHE_OPTIONS = {
+    "CLIENT_CLASS": "django_redis.client.DefaultClient",
+    # Las respuestas serializadas (detalle de artículos, recomendaciones) se comprimen
+    "COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor",
+    # Si Redis no está disponible la aplicación sigue funcionando sin cache
+    "IGNORE_EXCEPTIONS": True,
+}
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL or "redis://127.0.0.1:6379/1",
+            "OPTIONS": REDIS_CACHE_OPTIONS,
+            "KEY_PREFIX": "blog_viaje",
+        }
     }
+elif CACHE_BACKEND == "fakeredis":
+    from fakeredis import FakeConnection
+
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://127.0.0.1:6379/1",
+            "OPTIONS": {
+                **REDIS_CACHE_OPTIONS,
+                "CONNECTION_POOL_KWARGS": {"connection_class": FakeConnection},
+            },
+            "KEY_PREFIX": "blog_viaje",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "unique-snowflake"
+        }
+    }
+
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+# Cola para recalcular recomendaciones fuera de la petición (ver recommendations.tasks):
+# 'thread' (en proceso), 'redis' (necesita un proceso con
+# manage.py run_recommendation_worker, así que hay que elegirlo explícitamente) o 'sync'
+RECOMMENDATIONS_QUEUE_BACKEND = os.environ.get("RECOMMENDATIONS_QUEUE_BACKEND", "thread")
+
+# Escritura de recomendaciones regeneradas: 'diff' (solo filas que cambian) o
+# 'replace' (borrar e insertar todas)
+RECOMMENDATIONS_WRITE_MODE = os.environ.get("RECOMMENDATIONS_WRITE_MODE", "diff")
+
+# Índice invertido tag -> artículos (ver recommendations.tag_index): 'redis' lo
+# comparte entre workers usando el Redis de la cache; 'memory' es local al proceso
+RECOMMENDATIONS_TAG_INDEX_BACKEND = os.environ.get(
+    "RECOMMENDATIONS_TAG_INDEX_BACKEND",
+    "redis" if CACHE_BACKEND in ("redis", "fakeredis") else "memory",
+)
+
+# Clasificaciones de artículos populares y en tendencia (ver articles.leaderboard)
+ARTICLES_LEADERBOARD_BACKEND = os.environ.get(
+    "ARTICLES_LEADERBOARD_BACKEND",
+    "redis" if CACHE_BACKEND in ("redis", "fakeredis") else "memory",
+)
+# Horas tras las que una valoración aporta la mitad a la tendencia
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 72))
+
+# Directorio del modelo de filtrado colaborativo (manage.py build_item_similarity)
+RECOMMENDATIONS_MODEL_DIR = os.environ.get(
+    "RECOMMENDATIONS_MODEL_DIR", os.path.join(BASE_DIR, "var", "recommendations")
+)
+
+# Métricas por petición (ver blog_viaje.metrics): cabecera Server-Timing, log
+# 'blog_viaje.requests' (WARNING a partir de REQUEST_METRICS_MAX_QUERIES consultas)
+# y /api/_metrics en formato Prometheus (staff o cabecera X-Metrics-Token)
+REQUEST_METRICS_ENABLED = os.environ.get("REQUEST_METRICS_ENABLED", "1") == "1"
+REQUEST_METRICS_SERVER_TIMING = os.environ.get("REQUEST_METRICS_SERVER_TIMING", "1") == "1"
+REQUEST_METRICS_MAX_QUERIES = int(os.environ.get("REQUEST_METRICS_MAX_QUERIES", 20))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Logging (ver blog_viaje.log): cada aplicación usa su logger
+# (logging.getLogger(__name__)) y todos escriben en stderr desde un hilo aparte.
+# LOG_FORMAT=json para una línea JSON por registro; LOG_DEBUG_SAMPLE_RATE y
+# LOG_REQUEST_SAMPLE_RATE limitan los eventos DEBUG y los logs por petición.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "text": {
+            "format": "%(asctime)s %(levelname)s %(name)s %(message)s",
+        },
+        "json": {
+            "()": "blog_viaje.log.JsonFormatter",
+        },
+    },
+    "filters": {
+        "sample_debug": {
+            "()": "blog_viaje.log.SamplingFilter",
+            "rate": os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01"),
+            "level": "DEBUG",
+        },
+        "sample_requests": {
+            "()": "blog_viaje.log.SamplingFilter",
+            "rate": os.environ.get("LOG_REQUEST_SAMPLE_RATE", "1"),
+            "level": "INFO",
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "blog_viaje.log.QueueStreamHandler",
+            "formatter": os.environ.get("LOG_FORMAT", "text"),
+            "filters": ["sample_debug"],
+        },
+    },
+    "root": {
+        "handlers": ["console"],
+        "level": "WARNING",
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "blog_viaje.requests": {
+            "handlers": ["console"],
+            "level": LOG_LEVEL,
+            "filters": ["sample_requests"],
+            "propagate": False,
+        },
+        **{
+            app: {"handlers": ["console"], "level": os.environ.get(f"LOG_LEVEL_{app.upper()}", LOG_LEVEL), "propagate": False}
+            for app in ("blog_viaje", "articles", "destinations", "recommendations", "users")
+        },
+    },
+}
+
+# Versión de las claves de cache de cada aplicación (ver blog_viaje.cache.namespaced_key).
+# Incrementar una versión invalida de golpe todas las claves de esa aplicación.
+CACHE_NAMESPACES = {
+    "articles": 1,
+    "recommendations": 1,
+    "destinations": 1,
 }
 
 # Password validation
@@ -149,6 +296,16 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # JSON con orjson (ver blog_viaje.renderers); sin orjson usan la librería estándar
+    "DEFAULT_RENDERER_CLASSES": [
+        "blog_viaje.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "blog_viaje.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_FILTER_BACKENDS": [
@@ -195,4 +352,4 @@ CORS_ALLOW_HEADERS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ["Content-Type", "X-CSRFToken"] 
\ No newline at end of file
+CORS_EXPOSE_HEADERS = ["Content-Type", "X-CSRFToken", "ETag", "Last-Modified", "Server-Timing"] 
\ No newline at end of file
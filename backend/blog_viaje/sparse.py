@@ -0,0 +1,259 @@
+"""
+Campos a la carta en las respuestas de la API (peticiones GET):
+
+- ?fields=id,title,slug   solo esos campos
+- ?omit=content,tags      todos menos esos
+- ?expand=continent       añade los campos expandibles (Meta.expandable_fields),
+                          p. ej. el continente como objeto en lugar de su id
+
+Los nombres con punto se aplican a los serializadores anidados
+(?fields=score,article.title o ?expand=article.continent). Los nombres
+desconocidos se ignoran (SparseSpec.restrict), así que no generan variantes
+distintas en las claves de cache.
+
+`SparseFieldsMixin` se añade a los serializadores y `SparseQuerysetMixin` a las
+vistas: con los campos pedidos difiere (defer) las columnas del modelo que no
+se usan y quita los select_related/prefetch_related de las relaciones que no
+se serializan. Los SerializerMethodField declaran en Meta.method_field_sources
+los atributos del modelo que leen; si alguno no lo declara no se recorta nada.
+"""
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+SPARSE_PARAMS = ('fields', 'omit', 'expand')
+
+
+def _split(values):
+    return {name.strip() for value in values for name in value.split(',') if name.strip()}
+
+
+@lru_cache(maxsize=None)
+def _field_tree(serializer_class):
+    """
+    Campos de un serializador sin recortar: (campos, expandibles), cada uno
+    como {nombre: clase del serializador anidado o None}.
+    """
+    def target_class(field):
+        target = getattr(field, 'child', field)
+        return type(target) if isinstance(target, SparseFieldsMixin) else None
+
+    serializer = serializer_class()
+    fields = {
+        name: target_class(field)
+        for name, field in super(SparseFieldsMixin, serializer).get_fields().items()
+    }
+    expandable = {
+        name: target_class(factory())
+        for name, factory in getattr(serializer_class.Meta, 'expandable_fields', {}).items()
+    }
+    return fields, expandable
+
+
+def _is_known(serializer_class, name, expand=False):
+    """
+    Si `name` (con puntos para los anidados) es un campo del serializador, o
+    un campo expandible si `expand`
+    """
+    fields, expandable = _field_tree(serializer_class)
+    head, _, rest = name.partition('.')
+    if not rest:
+        return head in expandable if expand else head in fields or head in expandable
+    target = fields.get(head) or expandable.get(head)
+    return target is not None and _is_known(target, rest, expand)
+
+
+def _nest(names):
+    """
+    {'a', 'b.c'} -> ({'a', 'b'}, {'b': {'c'}})
+    """
+    top = set()
+    nested = {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        top.add(head)
+        if rest:
+            nested.setdefault(head, set()).add(rest)
+    return top, nested
+
+
+class SparseSpec:
+    def __init__(self, fields=None, omit=(), expand=()):
+        self.fields = fields
+        self.omit = set(omit)
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        if not any(param in params for param in SPARSE_PARAMS):
+            return None
+        return cls(
+            fields=_split(params.getlist('fields')) or None,
+            omit=_split(params.getlist('omit')),
+            expand=_split(params.getlist('expand')),
+        )
+
+    def restrict(self, serializer_class):
+        """
+        Copia sin los nombres que `serializer_class` no conoce. Si no queda
+        ningún campo en ?fields= se tratan como no pedidos.
+        """
+        fields = None
+        if self.fields is not None:
+            fields = {name for name in self.fields if _is_known(serializer_class, name)} or None
+        return SparseSpec(
+            fields=fields,
+            omit={name for name in self.omit if _is_known(serializer_class, name)},
+            expand={name for name in self.expand if _is_known(serializer_class, name, expand=True)},
+        )
+
+    def split(self):
+        """
+        Devuelve (campos, omitidos, expandidos) de este nivel y las
+        especificaciones de cada campo anidado.
+        """
+        fields, nested_fields = _nest(self.fields) if self.fields is not None else (None, {})
+        # Solo se omite el campo entero si no lleva punto
+        omit = {name for name in self.omit if '.' not in name}
+        _, nested_omit = _nest(self.omit)
+        expand, nested_expand = _nest(self.expand)
+
+        nested = {}
+        for name in set(nested_fields) | set(nested_omit) | set(nested_expand):
+            nested[name] = SparseSpec(nested_fields.get(name), nested_omit.get(name, ()), nested_expand.get(name, ()))
+        return fields, omit, expand, nested
+
+    def cache_variant(self):
+        """
+        Representación estable para formar claves de cache
+        """
+        parts = []
+        if self.fields is not None:
+            parts.append('fields=' + ','.join(sorted(self.fields)))
+        for name in ('omit', 'expand'):
+            values = getattr(self, name)
+            if values:
+                parts.append(f'{name}=' + ','.join(sorted(values)))
+        return '&'.join(parts)
+
+
+def sparse_cache_variant(request, serializer_class):
+    spec = SparseSpec.from_request(request)
+    return spec.restrict(serializer_class).cache_variant() if spec is not None else ''
+
+
+class SparseFieldsMixin:
+    """
+    Serializador con ?fields=, ?omit= y ?expand=. Los campos expandibles se
+    declaran en Meta.expandable_fields como {nombre: función que crea el campo}.
+    """
+
+    def _get_sparse_spec(self):
+        spec = getattr(self, '_sparse_spec', None)
+        if spec is not None:
+            return spec
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        # Solo el serializador raíz lee la petición; los anidados reciben su parte
+        if parent is None:
+            spec = SparseSpec.from_request(self.context.get('request'))
+            if spec is not None:
+                spec = self._sparse_spec = spec.restrict(type(self))
+            return spec
+        return None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self._get_sparse_spec()
+        if spec is None:
+            return fields
+
+        selected, omit, expand, nested = spec.split()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand & set(expandable):
+            fields[name] = expandable[name]()
+
+        for name in list(fields):
+            if (selected is not None and name not in selected and name not in expand) or name in omit:
+                del fields[name]
+
+        for name, nested_spec in nested.items():
+            field = fields.get(name)
+            target = getattr(field, 'child', field)
+            if isinstance(target, SparseFieldsMixin):
+                target._sparse_spec = nested_spec
+        return fields
+
+    def required_model_fields(self):
+        """
+        Atributos del modelo que necesitan los campos seleccionados, o None si
+        no se pueden determinar (y no hay que recortar la consulta).
+        """
+        method_sources = getattr(self.Meta, 'method_field_sources', {})
+        required = set()
+        for name, field in self.fields.items():
+            if field.source == '*':
+                if name not in method_sources:
+                    return None
+                required.update(method_sources[name])
+            else:
+                required.add(field.source.split('.')[0])
+        return required
+
+
+def trim_queryset(queryset, serializer, keep=()):
+    """
+    Difiere las columnas que no usa `serializer` y quita las relaciones
+    precargadas que no se serializan.
+    """
+    if not isinstance(serializer, SparseFieldsMixin) or serializer._get_sparse_spec() is None:
+        return queryset
+    required = serializer.required_model_fields()
+    if required is None:
+        return queryset
+    required.update(keep)
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        kept = [name for name in select_related if name in required]
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*kept)
+
+    lookups = queryset._prefetch_related_lookups
+    if lookups:
+        kept = [
+            lookup for lookup in lookups
+            if getattr(lookup, 'prefetch_to', lookup).split('__')[0] in required
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*kept)
+
+    model = queryset.model
+    deferred = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in required and field.attname not in required
+    ]
+    # defer(None) descarta lo que ya difiriera la consulta (p. ej. un campo expandido)
+    return queryset.defer(None).defer(*deferred)
+
+
+class SparseQuerysetMixin:
+    """
+    Vista genérica que recorta la consulta a los campos pedidos
+    """
+
+    def get_queryset(self):
+        return self.trim_queryset(super().get_queryset())
+
+    def trim_queryset(self, queryset):
+        keep = set()
+        # Los campos de la paginación por cursor se leen de las instancias
+        ordering = getattr(self.paginator, 'ordering', None) if self.paginator is not None else None
+        if ordering:
+            keep.update(name.lstrip('-') for name in ([ordering] if isinstance(ordering, str) else ordering))
+        return trim_queryset(queryset, self.get_serializer(), keep)
@@ -0,0 +1,65 @@
+import datetime
+import decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .metrics import registry
+from .renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    Mismo JSON que rest_framework.renderers.JSONRenderer
+    """
+
+    def assertSameOutput(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_json_renderer(self):
+        self.assertSameOutput({
+            'texto': 'Ñandú — “comillas” <b>',
+            'separadores': 'a\u2028b\u2029c',
+            'fecha': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'dia': datetime.date(2024, 5, 1),
+            'decimal': decimal.Decimal('4.50'),
+            'duracion': datetime.timedelta(minutes=90),
+            'traducible': gettext_lazy('Europa'),
+            'lista': [1, 2.5, None, True],
+            'anidado': {'1': {'a': []}},
+        })
+
+    def test_nan_is_null(self):
+        self.assertEqual(ORJSONRenderer().render({'media': float('nan')}), b'{"media":null}')
+
+
+@override_settings(METRICS_TOKEN='secreto', REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/destinations/continents/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_metrics_require_token_or_staff(self):
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+        self.assertEqual(self.client.get('/api/_metrics', HTTP_X_METRICS_TOKEN='otro').status_code, 403)
+
+        staff = get_user_model().objects.create_user(email='admin@example.com', password='x', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 200)
+
+    def test_requests_are_counted_by_route(self):
+        self.client.get('/api/destinations/continents/')
+        self.client.get('/api/destinations/continents/')
+        body = self.client.get('/api/_metrics', HTTP_X_METRICS_TOKEN='secreto').content.decode()
+        self.assertIn(
+            'http_requests_total{method="GET",route="/api/destinations/continents/",status="200"} 2', body,
+        )
+        self.assertIn('http_request_db_queries_bucket{method="GET",route="/api/destinations/continents/",le="+Inf"} 2', body)
@@ -25,11 +25,13 @@ from rest_framework_simplejwt.views import (
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from blog_viaje.metrics import metrics_view
 from articles.views import (
     ArticleListView, ArticleDetailView, ArticleCreateView, 
     ArticleUpdateView, ArticleDeleteView, TagListView,
     RateArticleView, CommentListView, CommentCreateView,
-    RichTextEditorConfigView, RichTextImageUploadView, RichTextEditorDocsView
+    RichTextEditorConfigView, RichTextImageUploadView, RichTextEditorDocsView,
+    TrendingArticleListView,
 )
 
 @api_view(['GET'])
@@ -46,11 +48,13 @@ def api_root(request, format=None):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', api_root, name='api-root'),
+    path('api/_metrics', metrics_view, name='metrics'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/users/', include('users.urls')),
     path('api/articles/', ArticleListView.as_view(), name='article-list'),
     path('api/articles/create/', ArticleCreateView.as_view(), name='article-create'),
+    path('api/articles/trending/', TrendingArticleListView.as_view(), name='article-trending'),
     path('api/articles/<slug:slug>/', ArticleDetailView.as_view(), name='article-detail'),
     path('api/articles/<slug:slug>/update/', ArticleUpdateView.as_view(), name='article-update'),
     path('api/articles/<slug:slug>/delete/', ArticleDeleteView.as_view(), name='article-delete'),
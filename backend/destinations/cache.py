@@ -0,0 +1,36 @@
+"""
+Cache de la respuesta de /api/destinations/by-continent/.
+
+La respuesta es la misma para todos los usuarios (las URLs de imágenes son
+relativas), así que se guarda entera en una sola entrada. Las señales de
+`destinations.models` la borran al guardar o borrar destinos y continentes.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from blog_viaje.cache import namespaced_key
+from blog_viaje.metrics import record_cache
+
+DESTINATIONS_BY_CONTINENT_TIMEOUT = 60 * 60 * 24
+
+
+def destinations_by_continent_cache_key():
+    return namespaced_key('destinations', 'by-continent')
+
+
+def get_cached_destinations_by_continent():
+    data = cache.get(destinations_by_continent_cache_key())
+    record_cache(data is not None)
+    return data
+
+
+def cache_destinations_by_continent(data):
+    cache.set(destinations_by_continent_cache_key(), data, DESTINATIONS_BY_CONTINENT_TIMEOUT)
+
+
+def invalidate_destinations_by_continent():
+    """
+    Borra la respuesta cacheada una vez confirmada la transacción en curso
+    """
+    key = destinations_by_continent_cache_key()
+    transaction.on_commit(lambda: cache.delete(key))
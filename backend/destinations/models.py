@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.text import slugify
 from users.models import User
+from .cache import invalidate_destinations_by_continent
 
 class Continent(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -32,3 +35,10 @@ class Destination(models.Model):
     
     def __str__(self):
         return self.name
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+@receiver(post_save, sender=Continent)
+@receiver(post_delete, sender=Continent)
+def invalidate_destinations_cache(sender, **kwargs):
+    invalidate_destinations_by_continent()
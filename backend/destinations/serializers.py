@@ -1,16 +1,25 @@
 from rest_framework import serializers
 from .models import Destination, Continent
+from blog_viaje.sparse import SparseFieldsMixin
 
-class ContinentSerializer(serializers.ModelSerializer):
+class ContinentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Continent
         fields = ['id', 'name', 'slug']
         read_only_fields = ['id']
 
-class DestinationSerializer(serializers.ModelSerializer):
+class DestinationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     continent = ContinentSerializer(read_only=True)
     
     class Meta:
         model = Destination
         fields = ['id', 'name', 'slug', 'description', 'country', 'city', 'continent', 'image', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at'] 
+
+class GroupedDestinationSerializer(DestinationSerializer):
+    """
+    Destino dentro de un grupo por continente: el continente se serializa una
+    vez por grupo y se añade después a cada destino.
+    """
+    class Meta(DestinationSerializer.Meta):
+        fields = [field for field in DestinationSerializer.Meta.fields if field != 'continent']
@@ -1,3 +1,50 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Continent, Destination
+
+
+class DestinationsByContinentTests(TestCase):
+    """
+    /api/destinations/by-continent/: agrupación, grupo "sin asignar" y cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.europe = Continent.objects.create(name='Europa', slug='europa')
+        cls.asia = Continent.objects.create(name='Asia', slug='asia')
+        for slug, continent in (('lisboa', cls.europe), ('roma', cls.europe), ('kioto', cls.asia), ('atlantida', None)):
+            Destination.objects.create(
+                name=slug.title(), slug=slug, description='', country='', city=slug.title(), continent=continent,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self):
+        response = self.client.get('/api/destinations/by-continent/')
+        self.assertEqual(response.status_code, 200)
+        return {group['slug']: group for group in response.json()}
+
+    def test_groups_destinations_by_continent(self):
+        groups = self.get()
+        self.assertEqual(list(groups), ['europa', 'asia', 'unassigned'])
+        self.assertEqual([item['slug'] for item in groups['europa']['destinations']], ['lisboa', 'roma'])
+        self.assertEqual(
+            groups['asia']['destinations'][0]['continent'],
+            {'id': self.asia.pk, 'name': 'Asia', 'slug': 'asia'},
+        )
+        self.assertIsNone(groups['unassigned']['id'])
+        self.assertIsNone(groups['unassigned']['destinations'][0]['continent'])
+
+    def test_response_is_cached_until_destinations_change(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Destination.objects.create(
+                name='Tokio', slug='tokio', description='', country='Japón', city='Tokio', continent=self.asia,
+            )
+        self.assertEqual(len(self.get()['asia']['destinations']), 2)
@@ -3,48 +3,70 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Destination, Continent
-from .serializers import DestinationSerializer, ContinentSerializer
+from .serializers import DestinationSerializer, ContinentSerializer, GroupedDestinationSerializer
+from .cache import cache_destinations_by_continent, get_cached_destinations_by_continent
 from django.db.models import Count
+from blog_viaje.sparse import SparseQuerysetMixin
 
 # Create your views here.
 
-class ContinentListView(generics.ListAPIView):
+class ContinentListView(SparseQuerysetMixin, generics.ListAPIView):
     queryset = Continent.objects.all()
     serializer_class = ContinentSerializer
     permission_classes = [permissions.AllowAny]
 
-class ContinentDetailView(generics.RetrieveAPIView):
+class ContinentDetailView(SparseQuerysetMixin, generics.RetrieveAPIView):
     queryset = Continent.objects.all()
     serializer_class = ContinentSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
 
 class DestinationsByContinent(APIView):
+    """
+    Destinos agrupados por continente (los que no tienen continente van al
+    grupo "unassigned"). Se calcula con una consulta de continentes y otra de
+    destinos y la respuesta completa se guarda en cache.
+    """
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
-        continents = Continent.objects.all()
-        result = []
-        
-        for continent in continents:
-            destinations = Destination.objects.filter(continent=continent)
-            continent_data = {
-                'id': continent.id,
-                'name': continent.name,
-                'slug': continent.slug,
-                'destinations': DestinationSerializer(destinations, many=True).data
+        result = get_cached_destinations_by_continent()
+        if result is None:
+            result = self._group_by_continent()
+            cache_destinations_by_continent(result)
+        return Response(result)
+    
+    def _group_by_continent(self):
+        groups = {}
+        for continent in Continent.objects.order_by('pk'):
+            groups[continent.pk] = {
+                **ContinentSerializer(continent).data,
+                'destinations': [],
             }
-            result.append(continent_data)
         
-        return Response(result)
+        destinations = list(Destination.objects.order_by('pk'))
+        unassigned = []
+        for destination, data in zip(destinations, GroupedDestinationSerializer(destinations, many=True).data):
+            group = groups.get(destination.continent_id)
+            if group is None:
+                data['continent'] = None
+                unassigned.append(data)
+            else:
+                data['continent'] = {key: group[key] for key in ('id', 'name', 'slug')}
+                group['destinations'].append(data)
+        
+        result = list(groups.values())
+        if unassigned:
+            result.append({'id': None, 'name': 'Sin asignar', 'slug': 'unassigned', 'destinations': unassigned})
+        return result
 
-class DestinationListView(generics.ListAPIView):
-    queryset = Destination.objects.all()
+class DestinationListView(SparseQuerysetMixin, generics.ListAPIView):
+    queryset = Destination.objects.select_related('continent')
     serializer_class = DestinationSerializer
     permission_classes = [permissions.AllowAny]
 
-class DestinationDetailView(generics.RetrieveAPIView):
-    queryset = Destination.objects.all()
+class DestinationDetailView(SparseQuerysetMixin, generics.RetrieveAPIView):
+    queryset = Destination.objects.select_related('continent')
     serializer_class = DestinationSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
@@ -55,7 +77,7 @@ class DestinationCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAdminUser]
 
 class DestinationUpdateView(generics.UpdateAPIView):
-    queryset = Destination.objects.all()
+    queryset = Destination.objects.select_related('continent')
     serializer_class = DestinationSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.IsAdminUser]
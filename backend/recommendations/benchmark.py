@@ -0,0 +1,342 @@
+"""
+Banco de pruebas de velocidad y calidad del recomendador.
+
+`manage.py benchmark_recommendations` crea una base de datos de pruebas
+desechable, genera un catálogo sintético reproducible (semilla fija) y ejecuta
+cada punto de entrada del recomendador sobre una muestra de usuarios. El
+informe JSON tiene siempre la misma estructura, para poder compararlo entre
+commits.
+
+Modelo del catálogo sintético:
+- Los tags tienen una popularidad con distribución de Zipf; cada artículo
+  tiene de 1 a 4 tags y una calidad latente.
+- Cada usuario tiene varios tags de interés y valora artículos que, en su
+  mayoría, comparten alguno de ellos. La puntuación depende de la
+  coincidencia con sus intereses, de la calidad del artículo y de ruido.
+- Una parte de las valoraciones de cada usuario no se guarda (holdout); las de
+  4 o más estrellas son los artículos relevantes para precision@k y recall@k.
+"""
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import django
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BATCH_SIZE = 2000
+
+
+def build_catalog(users=1000, articles=3000, tags=150, ratings_per_user=20,
+                  interests_per_user=4, holdout=0.2, seed=42):
+    """
+    Genera el catálogo con bulk_create (sin señales) y reconstruye después los
+    agregados y los índices derivados. Devuelve el holdout como
+    {user_id: {article_id, ...}} con los artículos relevantes de cada usuario.
+    """
+    from articles.leaderboard import rebuild_leaderboards
+    from articles.models import Article, Rating, Tag, rebuild_rating_aggregates
+    from users.models import Profile, User, UserRole
+    from .tag_index import rebuild_tag_index
+
+    rng = np.random.default_rng(seed)
+
+    tag_objects = Tag.objects.bulk_create(
+        [Tag(name=f'Tag {i}', slug=f'tag-{i}') for i in range(tags)], batch_size=BATCH_SIZE
+    )
+    tag_ids = np.array([tag.pk for tag in tag_objects])
+    tag_weights = 1.0 / np.arange(1, tags + 1)
+    tag_weights /= tag_weights.sum()
+
+    password = make_password(None)
+    writers = max(1, users // 20)
+    user_objects = User.objects.bulk_create(
+        [
+            User(
+                email=f'bench{i}@example.com',
+                password=password,
+                role=UserRole.WRITER if i < writers else UserRole.READER,
+            )
+            for i in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = np.array([user.pk for user in user_objects])
+    profiles = Profile.objects.bulk_create(
+        [Profile(user_id=user_id) for user_id in user_ids.tolist()], batch_size=BATCH_SIZE
+    )
+
+    # Artículos: autor, tags y calidad latente
+    article_tag_positions = [
+        rng.choice(tags, size=rng.integers(1, 5), replace=False, p=tag_weights)
+        for _ in range(articles)
+    ]
+    quality = rng.normal(0, 1, size=articles)
+    authors = rng.choice(user_ids[:writers], size=articles)
+    article_objects = Article.objects.bulk_create(
+        [
+            Article(
+                title=f'Artículo {i}',
+                slug=f'articulo-{i}',
+                author_id=int(authors[i]),
+                content=f'<p>Contenido del artículo {i}</p>',
+            )
+            for i in range(articles)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    article_ids = np.array([article.pk for article in article_objects])
+    Article.tags.through.objects.bulk_create(
+        [
+            Article.tags.through(article_id=int(article_ids[i]), tag_id=int(tag_ids[position]))
+            for i, positions in enumerate(article_tag_positions)
+            for position in positions
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Posting lists tag -> posiciones de artículo para elegir candidatos afines
+    postings = [[] for _ in range(tags)]
+    for i, positions in enumerate(article_tag_positions):
+        for position in positions:
+            postings[position].append(i)
+
+    interest_rows = []
+    ratings = []
+    relevant = {}
+    for user_position, profile in enumerate(profiles):
+        interests = rng.choice(tags, size=min(interests_per_user, tags), replace=False, p=tag_weights)
+        interest_rows.extend(
+            Profile.interests.through(profile_id=profile.pk, tag_id=int(tag_ids[position]))
+            for position in interests
+        )
+
+        affine = np.unique(np.concatenate([postings[position] for position in interests] or [[]])).astype(int)
+        n_affine = min(affine.size, int(ratings_per_user * 0.7))
+        chosen = set(rng.choice(affine, size=n_affine, replace=False).tolist()) if n_affine else set()
+        while len(chosen) < min(ratings_per_user, articles):
+            chosen.add(int(rng.integers(articles)))
+
+        interest_set = set(interests.tolist())
+        chosen = list(chosen)
+        held_out = set(rng.choice(len(chosen), size=int(len(chosen) * holdout), replace=False).tolist())
+        user_id = int(user_ids[user_position])
+        for index, article_position in enumerate(chosen):
+            article_tags = article_tag_positions[article_position]
+            overlap = len(interest_set.intersection(article_tags.tolist())) / len(article_tags)
+            score = 2.2 + 2.0 * overlap + 0.6 * quality[article_position] + rng.normal(0, 0.7)
+            score = int(np.clip(np.rint(score), 1, 5))
+            article_id = int(article_ids[article_position])
+            if index in held_out:
+                if score >= 4:
+                    relevant.setdefault(user_id, set()).add(article_id)
+            else:
+                ratings.append(Rating(user_id=user_id, article_id=article_id, score=score))
+
+    Profile.interests.through.objects.bulk_create(interest_rows, batch_size=BATCH_SIZE)
+    Rating.objects.bulk_create(ratings, batch_size=BATCH_SIZE)
+
+    rebuild_rating_aggregates()
+    rebuild_tag_index()
+    rebuild_leaderboards()
+
+    return {
+        'users': users,
+        'articles': articles,
+        'tags': tags,
+        'ratings': len(ratings),
+        'held_out_relevant': sum(len(items) for items in relevant.values()),
+    }, relevant
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+
+def measure(entry_point, users, relevant, k, total_articles, memory_sample=20):
+    """
+    Ejecuta `entry_point(user)` para cada usuario (tras una llamada de
+    calentamiento) y devuelve latencias, consultas, pico de memoria y, si el
+    punto de entrada devuelve artículos, precision@k, recall@k y cobertura.
+    """
+    entry_point(users[0])
+
+    latencies = []
+    queries = []
+    results = []
+    for user in users:
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            article_ids = entry_point(user)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        results.append((user.pk, article_ids))
+
+    # La memoria se mide aparte porque tracemalloc ralentiza la ejecución
+    tracemalloc.start()
+    for user in users[:memory_sample]:
+        entry_point(user)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        'calls': len(users),
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'mean': round(float(np.mean(latencies)), 3),
+            'max': round(float(np.max(latencies)), 3),
+        },
+        'queries': {
+            'mean': round(float(np.mean(queries)), 2),
+            'max': int(np.max(queries)),
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+    if all(article_ids is not None for _, article_ids in results):
+        hits = []
+        recalls = []
+        recommended = set()
+        for user_id, article_ids in results:
+            top = list(article_ids)[:k]
+            recommended.update(top)
+            user_relevant = relevant.get(user_id)
+            if user_relevant:
+                found = len(user_relevant.intersection(top))
+                hits.append(found / k)
+                recalls.append(found / len(user_relevant))
+        report['quality'] = {
+            f'precision_at_{k}': round(float(np.mean(hits)), 4) if hits else None,
+            f'recall_at_{k}': round(float(np.mean(recalls)), 4) if recalls else None,
+            'coverage': round(len(recommended) / total_articles, 4) if total_articles else None,
+            'evaluated_users': len(hits),
+        }
+
+    return report
+
+
+def api_host():
+    """
+    Primer host concreto de ALLOWED_HOSTS para las peticiones del APIClient
+    """
+    from django.conf import settings
+
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def entry_points(k):
+    """
+    Puntos de entrada del recomendador: nombre -> función(user) que devuelve
+    la lista de article_id recomendados (o None si no recomienda).
+    """
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+    from .cache import recommendations_cache_key
+    from .engine import (
+        CollaborativeStrategy,
+        PopularityStrategy,
+        RecommendationContext,
+        TagOverlapStrategy,
+        get_engine,
+        popular_fallback,
+    )
+
+    def strategy(strategy_class):
+        def run(user):
+            scored = strategy_class().recommend(RecommendationContext(user), k, set())
+            return [article_id for article_id, _ in scored]
+        return run
+
+    def collaborative_sql(user):
+        scored = CollaborativeStrategy()._recommend_from_ratings(RecommendationContext(user), k, set())
+        return [article_id for article_id, _ in scored]
+
+    def engine_recommend(user):
+        return [article_id for article_id, _ in get_engine().recommend(user, k)]
+
+    def engine_generate(write_mode):
+        def run(user):
+            return [recommendation.article_id for recommendation in get_engine().generate(user, k, write_mode=write_mode)]
+        return run
+
+    def fallback(user):
+        return [recommendation.article_id for recommendation in popular_fallback(user, k)]
+
+    host = api_host()
+
+    def api(path, cold=False):
+        def run(user):
+            if cold:
+                cache.delete(recommendations_cache_key(user.pk))
+            # Fuera de los tests 'testserver' no está en ALLOWED_HOSTS
+            client = APIClient(HTTP_HOST=host)
+            client.force_authenticate(user)
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} respondió {response.status_code}')
+            return [item['article']['id'] for item in response.data['results']]
+        return run
+
+    return {
+        'strategy.tags': strategy(TagOverlapStrategy),
+        'strategy.collaborative': strategy(CollaborativeStrategy),
+        'strategy.collaborative.sql': collaborative_sql,
+        'strategy.popular': strategy(PopularityStrategy),
+        'engine.recommend': engine_recommend,
+        'engine.generate.diff': engine_generate('diff'),
+        'engine.generate.replace': engine_generate('replace'),
+        'engine.popular_fallback': fallback,
+        'api.recommendations': api('/api/recommendations/'),
+        'api.user_recommendations.cold': api('/api/recommendations/user/', cold=True),
+        'api.user_recommendations.warm': api('/api/recommendations/user/'),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'database': connection.vendor,
+    }
+
+
+def compare(report, baseline, max_regression):
+    """
+    Compara con un informe anterior. Devuelve una lista de (punto de entrada,
+    métrica, antes, ahora, descripción) con las regresiones que superan
+    `max_regression` (porcentaje) en p95 o consultas, o cualquier pérdida de calidad.
+    """
+    regressions = []
+    for name, current in report['entry_points'].items():
+        previous = baseline.get('entry_points', {}).get(name)
+        if not previous:
+            continue
+
+        for metric, before, after in (
+            ('latency_ms.p95', previous['latency_ms']['p95'], current['latency_ms']['p95']),
+            ('queries.mean', previous['queries']['mean'], current['queries']['mean']),
+        ):
+            if before and after > before * (1 + max_regression / 100):
+                regressions.append((name, metric, before, after, f'+{(after / before - 1) * 100:.0f}%'))
+
+        for metric, after in current.get('quality', {}).items():
+            before = previous.get('quality', {}).get(metric)
+            if metric != 'evaluated_users' and before is not None and after is not None and after < before:
+                regressions.append((name, f'quality.{metric}', before, after, f'{after - before:+.4f}'))
+
+    return regressions
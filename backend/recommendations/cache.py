@@ -0,0 +1,71 @@
+"""
+Cache de las recomendaciones servidas por usuario.
+
+Solo se guardan tuplas (pk, article_id, score) y la fecha de generación; los
+artículos se cargan en cada petición con una consulta por lotes, así que la
+entrada es pequeña y nunca contiene datos de artículos desactualizados.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from blog_viaje.cache import namespaced_key
+from blog_viaje.metrics import record_cache
+
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 60
+
+CACHE_HITS = 'hits'
+CACHE_MISSES = 'misses'
+
+
+def recommendations_cache_key(user_id):
+    return namespaced_key('recommendations', 'rows', user_id)
+
+
+def _stats_key(name):
+    return namespaced_key('recommendations', 'cache-stats', name)
+
+
+def get_cached_recommendations(user_id):
+    """
+    Devuelve la entrada {'rows': [(pk, article_id, score), ...], 'generated_at': datetime}
+    o None, y actualiza los contadores de aciertos y fallos.
+    """
+    entry = cache.get(recommendations_cache_key(user_id))
+    _count(CACHE_HITS if entry is not None else CACHE_MISSES)
+    record_cache(entry is not None)
+    return entry
+
+
+def cache_recommendations(user_id, rows):
+    entry = {
+        'rows': [(int(pk), int(article_id), float(score)) for pk, article_id, score in rows],
+        'generated_at': timezone.now(),
+    }
+    cache.set(recommendations_cache_key(user_id), entry, RECOMMENDATIONS_CACHE_TIMEOUT)
+    return entry
+
+
+def _count(name):
+    key = _stats_key(name)
+    # add() crea el contador si no existe; incr() es atómico en Redis
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La clave se ha expulsado de la cache entre add() e incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    """
+    Contadores de aciertos y fallos de la cache de recomendaciones
+    """
+    values = cache.get_many([_stats_key(CACHE_HITS), _stats_key(CACHE_MISSES)])
+    hits = values.get(_stats_key(CACHE_HITS), 0)
+    misses = values.get(_stats_key(CACHE_MISSES), 0)
+    total = hits + misses
+    return {
+        CACHE_HITS: hits,
+        CACHE_MISSES: misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,252 @@
+"""
+Filtrado colaborativo ítem-ítem a partir de las valoraciones.
+
+El modelo se calcula offline (`manage.py build_item_similarity`) y se guarda
+como una matriz dispersa CSR de similitudes entre artículos, conservando solo
+los N vecinos más parecidos de cada artículo:
+
+    item_ids.npy  ids de artículo, ordenados (fila/columna -> Article.id)
+    indptr.npy    inicio de la fila de cada artículo en indices/data
+    indices.npy   columnas (posiciones en item_ids) de los vecinos
+    data.npy      similitud coseno ajustada (centrada por usuario) de cada vecino
+
+Los ficheros se abren con mmap, de modo que todos los workers de gunicorn
+comparten las mismas páginas en memoria sin copiarlas. Cada construcción se
+escribe en un directorio nuevo y el fichero CURRENT apunta a la última, que
+los procesos recargan cuando cambia. Se conservan las KEEP_VERSIONS últimas
+construcciones y las anteriores se borran al publicar una nueva.
+"""
+import logging
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+ARRAY_NAMES = ('item_ids', 'indptr', 'indices', 'data')
+VERSION_PREFIX = 'item-similarity-'
+
+# Construcciones que se conservan (incluida la vigente), por si algún proceso
+# todavía tiene abierta una anterior
+KEEP_VERSIONS = 3
+
+
+def model_dir():
+    return Path(settings.RECOMMENDATIONS_MODEL_DIR)
+
+
+def load_rating_arrays(chunk_size=50000):
+    """
+    Carga todas las valoraciones como arrays (usuario, artículo, puntuación)
+    recorriendo la tabla en bloques y sin crear instancias de modelos.
+    """
+    from articles.models import Rating
+
+    queryset = Rating.objects.order_by().values_list('user_id', 'article_id', 'score')
+    total = queryset.count()
+    users = np.empty(total, dtype=np.int64)
+    articles = np.empty(total, dtype=np.int64)
+    scores = np.empty(total, dtype=np.float32)
+
+    size = 0
+    for size, (user_id, article_id, score) in enumerate(queryset.iterator(chunk_size=chunk_size), start=1):
+        if size > total:
+            break
+        users[size - 1] = user_id
+        articles[size - 1] = article_id
+        scores[size - 1] = score
+
+    return users[:size], articles[:size], scores[:size]
+
+
+def compute_item_similarity(users, articles, scores, neighbours=50, min_similarity=0.0, block_size=1024):
+    """
+    Calcula la matriz de similitud ítem-ítem (coseno ajustado) y conserva los
+    `neighbours` vecinos más parecidos de cada artículo.
+    La matriz completa no se construye: se calcula por bloques de `block_size`
+    artículos y de cada bloque solo se guardan sus vecinos.
+    Devuelve (item_ids, indptr, indices, data).
+    """
+    from scipy import sparse
+
+    item_ids, item_index = np.unique(articles, return_inverse=True)
+    _, user_index = np.unique(users, return_inverse=True)
+    n_users = int(user_index.max()) + 1 if user_index.size else 0
+    n_items = item_ids.size
+
+    if n_items == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return item_ids, np.zeros(1, dtype=np.int64), empty.astype(np.int32), empty.astype(np.float32)
+
+    # Centrar las puntuaciones con la media de cada usuario (coseno ajustado)
+    user_sums = np.bincount(user_index, weights=scores, minlength=n_users)
+    user_counts = np.bincount(user_index, minlength=n_users)
+    centered = scores - (user_sums / np.maximum(user_counts, 1))[user_index]
+
+    ratings = sparse.csc_matrix(
+        (centered.astype(np.float32), (user_index, item_index)),
+        shape=(n_users, n_items),
+    )
+    norms = np.sqrt(np.asarray(ratings.multiply(ratings).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    ratings = (ratings @ sparse.diags((1.0 / norms).astype(np.float32))).tocsr()
+    # Artículo x usuario, para tomar bloques de filas
+    items = ratings.T.tocsr()
+
+    indptr = np.zeros(n_items + 1, dtype=np.int64)
+    kept_indices = []
+    kept_data = []
+    for block_start in range(0, n_items, block_size):
+        # Similitudes de los artículos del bloque con todos los demás
+        similarity = (items[block_start:block_start + block_size] @ ratings).tocsr()
+
+        for offset in range(similarity.shape[0]):
+            row = block_start + offset
+            start, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+            row_indices = similarity.indices[start:end]
+            row_data = similarity.data[start:end]
+
+            keep = (row_data > min_similarity) & (row_indices != row)
+            row_indices, row_data = row_indices[keep], row_data[keep]
+            if row_data.size > neighbours:
+                best = np.argpartition(-row_data, neighbours - 1)[:neighbours]
+                row_indices, row_data = row_indices[best], row_data[best]
+
+            kept_indices.append(row_indices.astype(np.int32))
+            kept_data.append(row_data.astype(np.float32))
+            indptr[row + 1] = indptr[row] + row_data.size
+
+    indices = np.concatenate(kept_indices) if kept_indices else np.empty(0, dtype=np.int32)
+    data = np.concatenate(kept_data) if kept_data else np.empty(0, dtype=np.float32)
+    return item_ids, indptr, indices, data
+
+
+def save_model(arrays, directory=None):
+    """
+    Guarda el modelo en un directorio nuevo, actualiza CURRENT de forma atómica
+    y borra las construcciones que ya no se conservan
+    """
+    base = Path(directory) if directory else model_dir()
+    # Fecha con microsegundos (ordena las versiones) y sufijo aleatorio para
+    # que dos construcciones simultáneas no compartan directorio
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    target = base / f'{VERSION_PREFIX}{version}'
+    target.mkdir(parents=True)
+
+    for name, array in zip(ARRAY_NAMES, arrays):
+        np.save(target / f'{name}.npy', array)
+
+    pointer = base / f'{CURRENT_FILE}.{version}.tmp'
+    pointer.write_text(target.name)
+    os.replace(pointer, base / CURRENT_FILE)
+    prune_models(base)
+    return target
+
+
+def prune_models(base, keep=KEEP_VERSIONS):
+    """
+    Borra las construcciones más antiguas salvo las `keep` últimas y la vigente.
+    Los procesos que aún las tengan abiertas con mmap siguen leyéndolas hasta
+    que recargan el modelo.
+    """
+    try:
+        current = (base / CURRENT_FILE).read_text().strip()
+    except OSError:
+        return
+    versions = sorted(path for path in base.glob(f'{VERSION_PREFIX}*') if path.is_dir())
+    for path in versions[:-keep] if keep else versions:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class ItemSimilarityModel:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.item_ids, self.indptr, self.indices, self.data = (
+            np.load(self.path / f'{name}.npy', mmap_mode='r') for name in ARRAY_NAMES
+        )
+
+    def score(self, rated, limit):
+        """
+        Puntúa los vecinos de los artículos valorados por un usuario.
+
+        `rated` es una lista de (article_id, puntuación). Cada valoración aporta
+        sim(i, j) * (puntuación - 3) a sus vecinos, por lo que el
+        coste depende solo de los artículos valorados y del número de vecinos.
+        Devuelve hasta `limit` tuplas (article_id, score) con score > 0.
+        """
+        if not rated or self.item_ids.size == 0:
+            return []
+
+        rated_ids = np.array([article_id for article_id, _ in rated], dtype=np.int64)
+        # Peso de cada valoración respecto al punto neutro de la escala (3 de 5)
+        weights = np.array([score for _, score in rated], dtype=np.float32) - 3.0
+
+        positions = np.searchsorted(self.item_ids, rated_ids)
+        positions = np.minimum(positions, self.item_ids.size - 1)
+        known = self.item_ids[positions] == rated_ids
+
+        candidate_chunks = []
+        contribution_chunks = []
+        for position, weight in zip(positions[known], weights[known]):
+            start, end = self.indptr[position], self.indptr[position + 1]
+            if start == end or weight == 0:
+                continue
+            candidate_chunks.append(np.asarray(self.indices[start:end]))
+            contribution_chunks.append(np.asarray(self.data[start:end]) * weight)
+
+        if not candidate_chunks:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(candidate_chunks), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(contribution_chunks))
+
+        positive = totals > 0
+        candidates, totals = candidates[positive], totals[positive]
+        if limit < totals.size:
+            best = np.argpartition(-totals, limit - 1)[:limit]
+        else:
+            best = np.arange(totals.size)
+        best = best[np.argsort(-totals[best], kind='stable')]
+        return [(int(self.item_ids[candidates[i]]), float(totals[i])) for i in best]
+
+
+_model = None
+_model_name = None
+_model_stamp = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Modelo vigente (según CURRENT) o None si todavía no se ha construido.
+    CURRENT solo se vuelve a leer cuando cambia su stat (os.replace crea un
+    fichero nuevo en cada publicación).
+    """
+    global _model, _model_name, _model_stamp
+    pointer = model_dir() / CURRENT_FILE
+    try:
+        stat = pointer.stat()
+    except OSError:
+        return None
+    stamp = (str(pointer), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    with _model_lock:
+        if stamp != _model_stamp:
+            try:
+                name = pointer.read_text().strip()
+                if name != _model_name:
+                    _model = ItemSimilarityModel(model_dir() / name)
+                    _model_name = name
+            except OSError:
+                logger.exception('No se pudo cargar el modelo de similitud de %s', pointer)
+                return None
+            _model_stamp = stamp
+        return _model
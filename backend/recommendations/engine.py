@@ -0,0 +1,480 @@
+"""
+Motor de recomendaciones.
+
+Todas las vías que generan recomendaciones (el listado de recomendaciones, la
+vista por usuario y el cambio de intereses del perfil) usan este módulo. El
+motor ejecuta una lista de estrategias en orden de prioridad; cada una propone
+candidatos puntuados y las siguientes solo completan los huecos que quedan:
+
+1. TagOverlapStrategy: coincidencia con los intereses del usuario.
+2. CollaborativeStrategy: artículos bien valorados por usuarios con gustos parecidos.
+3. PopularityStrategy: artículos mejor valorados de la comunidad.
+
+La lista de estrategias se puede cambiar con settings.RECOMMENDATION_STRATEGIES.
+
+La estrategia por intereses implementa la fórmula:
+
+    SCORE = (PESO_USUARIO * COINCIDENCIAS_ETIQUETAS) + (PESO_COMUNIDAD * VALORACION_COMUNIDAD_NORMALIZADA)
+
+Donde:
+- COINCIDENCIAS_ETIQUETAS = etiquetas en común entre el usuario y el artículo,
+  dividido por el número de intereses del usuario (valor entre 0 y 1).
+- VALORACION_COMUNIDAD_NORMALIZADA = rating promedio (1-5) normalizado a 0.2 - 1.0.
+- PESO_USUARIO y PESO_COMUNIDAD = 0.7 y 0.3.
+
+Los candidatos y sus coincidencias salen del índice invertido tag→artículos
+(recommendations.tag_index), sin consultar la base de datos, y se puntúan
+todos a la vez con NumPy.
+"""
+import logging
+import math
+import random
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from articles.leaderboard import POPULAR, avg_rating_from_score, top_articles
+from articles.models import Article, Rating
+from .cache import recommendations_cache_key
+from .collaborative import get_model as get_similarity_model
+from .models import Recommendation
+from .tag_index import get_tag_index
+
+logger = logging.getLogger(__name__)
+
+PESO_USUARIO = 0.7
+PESO_COMUNIDAD = 0.3
+
+# Peso de la valoración comunitaria para los artículos populares de relleno
+PESO_COMUNIDAD_POPULARES = 0.6
+
+MAX_RECOMMENDATIONS = 4
+
+
+def seen_article_ids(user):
+    """
+    Subconsulta con los artículos que el usuario ya ha valorado o escrito
+    """
+    return Article.objects.filter(
+        Q(ratings__user=user) | Q(author=user)
+    ).values('id')
+
+
+def normalize_ratings(avg_ratings):
+    """
+    Convierte valoraciones medias (1-5, NaN si no hay) al rango 0.2 - 1.0
+    """
+    normalized = np.maximum(0.2, np.nan_to_num(avg_ratings, nan=0.0) / 5.0)
+    return np.where(avg_ratings > 0, normalized, 0.2)
+
+
+def top_k(scores, k):
+    """
+    Índices de las k puntuaciones más altas, ordenados de mayor a menor.
+    Usa una ordenación parcial (argpartition) en lugar de ordenar todo el array.
+    """
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if scores.size > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def score_by_interests(interest_ids, excluded_ids, limit, skip_ids=()):
+    """
+    Puntúa todos los artículos con al menos un tag de interés y devuelve los
+    `limit` mejores como lista de tuplas (article_id, score).
+
+    Los candidatos y sus coincidencias salen del índice invertido de tags
+    (recommendations.tag_index); solo se consultan las valoraciones de los
+    candidatos que todavía pueden entrar entre los mejores.
+    """
+    if not interest_ids or limit <= 0:
+        return []
+
+    try:
+        article_ids, match_counts = get_tag_index().match_counts(interest_ids)
+    except Exception:
+        logger.exception('Índice de tags no disponible, se usa la base de datos')
+        return _score_by_interests_from_db(interest_ids, excluded_ids, limit, skip_ids)
+
+    # Los artículos ya vistos se descartan aquí, sobre los candidatos, en lugar
+    # de pasarlos a la consulta: la lista de vistos crece sin límite
+    excluded = set(skip_ids)
+    excluded.update(excluded_ids.values_list('id', flat=True))
+    if excluded:
+        keep = ~np.isin(article_ids, np.fromiter(excluded, dtype=np.int64, count=len(excluded)))
+        article_ids, match_counts = article_ids[keep], match_counts[keep]
+    if not article_ids.size:
+        return []
+
+    # Un candidato con menos coincidencias solo puede superar a otro con más
+    # gracias a la valoración, que aporta como mucho PESO_COMUNIDAD * 0.8 de
+    # diferencia. Se descartan los que no alcanzan ni con la mejor valoración
+    # a quien ocupa el puesto `limit`.
+    rank = min(limit, match_counts.size)
+    threshold = -np.partition(-match_counts, rank - 1)[rank - 1]
+    margin = PESO_COMUNIDAD * 0.8 * len(interest_ids) / PESO_USUARIO
+    keep = match_counts >= threshold - margin
+    article_ids, match_counts = article_ids[keep], match_counts[keep]
+
+    ratings = dict(
+        Article.objects.filter(id__in=article_ids.tolist()).values_list('id', 'avg_rating')
+    )
+    keep = np.fromiter((article_id in ratings for article_id in article_ids.tolist()), dtype=bool, count=article_ids.size)
+    article_ids, match_counts = article_ids[keep], match_counts[keep]
+    if not article_ids.size:
+        return []
+
+    avg_ratings = np.array(
+        [np.nan if ratings[article_id] is None else ratings[article_id] for article_id in article_ids.tolist()],
+        dtype=np.float64,
+    )
+    return _rank_by_interests(article_ids, match_counts, avg_ratings, len(interest_ids), limit)
+
+
+def _rank_by_interests(article_ids, match_counts, avg_ratings, interest_count, limit):
+    coincidencias_etiquetas = match_counts / interest_count
+    valoracion_comunidad = normalize_ratings(avg_ratings)
+    scores = (PESO_USUARIO * coincidencias_etiquetas) + (PESO_COMUNIDAD * valoracion_comunidad)
+
+    # Ajustar al rango 0.1-0.99 y redondear a 2 decimales
+    scores = np.round(np.clip(scores, 0.1, 0.99) * 100) / 100
+
+    best = top_k(scores, limit)
+    return [(int(article_ids[i]), float(scores[i])) for i in best]
+
+
+def _score_by_interests_from_db(interest_ids, excluded_ids, limit, skip_ids=()):
+    """
+    Misma puntuación calculada con una consulta sobre la tabla intermedia
+    """
+    # Una fila por (artículo, tag de interés) junto con la valoración media almacenada
+    rows = list(
+        Article.tags.through.objects.filter(
+            tag_id__in=interest_ids,
+        ).exclude(
+            article_id__in=excluded_ids,
+        ).exclude(
+            article_id__in=list(skip_ids),
+        ).values_list('article_id', 'article__avg_rating')
+    )
+    if not rows:
+        return []
+
+    article_column = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    rating_column = np.fromiter(
+        (np.nan if row[1] is None else row[1] for row in rows),
+        dtype=np.float64,
+        count=len(rows),
+    )
+
+    article_ids, first_index, match_counts = np.unique(
+        article_column, return_index=True, return_counts=True
+    )
+    return _rank_by_interests(
+        article_ids, match_counts, rating_column[first_index], len(interest_ids), limit
+    )
+
+
+def score_popular(excluded_ids, limit, skip_ids=()):
+    """
+    Artículos populares de relleno, puntuados solo con la valoración comunitaria
+    (entre 0.1 y 0.5, siempre por debajo de los basados en intereses).
+
+    Se leen de la clasificación precalculada (articles.leaderboard), pidiendo
+    tantos de más como artículos haya que descartar.
+    """
+    if limit <= 0:
+        return []
+
+    seen = set(excluded_ids.values_list('id', flat=True))
+    popular = [
+        (article_id, avg_rating_from_score(score))
+        for article_id, score in top_articles(POPULAR, limit * 2 + len(seen) + len(skip_ids))
+        if article_id not in seen and article_id not in skip_ids
+    ][:limit * 2]
+
+    # Si hay suficientes, aleatorizar un poco para ofrecer variedad
+    if len(popular) > limit:
+        popular = random.sample(popular, limit)
+
+    if not popular:
+        return []
+
+    avg_ratings = np.array(
+        [np.nan if avg is None else avg for _, avg in popular], dtype=np.float64
+    )
+    scores = np.clip(PESO_COMUNIDAD_POPULARES * normalize_ratings(avg_ratings), 0.1, 0.5)
+    return [(article_id, float(score)) for (article_id, _), score in zip(popular, scores)]
+
+
+class RecommendationContext:
+    """
+    Datos del usuario compartidos por todas las estrategias durante una generación
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def interest_ids(self):
+        profile = getattr(self.user, 'profile', None)
+        if profile is None:
+            return []
+        return list(profile.interests.values_list('id', flat=True))
+
+    @cached_property
+    def excluded_ids(self):
+        return seen_article_ids(self.user)
+
+
+class RecommendationStrategy:
+    """
+    Interfaz de las estrategias: devuelven hasta `limit` tuplas
+    (article_id, score) ordenadas de mayor a menor, sin repetir `skip_ids`.
+    """
+    name = None
+
+    def recommend(self, context, limit, skip_ids):
+        raise NotImplementedError
+
+
+class TagOverlapStrategy(RecommendationStrategy):
+    name = 'tags'
+
+    def recommend(self, context, limit, skip_ids):
+        return score_by_interests(context.interest_ids, context.excluded_ids, limit, skip_ids=skip_ids)
+
+
+class CollaborativeStrategy(RecommendationStrategy):
+    """
+    Filtrado colaborativo. Si existe un modelo ítem-ítem precalculado
+    (recommendations.collaborative) se usa la matriz de similitudes; si no, se
+    recurre a los artículos bien valorados (4 o más) por usuarios que coinciden
+    con este en algún artículo bien valorado. Puntuación entre 0.1 y 0.6.
+    """
+    name = 'collaborative'
+    min_score = 4
+    # Valoraciones más recientes del usuario que se tienen en cuenta con el modelo
+    max_user_ratings = 100
+
+    def recommend(self, context, limit, skip_ids):
+        model = get_similarity_model()
+        if model is not None:
+            return self._recommend_from_model(model, context, limit, skip_ids)
+        return self._recommend_from_ratings(context, limit, skip_ids)
+
+    def _recommend_from_model(self, model, context, limit, skip_ids):
+        rated = list(
+            Rating.objects.filter(user=context.user).order_by('-created_at').values_list(
+                'article_id', 'score'
+            )[:self.max_user_ratings]
+        )
+        rated_ids = {article_id for article_id, _ in rated}
+
+        # Se piden más candidatos de los necesarios para compensar los descartados
+        candidates = [
+            (article_id, score)
+            for article_id, score in model.score(rated, limit * 3 + len(skip_ids))
+            if article_id not in rated_ids and article_id not in skip_ids
+        ]
+        if not candidates:
+            return []
+
+        allowed = set(
+            Article.objects.filter(
+                id__in=[article_id for article_id, _ in candidates],
+            ).exclude(
+                id__in=context.excluded_ids,
+            ).values_list('id', flat=True)
+        )
+        candidates = [item for item in candidates if item[0] in allowed][:limit]
+        return self._scale(candidates)
+
+    def _recommend_from_ratings(self, context, limit, skip_ids):
+        liked = Rating.objects.filter(
+            user=context.user, score__gte=self.min_score,
+        ).values('article_id')
+        neighbours = Rating.objects.filter(
+            article_id__in=liked, score__gte=self.min_score,
+        ).exclude(user=context.user).values('user_id')
+
+        rows = list(
+            Rating.objects.filter(
+                user_id__in=neighbours, score__gte=self.min_score,
+            ).exclude(
+                article_id__in=context.excluded_ids,
+            ).exclude(
+                article_id__in=list(skip_ids),
+            ).values('article_id').annotate(
+                votes=Count('id'),
+            ).order_by('-votes', 'article_id').values_list('article_id', 'votes')[:limit]
+        )
+        return self._scale(rows)
+
+    def _scale(self, rows):
+        if not rows:
+            return []
+        values = np.array([row[1] for row in rows], dtype=np.float64)
+        scores = np.clip(0.6 * values / values.max(), 0.1, 0.6)
+        return [(article_id, float(score)) for (article_id, _), score in zip(rows, scores)]
+
+
+class PopularityStrategy(RecommendationStrategy):
+    name = 'popular'
+
+    def recommend(self, context, limit, skip_ids):
+        return score_popular(context.excluded_ids, limit, skip_ids=skip_ids)
+
+
+DEFAULT_STRATEGIES = [
+    'recommendations.engine.TagOverlapStrategy',
+    'recommendations.engine.CollaborativeStrategy',
+    'recommendations.engine.PopularityStrategy',
+]
+
+
+class RecommendationEngine:
+    def __init__(self, strategies):
+        self.strategies = strategies
+
+    def recommend(self, user, limit=MAX_RECOMMENDATIONS):
+        """
+        Calcula las recomendaciones del usuario sin guardarlas: cada estrategia
+        completa los huecos que han dejado las anteriores.
+        """
+        context = RecommendationContext(user)
+        scored = []
+        chosen = set()
+
+        for strategy in self.strategies:
+            remaining = limit - len(scored)
+            if remaining <= 0:
+                break
+            for article_id, score in strategy.recommend(context, remaining, chosen):
+                if article_id not in chosen:
+                    chosen.add(article_id)
+                    scored.append((article_id, score))
+            logger.debug(
+                'Estrategia %s: %d de %d recomendaciones para el usuario %s',
+                strategy.name, len(scored), limit, user.pk,
+            )
+
+        return scored[:limit]
+
+    def generate(self, user, limit=MAX_RECOMMENDATIONS, write_mode=None):
+        """
+        Regenera y guarda las recomendaciones del usuario en una única
+        transacción. Devuelve las recomendaciones ordenadas por puntuación.
+
+        write_mode (por defecto settings.RECOMMENDATIONS_WRITE_MODE):
+        - 'diff': solo inserta, actualiza o borra las filas que cambian.
+        - 'replace': un DELETE y un bulk_create con todas las filas.
+        """
+        scored = self.recommend(user, limit)
+        write_mode = write_mode or getattr(settings, 'RECOMMENDATIONS_WRITE_MODE', 'diff')
+        if write_mode == 'replace':
+            recommendations = replace_user_recommendations(user, scored)
+        else:
+            recommendations = sync_user_recommendations(user, scored)
+
+        cache.delete(recommendations_cache_key(user.id))
+        return recommendations
+
+
+def replace_user_recommendations(user, scored):
+    recommendations = [
+        Recommendation(user=user, article_id=article_id, score=score)
+        for article_id, score in scored
+    ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user=user).delete()
+        Recommendation.objects.bulk_create(recommendations)
+    return recommendations
+
+
+def diff_recommendations(existing, rows):
+    """
+    Compara las filas guardadas (pk, user_id, article_id, score) con las nuevas
+    (user_id, article_id, score). Devuelve (filas nuevas o con otra puntuación,
+    pks de las filas que ya no se recomiendan).
+    """
+    current = {(user_id, article_id): (pk, score) for pk, user_id, article_id, score in existing}
+    wanted = {(user_id, article_id) for user_id, article_id, _ in rows}
+
+    changed = [
+        (user_id, article_id, score)
+        for user_id, article_id, score in rows
+        if (user_id, article_id) not in current
+        or not math.isclose(current[(user_id, article_id)][1], score, abs_tol=1e-9)
+    ]
+    stale = [pk for key, (pk, _) in current.items() if key not in wanted]
+    return changed, stale
+
+
+def sync_user_recommendations(user, scored):
+    """
+    Aplica solo las diferencias con las recomendaciones guardadas: las filas
+    que no cambian no se reescriben, lo que en PostgreSQL evita generar tuplas
+    muertas (bloat) en cada regeneración.
+    """
+    with transaction.atomic():
+        existing = list(
+            Recommendation.objects.select_for_update().filter(user=user).values_list(
+                'pk', 'user_id', 'article_id', 'score'
+            )
+        )
+        changed, stale = diff_recommendations(
+            existing, [(user.pk, article_id, score) for article_id, score in scored]
+        )
+
+        if stale:
+            Recommendation.objects.filter(pk__in=stale).delete()
+        if changed:
+            # update_conflicts cubre también una regeneración concurrente del mismo usuario
+            Recommendation.objects.bulk_create(
+                [
+                    Recommendation(user=user, article_id=article_id, score=score)
+                    for _, article_id, score in changed
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'article'],
+                update_fields=['score'],
+            )
+
+    existing_ids = {article_id: pk for pk, _, article_id, _ in existing}
+    return [
+        Recommendation(pk=existing_ids.get(article_id), user=user, article_id=article_id, score=score)
+        for article_id, score in scored
+    ]
+
+
+def get_engine():
+    strategies = getattr(settings, 'RECOMMENDATION_STRATEGIES', DEFAULT_STRATEGIES)
+    return RecommendationEngine([import_string(path)() for path in strategies])
+
+
+def generate_recommendations(user, limit=MAX_RECOMMENDATIONS):
+    return get_engine().generate(user, limit)
+
+
+def popular_fallback(user, limit, skip_ids=()):
+    """
+    Recomendaciones populares sin guardar, para completar la respuesta mientras
+    se recalculan en segundo plano las recomendaciones del usuario.
+    """
+    scored = PopularityStrategy().recommend(RecommendationContext(user), limit, set(skip_ids))
+    articles = Article.objects.for_cards().in_bulk([article_id for article_id, _ in scored])
+    return [
+        Recommendation(user=user, article=articles[article_id], score=score)
+        for article_id, score in scored
+        if article_id in articles
+    ]
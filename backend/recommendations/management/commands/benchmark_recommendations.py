@@ -0,0 +1,143 @@
+import json
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from recommendations.benchmark import build_catalog, compare, entry_points, environment, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia, las consultas, la memoria y la calidad (precision@k, cobertura) de '
+        'cada punto de entrada del recomendador sobre un catálogo sintético en una base de datos desechable'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=3000)
+        parser.add_argument('--tags', type=int, default=150)
+        parser.add_argument('--ratings-per-user', type=int, default=20)
+        parser.add_argument('--interests-per-user', type=int, default=4)
+        parser.add_argument('--holdout', type=float, default=0.2, help='Fracción de valoraciones reservada para evaluar')
+        parser.add_argument('--sample-users', type=int, default=200, help='Usuarios sobre los que se mide')
+        parser.add_argument('--k', type=int, default=4, help='Recomendaciones evaluadas por usuario')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--entry-point', action='append', dest='entry_points',
+            help='Limitar a este punto de entrada (se puede repetir)',
+        )
+        parser.add_argument('--no-model', action='store_true', help='No construir el modelo colaborativo ítem-ítem')
+        parser.add_argument('--output', help='Fichero donde guardar el informe JSON')
+        parser.add_argument('--baseline', help='Informe anterior con el que comparar')
+        parser.add_argument(
+            '--max-regression', type=float, default=20.0,
+            help='Porcentaje de empeoramiento de p95 o consultas que se considera regresión',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        random.seed(options['seed'])
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as model_dir, override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+                RECOMMENDATIONS_TAG_INDEX_BACKEND='memory',
+                ARTICLES_LEADERBOARD_BACKEND='memory',
+                RECOMMENDATIONS_QUEUE_BACKEND='sync',
+                RECOMMENDATIONS_MODEL_DIR=model_dir,
+            ):
+                report = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self._print_summary(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(f'Informe guardado en {options["output"]}')
+
+        if baseline is not None:
+            regressions = compare(report, baseline, options['max_regression'])
+            for name, metric, before, after, change in regressions:
+                self.stdout.write(self.style.WARNING(f'  {name} {metric}: {before} -> {after} ({change})'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regresiones respecto a {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f'Sin regresiones respecto a {options["baseline"]}'))
+
+    def _run(self, options):
+        from recommendations.collaborative import compute_item_similarity, load_rating_arrays, save_model
+        from users.models import User
+
+        started = time.perf_counter()
+        catalog, relevant = build_catalog(
+            users=options['users'],
+            articles=options['articles'],
+            tags=options['tags'],
+            ratings_per_user=options['ratings_per_user'],
+            interests_per_user=options['interests_per_user'],
+            holdout=options['holdout'],
+            seed=options['seed'],
+        )
+        catalog['build_seconds'] = round(time.perf_counter() - started, 2)
+
+        if not options['no_model']:
+            started = time.perf_counter()
+            save_model(compute_item_similarity(*load_rating_arrays()))
+            catalog['model_seconds'] = round(time.perf_counter() - started, 2)
+
+        self.stdout.write(
+            f'Catálogo: {catalog["users"]} usuarios, {catalog["articles"]} artículos, '
+            f'{catalog["ratings"]} valoraciones ({catalog["build_seconds"]}s)'
+        )
+
+        # Muestra reproducible de usuarios con artículos relevantes reservados
+        candidates = sorted(relevant)
+        evaluated = random.Random(options['seed']).sample(candidates, min(options['sample_users'], len(candidates)))
+        users = list(User.objects.filter(pk__in=evaluated).select_related('profile').order_by('pk'))
+
+        available = entry_points(options['k'])
+        selected = options['entry_points'] or list(available)
+        unknown = set(selected) - set(available)
+        if unknown:
+            raise CommandError(f'Puntos de entrada desconocidos: {", ".join(sorted(unknown))}')
+
+        results = {}
+        for name in selected:
+            self.stdout.write(f'  {name}...')
+            results[name] = measure(available[name], users, relevant, options['k'], catalog['articles'])
+
+        return {
+            'generated_at': timezone.now().isoformat(),
+            'environment': environment(),
+            'parameters': {
+                key: options[key] for key in (
+                    'users', 'articles', 'tags', 'ratings_per_user', 'interests_per_user',
+                    'holdout', 'sample_users', 'k', 'seed', 'no_model',
+                )
+            },
+            'catalog': catalog,
+            'entry_points': results,
+        }
+
+    def _print_summary(self, report):
+        k = report['parameters']['k']
+        self.stdout.write(f'{"punto de entrada":32} {"p50 ms":>8} {"p95 ms":>8} {"consultas":>9} {"mem KB":>9} {f"P@{k}":>7} {"cobertura":>9}')
+        for name, result in report['entry_points'].items():
+            quality = result.get('quality', {})
+            precision = quality.get(f'precision_at_{k}')
+            coverage = quality.get('coverage')
+            self.stdout.write(
+                f'{name:32} {result["latency_ms"]["p50"]:>8} {result["latency_ms"]["p95"]:>8} '
+                f'{result["queries"]["mean"]:>9} {result["peak_memory_kb"]:>9} '
+                f'{"-" if precision is None else precision:>7} {"-" if coverage is None else coverage:>9}'
+            )
@@ -0,0 +1,150 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recommendations.cache import recommendations_cache_key
+from recommendations.engine import MAX_RECOMMENDATIONS, diff_recommendations, get_engine
+from recommendations.models import Recommendation
+from recommendations.workers import init_worker
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def compute_batch(user_ids, limit):
+    """
+    Calcula las recomendaciones de un lote de usuarios sin escribir en la base
+    de datos. Devuelve (user_ids, filas, ids con error) con filas
+    (user_id, article_id, score).
+    """
+    engine = get_engine()
+    rows = []
+    failed_ids = []
+
+    for user in User.objects.filter(pk__in=user_ids).select_related('profile'):
+        try:
+            rows.extend(
+                (user.pk, article_id, score)
+                for article_id, score in engine.recommend(user, limit)
+            )
+        except Exception:
+            logger.exception('Error calculando las recomendaciones del usuario %s', user.pk)
+            failed_ids.append(user.pk)
+
+    return user_ids, rows, failed_ids
+
+
+class Command(BaseCommand):
+    help = 'Precalcula las recomendaciones de todos los usuarios por lotes, repartiendo el trabajo entre procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Usuarios por lote')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos de cálculo')
+        parser.add_argument(
+            '--max-pending', type=int, default=None,
+            help='Lotes enviados al pool a la vez (por defecto el doble de procesos)',
+        )
+        parser.add_argument('--limit', type=int, default=MAX_RECOMMENDATIONS, help='Recomendaciones por usuario')
+        parser.add_argument('--write-batch-size', type=int, default=1000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        self.write_batch_size = options['write_batch_size']
+        limit = options['limit']
+        workers = max(1, options['workers'])
+        max_pending = max(1, options['max_pending'] or 2 * workers)
+
+        started = time.perf_counter()
+        self.users_done = 0
+        self.rows_written = 0
+        self.rows_deleted = 0
+        self.errors = 0
+
+        batches = self._user_batches(options['batch_size'])
+
+        if workers == 1:
+            for user_ids in batches:
+                self._write_batch(*compute_batch(user_ids, limit))
+        else:
+            # Con forkserver los procesos no heredan las conexiones abiertas del
+            # padre, que sigue leyendo ids y escribiendo lotes mientras calculan
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=init_worker,
+            )
+            with executor:
+                # Los lotes se envían a medida que terminan otros, sin cargar
+                # todos los ids ni encolar todos los trabajos de antemano
+                pending = set()
+                for user_ids in batches:
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._write_batch(*future.result())
+                    pending.add(executor.submit(compute_batch, user_ids, limit))
+                for future in wait(pending).done:
+                    self._write_batch(*future.result())
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.users_done} usuarios en {elapsed:.1f}s: {self.rows_written} recomendaciones escritas '
+            f'y {self.rows_deleted} eliminadas ({self.users_done / elapsed if elapsed else 0:.0f} usuarios/s, '
+            f'{self.errors} errores)'
+        ))
+
+    def _user_batches(self, batch_size):
+        """
+        Lotes de ids de usuarios activos, leídos de uno en uno por pk
+        """
+        users = User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        while True:
+            batch = list(users.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]
+
+    def _write_batch(self, user_ids, rows, failed_ids):
+        """
+        Inserta o actualiza sobre la clave única (user, article) solo las
+        recomendaciones nuevas o con otra puntuación, y elimina las que ya no
+        forman parte del resultado. Los usuarios con error conservan sus
+        recomendaciones y su entrada de cache.
+        """
+        failed = set(failed_ids)
+        user_ids = [user_id for user_id in user_ids if user_id not in failed]
+
+        with transaction.atomic():
+            existing = Recommendation.objects.filter(user_id__in=user_ids).values_list(
+                'pk', 'user_id', 'article_id', 'score'
+            )
+            changed, stale_ids = diff_recommendations(existing, rows)
+
+            Recommendation.objects.bulk_create(
+                [
+                    Recommendation(user_id=user_id, article_id=article_id, score=score)
+                    for user_id, article_id, score in changed
+                ],
+                batch_size=self.write_batch_size,
+                update_conflicts=True,
+                unique_fields=['user', 'article'],
+                update_fields=['score'],
+            )
+
+            for start in range(0, len(stale_ids), self.write_batch_size):
+                Recommendation.objects.filter(pk__in=stale_ids[start:start + self.write_batch_size]).delete()
+
+        cache.delete_many([recommendations_cache_key(user_id) for user_id in user_ids])
+
+        self.users_done += len(user_ids)
+        self.rows_written += len(changed)
+        self.rows_deleted += len(stale_ids)
+        self.errors += len(failed)
+        self.stdout.write(f'  {self.users_done} usuarios procesados')
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations.tag_index import rebuild_tag_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice invertido tag -> artículos usado para generar candidatos por intereses'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = rebuild_tag_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice de tags ({type(index).__name__}) reconstruido en {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from recommendations.tasks import RedisQueue
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de Redis con los recalculos de recomendaciones pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=5, help='Segundos de espera por trabajo')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Terminar tras N trabajos (0 = sin límite)')
+
+    def handle(self, *args, **options):
+        if not settings.REDIS_URL:
+            raise CommandError('REDIS_URL no está configurado')
+
+        queue = RedisQueue(settings.REDIS_URL)
+        processed = 0
+        self.stdout.write('Esperando trabajos de recomendaciones...')
+
+        while not options['max_jobs'] or processed < options['max_jobs']:
+            close_old_connections()
+            try:
+                user_id = queue.work(timeout=options['timeout'])
+            except Exception as e:
+                self.stderr.write(f'Error procesando trabajo: {e}')
+                continue
+            if user_id is not None:
+                processed += 1
+                self.stdout.write(f'Recomendaciones recalculadas para el usuario {user_id}')
@@ -1,6 +1,20 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
 from django.conf import settings
-from articles.models import Article
+from articles.models import Article, Tag
+from .tag_index import index_tags, unindex_tags
+
+class RecommendationQuerySet(models.QuerySet):
+    def with_articles(self):
+        """
+        Precarga los artículos recomendados con el mismo plan de consulta que
+        usan los listados de artículos (autor, continente y tags).
+        """
+        return self.prefetch_related(
+            Prefetch('article', queryset=Article.objects.for_cards())
+        )
 
 class Recommendation(models.Model):
     user = models.ForeignKey(
@@ -18,9 +32,60 @@ class Recommendation(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = RecommendationQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-score']
         unique_together = ['user', 'article']
     
     def __str__(self):
         return f"Recomendación de {self.article.title} para {self.user.email} ({self.score:.2f})"
+
+
+def _tag_pairs(instance, reverse, pk_set):
+    """
+    Pares (article_id, tag_id) afectados por un cambio en Article.tags
+    """
+    if reverse:
+        return [(article_id, instance.pk) for article_id in pk_set]
+    return [(instance.pk, tag_id) for tag_id in pk_set]
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_tag_index(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Mantiene el índice invertido de tags (recommendations.tag_index) al
+    confirmarse la transacción. En clear() se guardan antes los ids afectados,
+    porque post_clear no los recibe.
+    """
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_tag_pks = set(instance.articles.values_list('pk', flat=True))
+        else:
+            instance._cleared_tag_pks = set(instance.tags.values_list('pk', flat=True))
+        return
+
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_tag_pks', None)
+        action = 'post_remove'
+
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    pairs = _tag_pairs(instance, reverse, pk_set)
+    if action == 'post_add':
+        transaction.on_commit(lambda: index_tags(pairs))
+    else:
+        transaction.on_commit(lambda: unindex_tags(pairs))
+
+@receiver(pre_delete, sender=Article)
+def unindex_deleted_article_tags(sender, instance, **kwargs):
+    # Las filas de la tabla intermedia se borran en cascada sin enviar m2m_changed
+    pairs = [(instance.pk, tag_id) for tag_id in instance.tags.values_list('pk', flat=True)]
+    if pairs:
+        transaction.on_commit(lambda: unindex_tags(pairs))
+
+@receiver(pre_delete, sender=Tag)
+def unindex_deleted_tag(sender, instance, **kwargs):
+    pairs = [(article_id, instance.pk) for article_id in instance.articles.values_list('pk', flat=True)]
+    if pairs:
+        transaction.on_commit(lambda: unindex_tags(pairs))
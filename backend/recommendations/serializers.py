@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Recommendation
-from articles.serializers import ArticleSerializer
+from articles.serializers import ArticleListSerializer
+from blog_viaje.sparse import SparseFieldsMixin
 
-class RecommendationSerializer(serializers.ModelSerializer):
-    article = ArticleSerializer(read_only=True)
+class RecommendationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    article = ArticleListSerializer(read_only=True)
     
     class Meta:
         model = Recommendation
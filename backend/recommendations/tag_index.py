@@ -0,0 +1,257 @@
+"""
+Índice invertido tag -> artículos para generar candidatos por intereses.
+
+Para cada tag se guarda la lista de artículos que lo tienen (posting list).
+Los candidatos de un usuario son la unión de las listas de sus intereses y el
+número de coincidencias de cada artículo es las veces que aparece en ellas, así
+que generar candidatos no consulta la base de datos.
+
+El índice se construye una vez a partir de la tabla intermedia Article.tags y
+después se mantiene con las señales m2m_changed y pre_delete de
+`recommendations.models`, aplicando los cambios al confirmarse la transacción.
+
+Backends (settings.RECOMMENDATIONS_TAG_INDEX_BACKEND):
+- 'redis': un sorted set por tag en el Redis de la cache, compartido por todos
+  los workers. La unión con ZUNION devuelve directamente las coincidencias.
+  Como Redis puede expulsar claves sueltas, cada consulta comprueba que siguen
+  presentes los sets de los tags indexados; si falta alguno el índice deja de
+  estar listo y se reconstruye.
+- 'memory': arrays de NumPy ordenados dentro del propio proceso (desarrollo).
+  Cada proceso solo ve los cambios que se hacen en él.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from blog_viaje.cache import namespaced_key
+
+logger = logging.getLogger(__name__)
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def load_tag_pairs(chunk_size=50000):
+    """
+    Recorre la tabla intermedia Article.tags devolviendo tuplas (article_id, tag_id)
+    """
+    from articles.models import Article
+
+    return Article.tags.through.objects.order_by().values_list(
+        'article_id', 'tag_id'
+    ).iterator(chunk_size=chunk_size)
+
+
+def _group_by_tag(pairs):
+    postings = defaultdict(list)
+    for article_id, tag_id in pairs:
+        postings[tag_id].append(article_id)
+    return postings
+
+
+class MemoryTagIndex:
+    """
+    Posting lists como arrays ordenados de ids. Las escrituras crean arrays
+    nuevos y sustituyen la referencia, de modo que las lecturas no necesitan lock.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        return self._ready
+
+    def rebuild(self, pairs):
+        postings = {
+            tag_id: np.unique(np.array(article_ids, dtype=np.int64))
+            for tag_id, article_ids in _group_by_tag(pairs).items()
+        }
+        with self._lock:
+            self._postings = postings
+            self._ready = True
+
+    def add(self, pairs):
+        with self._lock:
+            for tag_id, article_ids in _group_by_tag(pairs).items():
+                current = self._postings.get(tag_id, EMPTY)
+                self._postings[tag_id] = np.union1d(current, np.array(article_ids, dtype=np.int64))
+
+    def remove(self, pairs):
+        with self._lock:
+            for tag_id, article_ids in _group_by_tag(pairs).items():
+                current = self._postings.get(tag_id)
+                if current is not None:
+                    self._postings[tag_id] = np.setdiff1d(
+                        current, np.array(article_ids, dtype=np.int64), assume_unique=True
+                    )
+
+    def match_counts(self, tag_ids):
+        postings = [self._postings.get(tag_id, EMPTY) for tag_id in tag_ids]
+        postings = [posting for posting in postings if posting.size]
+        if not postings:
+            return EMPTY, EMPTY
+        return np.unique(np.concatenate(postings), return_counts=True)
+
+
+class TagIndexUnavailable(Exception):
+    pass
+
+
+class RedisTagIndex:
+    """
+    Un sorted set por tag con los artículos como miembros (puntuación 1).
+
+    Cada set lleva además el miembro SENTINEL (puntuación 0) para que no
+    desaparezca al quedarse sin artículos, y el set `tags_key` registra los
+    tags indexados: un tag registrado cuyo set no existe se ha expulsado.
+    """
+    ready_key = namespaced_key('recommendations', 'tag-index', 'ready')
+    tags_key = namespaced_key('recommendations', 'tag-index', 'tags')
+    batch_size = 5000
+    SENTINEL = '_'
+
+    def __init__(self, connection):
+        self.redis = connection
+
+    def tag_key(self, tag_id):
+        return namespaced_key('recommendations', 'tag-index', 'tag', tag_id)
+
+    def is_ready(self):
+        return self.redis.exists(self.ready_key, self.tags_key) == 2
+
+    def rebuild(self, pairs):
+        pattern = namespaced_key('recommendations', 'tag-index', 'tag', '*')
+        stale = list(self.redis.scan_iter(match=pattern, count=1000))
+
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.delete(self.ready_key, self.tags_key)
+        for start in range(0, len(stale), self.batch_size):
+            pipeline.delete(*stale[start:start + self.batch_size])
+        postings = _group_by_tag(pairs)
+        for tag_id, article_ids in postings.items():
+            pipeline.zadd(self.tag_key(tag_id), {self.SENTINEL: 0})
+            for start in range(0, len(article_ids), self.batch_size):
+                pipeline.zadd(
+                    self.tag_key(tag_id),
+                    dict.fromkeys(article_ids[start:start + self.batch_size], 1),
+                )
+        # El registro siempre contiene SENTINEL para existir aunque no haya tags
+        tag_ids = [self.SENTINEL, *postings]
+        for start in range(0, len(tag_ids), self.batch_size):
+            pipeline.sadd(self.tags_key, *tag_ids[start:start + self.batch_size])
+        pipeline.set(self.ready_key, 1)
+        pipeline.execute()
+
+    def add(self, pairs):
+        postings = _group_by_tag(pairs)
+        if not postings:
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        for tag_id, article_ids in postings.items():
+            pipeline.zadd(self.tag_key(tag_id), {self.SENTINEL: 0, **dict.fromkeys(article_ids, 1)})
+        pipeline.sadd(self.tags_key, *postings)
+        pipeline.execute()
+
+    def remove(self, pairs):
+        pipeline = self.redis.pipeline(transaction=False)
+        for tag_id, article_ids in _group_by_tag(pairs).items():
+            pipeline.zrem(self.tag_key(tag_id), *article_ids)
+        pipeline.execute()
+
+    def match_counts(self, tag_ids):
+        tag_ids = list(dict.fromkeys(tag_ids))
+        if not tag_ids:
+            return EMPTY, EMPTY
+        keys = [self.tag_key(tag_id) for tag_id in tag_ids]
+
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.exists(self.ready_key, self.tags_key)
+        pipeline.smismember(self.tags_key, tag_ids)
+        pipeline.exists(*keys)
+        pipeline.zunion(keys, withscores=True)
+        ready, registered, existing, members = pipeline.execute()
+
+        if ready != 2 or existing < sum(registered):
+            # Alguna clave se ha expulsado: el resultado no sería completo
+            self.redis.delete(self.ready_key)
+            raise TagIndexUnavailable('Faltan claves del índice de tags en Redis')
+
+        members = [(member, count) for member, count in members if member != self.SENTINEL.encode()]
+        if not members:
+            return EMPTY, EMPTY
+        article_ids = np.fromiter((int(member) for member, _ in members), dtype=np.int64, count=len(members))
+        counts = np.fromiter((count for _, count in members), dtype=np.int64, count=len(members))
+        # Ordenados por id como en MemoryTagIndex, para desempatar igual
+        order = np.argsort(article_ids, kind='stable')
+        return article_ids[order], counts[order]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _get_backend():
+    global _index
+    if _index is None:
+        backend = getattr(settings, 'RECOMMENDATIONS_TAG_INDEX_BACKEND', 'memory')
+        if backend == 'redis':
+            from django_redis import get_redis_connection
+
+            _index = RedisTagIndex(get_redis_connection('default'))
+        else:
+            _index = MemoryTagIndex()
+    return _index
+
+
+def get_tag_index():
+    """
+    Índice configurado. Si todavía no se ha construido se carga desde la base
+    de datos una sola vez (también se puede hacer con `manage.py rebuild_tag_index`).
+    """
+    with _index_lock:
+        index = _get_backend()
+        if not index.is_ready():
+            index.rebuild(load_tag_pairs())
+        return index
+
+
+def rebuild_tag_index():
+    """
+    Reconstruye el índice completo desde la tabla intermedia
+    """
+    with _index_lock:
+        index = _get_backend()
+        index.rebuild(load_tag_pairs())
+        return index
+
+
+def _apply(method, pairs):
+    try:
+        getattr(get_tag_index(), method)(pairs)
+    except Exception:
+        logger.exception('No se pudo actualizar el índice de tags')
+
+
+def index_tags(pairs):
+    _apply('add', pairs)
+
+
+def unindex_tags(pairs):
+    _apply('remove', pairs)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    """
+    Descarta la instancia creada con la configuración anterior (override_settings)
+    """
+    global _index
+    if setting in ('RECOMMENDATIONS_TAG_INDEX_BACKEND', 'CACHES'):
+        with _index_lock:
+            _index = None
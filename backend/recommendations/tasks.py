@@ -0,0 +1,183 @@
+"""
+Recalculo de recomendaciones fuera del ciclo de la petición.
+
+Las peticiones solo encolan el identificador del usuario; un trabajador
+recalcula sus recomendaciones con el motor (recommendations.engine). Mientras
+tanto se siguen sirviendo las recomendaciones anteriores, ya que el motor
+reemplaza las filas dentro de una transacción.
+
+Backends (settings.RECOMMENDATIONS_QUEUE_BACKEND):
+- 'redis': cola en Redis consumida por `manage.py run_recommendation_worker`.
+- 'thread': pool de hilos dentro del propio proceso (desarrollo).
+- 'sync': recalcula en el momento (tests y scripts).
+
+En todos los casos las peticiones repetidas para un usuario que ya está en
+cola se agrupan en un único recalculo.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.db import close_old_connections, transaction
+
+from blog_viaje.cache import namespaced_key
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_user_recommendations(user_id):
+    """
+    Recalcula y guarda las recomendaciones de un usuario
+    """
+    # Importamos aquí para evitar importaciones circulares
+    from users.models import User
+    from .engine import generate_recommendations
+
+    try:
+        user = User.objects.select_related('profile').get(pk=user_id)
+    except User.DoesNotExist:
+        return
+    generate_recommendations(user)
+
+
+class SyncQueue:
+    def enqueue(self, user_id):
+        refresh_user_recommendations(user_id)
+        return True
+
+
+class ThreadPoolQueue:
+    """
+    Cola en memoria para desarrollo. Si llega una petición para un usuario que
+    se está recalculando, se repite el cálculo una sola vez al terminar.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommendations')
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._dirty = set()
+
+    def enqueue(self, user_id):
+        with self._lock:
+            if user_id in self._queued:
+                self._dirty.add(user_id)
+                return False
+            self._queued.add(user_id)
+        self._executor.submit(self._run, user_id)
+        return True
+
+    def _run(self, user_id):
+        try:
+            close_old_connections()
+            refresh_user_recommendations(user_id)
+        except Exception:
+            logger.exception('Error recalculando recomendaciones del usuario %s', user_id)
+        finally:
+            close_old_connections()
+
+        with self._lock:
+            if user_id in self._dirty:
+                self._dirty.discard(user_id)
+                rerun = True
+            else:
+                self._queued.discard(user_id)
+                rerun = False
+        if rerun:
+            self._executor.submit(self._run, user_id)
+
+
+class RedisQueue:
+    """
+    Cola compartida por todos los procesos: un conjunto ordenado por el momento
+    de encolado. ZADD NX encola y evita duplicados en una sola operación
+    atómica. El trabajador saca al usuario antes de calcular, así que un cambio
+    que llegue durante el cálculo vuelve a encolarse; si el cálculo falla, el
+    usuario se vuelve a encolar hasta MAX_ATTEMPTS veces.
+    """
+    queue_key = namespaced_key('recommendations', 'refresh-queue')
+    attempts_key = namespaced_key('recommendations', 'refresh-attempts')
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, url):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+
+    def enqueue(self, user_id):
+        return bool(self.redis.zadd(self.queue_key, {user_id: time.time()}, nx=True))
+
+    def work(self, timeout=5):
+        """
+        Procesa un trabajo de la cola. Devuelve el id del usuario o None si no había trabajos.
+        """
+        item = self.redis.bzpopmin([self.queue_key], timeout=timeout)
+        if item is None:
+            return None
+        user_id = int(item[1])
+        try:
+            refresh_user_recommendations(user_id)
+        except Exception:
+            attempts = self.redis.hincrby(self.attempts_key, user_id)
+            if attempts < self.MAX_ATTEMPTS:
+                logger.exception(
+                    'Error recalculando recomendaciones del usuario %s (intento %d), se vuelve a encolar',
+                    user_id, attempts,
+                )
+                self.enqueue(user_id)
+            else:
+                logger.exception(
+                    'Error recalculando recomendaciones del usuario %s; se descarta tras %d intentos',
+                    user_id, attempts,
+                )
+                self.redis.hdel(self.attempts_key, user_id)
+            raise
+        self.redis.hdel(self.attempts_key, user_id)
+        return user_id
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            backend = getattr(settings, 'RECOMMENDATIONS_QUEUE_BACKEND', 'thread')
+            if backend == 'redis':
+                _queue = RedisQueue(settings.REDIS_URL)
+            elif backend == 'sync':
+                _queue = SyncQueue()
+            else:
+                _queue = ThreadPoolQueue()
+        return _queue
+
+
+def enqueue_recommendation_refresh(user_id):
+    """
+    Programa el recalculo de las recomendaciones del usuario cuando se confirme
+    la transacción en curso (para que el trabajador vea los datos nuevos).
+    """
+    def enqueue():
+        try:
+            get_queue().enqueue(user_id)
+        except Exception:
+            logger.exception('No se pudo encolar el recalculo de recomendaciones del usuario %s', user_id)
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    """
+    Descarta la instancia creada con la configuración anterior (override_settings)
+    """
+    global _queue
+    if setting in ('RECOMMENDATIONS_QUEUE_BACKEND', 'REDIS_URL'):
+        with _queue_lock:
+            _queue = None
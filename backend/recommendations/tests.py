@@ -1,3 +1,180 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from articles.leaderboard import rebuild_leaderboards
+from articles.models import Article, Tag, save_rating
+from users.models import Profile, User
+from . import collaborative, tasks
+from .engine import MAX_RECOMMENDATIONS, diff_recommendations, generate_recommendations
+from .models import Recommendation
+from .tag_index import rebuild_tag_index
+
+try:
+    import fakeredis
+except ImportError:  # fakeredis está en requirements-dev.txt
+    fakeredis = None
+
+
+class RecommendationTestData:
+    """
+    Un lector interesado en un tag y artículos de otra autora con ese tag
+    (suficientes para no depender del relleno con populares, que es aleatorio)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='autora@example.com', password='x')
+        cls.reader = User.objects.create_user(email='lector@example.com', password='x')
+        cls.tag = Tag.objects.create(name='Playas', slug='playas')
+        Profile.objects.create(user=cls.reader).interests.add(cls.tag)
+        cls.articles = []
+        for i in range(MAX_RECOMMENDATIONS + 2):
+            article = Article.objects.create(
+                title=f'Playa {i}', slug=f'playa-{i}', author=cls.author, content=f'<p>Playa {i}</p>',
+            )
+            article.tags.add(cls.tag)
+            cls.articles.append(article)
+        save_rating(cls.author, cls.articles[1], 5)
+
+    def setUp(self):
+        cache.clear()
+        rebuild_tag_index()
+        rebuild_leaderboards()
+
+
+class DiffWriteTests(RecommendationTestData, TestCase):
+    def test_diff_recommendations(self):
+        existing = [(1, 7, 10, 0.5), (2, 7, 11, 0.4), (3, 7, 12, 0.3)]
+        changed, stale = diff_recommendations(existing, [(7, 10, 0.5), (7, 11, 0.45), (7, 13, 0.2)])
+        self.assertEqual(changed, [(7, 11, 0.45), (7, 13, 0.2)])
+        self.assertEqual(stale, [3])
+
+    def test_regenerating_unchanged_recommendations_writes_nothing(self):
+        generate_recommendations(self.reader)
+        rows = list(Recommendation.objects.filter(user=self.reader).values_list('pk', 'article_id', 'score'))
+        self.assertEqual(len(rows), MAX_RECOMMENDATIONS)
+
+        with CaptureQueriesContext(connection) as context:
+            generate_recommendations(self.reader)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'recommendations_recommendation' in query['sql']
+        ]
+        self.assertEqual(writes, [])
+        self.assertCountEqual(
+            Recommendation.objects.filter(user=self.reader).values_list('pk', 'article_id', 'score'), rows,
+        )
+
+    def test_stale_rows_are_deleted(self):
+        generate_recommendations(self.reader)
+        # El índice de tags se actualiza al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.articles[0].delete()
+        generate_recommendations(self.reader)
+        article_ids = set(Recommendation.objects.filter(user=self.reader).values_list('article_id', flat=True))
+        self.assertNotIn(self.articles[0].pk, article_ids)
+
+    @override_settings(RECOMMENDATIONS_WRITE_MODE='replace')
+    def test_replace_mode_rewrites_rows(self):
+        generate_recommendations(self.reader)
+        before = set(Recommendation.objects.filter(user=self.reader).values_list('pk', flat=True))
+        generate_recommendations(self.reader)
+        after = set(Recommendation.objects.filter(user=self.reader).values_list('pk', flat=True))
+        self.assertFalse(before & after)
+
+
+@override_settings(RECOMMENDATIONS_QUEUE_BACKEND='sync')
+class RecommendationViewTests(RecommendationTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_list_fills_with_popular_articles_and_refreshes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            results = self.client.get('/api/recommendations/').json()['results']
+        self.assertEqual(len(results), MAX_RECOMMENDATIONS)
+        self.assertTrue(all(item['id'] is None for item in results))
+        self.assertEqual(Recommendation.objects.filter(user=self.reader).count(), MAX_RECOMMENDATIONS)
+
+        results = self.client.get('/api/recommendations/').json()['results']
+        self.assertTrue(all(item['id'] is not None for item in results))
+
+    def test_user_view_stores_the_shared_limit(self):
+        results = self.client.get('/api/recommendations/user/').json()['results']
+        self.assertEqual(len(results), MAX_RECOMMENDATIONS)
+        self.assertEqual(Recommendation.objects.filter(user=self.reader).count(), MAX_RECOMMENDATIONS)
+
+
+class RedisQueueTests(TestCase):
+    def setUp(self):
+        if fakeredis is None:
+            self.skipTest('fakeredis no está instalado')
+        self.queue = tasks.RedisQueue.__new__(tasks.RedisQueue)
+        self.queue.redis = fakeredis.FakeRedis()
+
+    def test_enqueue_deduplicates(self):
+        self.assertTrue(self.queue.enqueue(1))
+        self.assertFalse(self.queue.enqueue(1))
+        self.assertTrue(self.queue.enqueue(2))
+        with mock.patch.object(tasks, 'refresh_user_recommendations') as refresh:
+            self.assertEqual(self.queue.work(timeout=1), 1)
+            self.assertEqual(self.queue.work(timeout=1), 2)
+            self.assertIsNone(self.queue.work(timeout=1))
+        self.assertEqual([call.args for call in refresh.call_args_list], [(1,), (2,)])
+
+    def test_failed_refresh_is_retried_then_dropped(self):
+        self.queue.enqueue(1)
+        with mock.patch.object(tasks, 'refresh_user_recommendations', side_effect=RuntimeError), \
+                self.assertLogs('recommendations.tasks', 'ERROR'):
+            for _ in range(tasks.RedisQueue.MAX_ATTEMPTS):
+                with self.assertRaises(RuntimeError):
+                    self.queue.work(timeout=1)
+        self.assertEqual(self.queue.redis.zcard(self.queue.queue_key), 0)
+        self.assertFalse(self.queue.redis.exists(self.queue.attempts_key))
+
+
+class CollaborativeModelTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        pairs = np.unique(rng.integers(0, 300, size=(3000, 2)), axis=0)
+        self.users, self.articles = pairs[:, 0], pairs[:, 1]
+        self.scores = rng.integers(1, 6, size=len(pairs)).astype(np.float32)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def neighbours(self, model):
+        item_ids, indptr, indices, data = model
+        return [
+            sorted(zip(indices[indptr[row]:indptr[row + 1]].tolist(), np.round(data[indptr[row]:indptr[row + 1]], 5).tolist()))
+            for row in range(item_ids.size)
+        ]
+
+    def test_blocks_match_single_pass(self):
+        blocked = collaborative.compute_item_similarity(self.users, self.articles, self.scores, neighbours=5, block_size=16)
+        single = collaborative.compute_item_similarity(self.users, self.articles, self.scores, neighbours=5, block_size=10_000)
+        self.assertEqual(self.neighbours(blocked), self.neighbours(single))
+
+    def test_publishing_prunes_versions_and_reloads_model(self):
+        arrays = collaborative.compute_item_similarity(self.users, self.articles, self.scores, neighbours=5)
+        with override_settings(RECOMMENDATIONS_MODEL_DIR=self.directory):
+            paths = [collaborative.save_model(arrays) for _ in range(collaborative.KEEP_VERSIONS + 2)]
+            self.assertEqual(len(set(paths)), len(paths))
+            self.assertEqual(
+                sorted(path.name for path in paths[-collaborative.KEEP_VERSIONS:]),
+                sorted(path.name for path in collaborative.model_dir().glob(f'{collaborative.VERSION_PREFIX}*')),
+            )
+
+            model = collaborative.get_model()
+            self.assertEqual(model.path, paths[-1])
+            self.assertIs(collaborative.get_model(), model)
+            latest = collaborative.save_model(arrays)
+            self.assertEqual(collaborative.get_model().path, latest)
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RecommendationViewSet
+from .views import RecommendationCacheStatsView, RecommendationViewSet, UserRecommendationsView
 
 router = DefaultRouter()
 router.register(r'', RecommendationViewSet, basename='recommendations')
 
 urlpatterns = [
+    path('user/', UserRecommendationsView.as_view(), name='user-recommendations'),
+    path('cache-stats/', RecommendationCacheStatsView.as_view(), name='recommendation-cache-stats'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
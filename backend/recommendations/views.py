@@ -1,85 +1,85 @@
+import logging
+
 from django.shortcuts import render
 from rest_framework import generics, permissions, viewsets
 from rest_framework.response import Response
-from django.core.cache import cache
-from django.db.models import Q, Avg, Count, Exists, OuterRef
+from rest_framework.views import APIView
+from articles.models import Article
+from blog_viaje.sparse import trim_queryset
 from .models import Recommendation
 from .serializers import RecommendationSerializer
-from articles.models import Article, Rating, Tag
-from users.models import Profile
-import random
+from .cache import cache_recommendations, cache_stats, get_cached_recommendations
+from .engine import MAX_RECOMMENDATIONS, generate_recommendations, popular_fallback
+from .tasks import enqueue_recommendation_refresh
+
+logger = logging.getLogger(__name__)
 
 class UserRecommendationsView(generics.ListAPIView):
+    """
+    Recomendaciones del usuario servidas desde cache. La cache solo guarda
+    tuplas (pk, article_id, score); los artículos se cargan en una consulta por lotes.
+    Se generan y guardan las mismas filas que en el resto de rutas
+    (MAX_RECOMMENDATIONS) y se recortan al leer.
+    """
     serializer_class = RecommendationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    recommendations_limit = MAX_RECOMMENDATIONS
     
     def get_queryset(self):
         user = self.request.user
         
-        # Verificamos si hay recomendaciones en cache
-        cache_key = f'recommendations_{user.id}'
-        queryset = cache.get(cache_key)
-        
-        if not queryset:
-            # Si no hay en cache, generamos las recomendaciones
-            queryset = self._generate_recommendations(user)
-            # Guardamos en cache por 1 hora
-            cache.set(cache_key, queryset, 60 * 60)
+        entry = get_cached_recommendations(user.id)
+        if entry is None:
+            # Si no hay en cache, generamos las recomendaciones y guardamos solo los ids
+            entry = cache_recommendations(user.id, self._generate_recommendations(user))
         
-        return queryset
+        return self._hydrate(user, entry)
     
     def _generate_recommendations(self, user):
         """
-        Algoritmo simple de recomendación:
-        1. Obtener los intereses del usuario
-        2. Encontrar artículos con esos tags
-        3. Ordenar por valoración media
-        4. Excluir artículos que el usuario ya ha valorado
-        5. Crear/actualizar registros de recomendación
+        Genera (y guarda) las recomendaciones con el motor de recomendaciones.
+        Devuelve las filas guardadas como tuplas (pk, article_id, score).
         """
         try:
-            # Obtener los intereses del usuario
-            user_profile = Profile.objects.get(user=user)
-            user_interests = user_profile.interests.all()
-            
-            # Artículos que el usuario ya ha valorado
-            rated_articles = Rating.objects.filter(user=user).values_list('article_id', flat=True)
-            
-            # Encontrar artículos con tags que coincidan con los intereses del usuario
-            recommended_articles = Article.objects.exclude(id__in=rated_articles)
-            
-            if user_interests:
-                recommended_articles = recommended_articles.filter(tags__in=user_interests)
-            
-            # Añadir información de valoración media y ordenar
-            recommended_articles = recommended_articles.annotate(
-                avg_rating=Avg('ratings__score'),
-                ratings_count=Count('ratings')
-            ).order_by('-avg_rating', '-ratings_count', '-created_at')
-            
-            # Limitar a 10 recomendaciones
-            recommended_articles = recommended_articles[:10]
-            
-            # Crear o actualizar las recomendaciones
-            recommendations = []
-            for idx, article in enumerate(recommended_articles):
-                # La puntuación es inversamente proporcional a la posición en la lista
-                score = 1.0 - (idx / len(recommended_articles)) if recommended_articles else 0
-                
-                # Actualizar o crear recomendación
-                recommendation, created = Recommendation.objects.update_or_create(
-                    user=user,
-                    article=article,
-                    defaults={'score': score}
-                )
-                
-                recommendations.append(recommendation)
-            
-            return recommendations
-            
-        except Exception as e:
-            print(f"Error generando recomendaciones: {e}")
-            return Recommendation.objects.filter(user=user)
+            generate_recommendations(user)
+        except Exception:
+            logger.exception('Error generando recomendaciones del usuario %s', user.id)
+        # Las filas nuevas no tienen pk hasta leerlas de la base de datos
+        return list(
+            Recommendation.objects.filter(user=user).order_by('-score').values_list(
+                'pk', 'article_id', 'score'
+            )
+        )
+    
+    def _hydrate(self, user, entry):
+        """
+        Construye las recomendaciones a partir de la entrada de cache cargando
+        todos los artículos (con autor, continente y tags) de una vez.
+        Los artículos eliminados desde que se generó la entrada se omiten.
+        """
+        rows = entry['rows'][:self.recommendations_limit]
+        queryset = trim_queryset(Article.objects.for_cards(), self.get_serializer().fields.get('article'))
+        articles = queryset.in_bulk([article_id for _, article_id, _ in rows])
+        return [
+            Recommendation(
+                pk=pk,
+                user=user,
+                article=articles[article_id],
+                score=score,
+                created_at=entry['generated_at'],
+            )
+            for pk, article_id, score in rows
+            if article_id in articles
+        ]
+
+class RecommendationCacheStatsView(APIView):
+    """
+    Contadores de aciertos y fallos de la cache de recomendaciones
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
 
 class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = RecommendationSerializer
@@ -88,96 +88,30 @@ class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """Obtener recomendaciones para el usuario autenticado."""
         user = self.request.user
-        return Recommendation.objects.filter(user=user).order_by('-score')
+        return Recommendation.objects.filter(user=user).with_articles().order_by('-score')
     
     def list(self, request):
         """
         Listar recomendaciones para el usuario. 
         Si no hay suficientes, genera algunas basadas en intereses.
+        Los artículos populares añadidos como relleno no están guardados: se
+        devuelven con id y created_at a null (el artículo no se repite).
         """
         user = request.user
-        queryset = self.get_queryset()
+        recommendations = list(self.get_queryset()[:MAX_RECOMMENDATIONS])
         
-        # Si no hay recomendaciones, crear algunas basadas en intereses
-        if queryset.count() < 4:
-            self._generate_recommendations(user)
-            queryset = self.get_queryset()
+        # Si no hay suficientes, se recalculan en segundo plano y mientras tanto
+        # se completa la respuesta con artículos populares
+        if len(recommendations) < MAX_RECOMMENDATIONS:
+            enqueue_recommendation_refresh(user.id)
+            recommendations += popular_fallback(
+                user,
+                MAX_RECOMMENDATIONS - len(recommendations),
+                skip_ids=[recommendation.article_id for recommendation in recommendations],
+            )
         
         # Serializar y devolver
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(recommendations, many=True)
         return Response({
             'results': serializer.data
         })
-    
-    def _generate_recommendations(self, user):
-        """Generar recomendaciones basadas en intereses o populares."""
-        # Limpiar recomendaciones existentes
-        Recommendation.objects.filter(user=user).delete()
-        
-        user_interests = []
-        try:
-            # Intentar obtener intereses del perfil del usuario
-            if hasattr(user, 'profile') and user.profile:
-                user_interests = list(user.profile.interests.all().values_list('id', flat=True))
-        except:
-            pass
-        
-        # Artículos ya vistos/valorados por el usuario (para no recomendarlos)
-        seen_articles = Article.objects.filter(
-            Q(ratings__user=user) | Q(author=user)
-        ).values_list('id', flat=True)
-        
-        # Obtener todos los artículos no vistos y anotar con valoraciones medias
-        articles_query = Article.objects.exclude(id__in=seen_articles).annotate(
-            avg_rating=Avg('ratings__score'),
-            ratings_count=Count('ratings')
-        )
-        
-        # Si hay intereses, priorizar artículos con esos tags
-        if user_interests:
-            articles_with_interest = articles_query.filter(
-                tags__id__in=user_interests
-            ).distinct()
-            
-            # Crear recomendaciones con puntajes altos para artículos con intereses
-            for article in articles_with_interest[:4]:
-                # Calcular score basado en cuántos tags coinciden con intereses
-                article_tags = article.tags.values_list('id', flat=True)
-                matching_tags = set(article_tags).intersection(set(user_interests))
-                score = 0.7 + (0.3 * len(matching_tags) / max(len(user_interests), 1))
-                
-                try:
-                    Recommendation.objects.update_or_create(
-                        user=user,
-                        article=article,
-                        defaults={'score': min(0.99, score)}  # Asegurar que no exceda 1.0
-                    )
-                except Exception as e:
-                    print(f"Error creando recomendación para {article.title}: {e}")
-        
-        # Si aún necesitamos más recomendaciones, agregar artículos populares
-        if Recommendation.objects.filter(user=user).count() < 4:
-            remaining_needed = 4 - Recommendation.objects.filter(user=user).count()
-            
-            # Excluir los ya recomendados
-            already_recommended = Recommendation.objects.filter(user=user).values_list('article_id', flat=True)
-            remaining_articles = articles_query.exclude(id__in=already_recommended)
-            
-            # Ordenar por popularidad (usando ratings como criterio)
-            popular_articles = remaining_articles.order_by('-avg_rating', '-ratings_count')[:remaining_needed * 2]
-            popular_articles = list(popular_articles)
-            
-            # Si hay suficientes, aleatorizar un poco para variedad
-            if len(popular_articles) > remaining_needed:
-                popular_articles = random.sample(popular_articles, remaining_needed)
-            
-            # Crear recomendaciones con puntajes menores para artículos populares
-            for i, article in enumerate(popular_articles):
-                try:
-                    Recommendation.objects.update_or_create(
-                        user=user,
-                        article=article,
-                        defaults={'score': 0.50 - (i * 0.05)}  # Descender de 0.50 a 0.35
-                    )
-                except Exception as e:
-                    print(f"Error creando recomendación para {article.title}: {e}")
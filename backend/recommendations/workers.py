@@ -0,0 +1,17 @@
+"""
+Inicialización de los procesos de cálculo de recomendaciones.
+
+Este módulo no importa modelos: se carga en cada proceso del pool antes de
+que Django esté preparado.
+"""
+import django
+from django.db import connections
+
+
+def init_worker():
+    """
+    Prepara Django en un proceso del pool (creado por el forkserver, no con
+    fork del proceso padre) y descarta las conexiones que haya.
+    """
+    django.setup()
+    connections.close_all()
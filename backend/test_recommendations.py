@@ -14,6 +14,7 @@ django.setup()
 from django.db.models import Avg
 from django.contrib.auth import get_user_model
 from articles.models import Article, Tag, Rating
+from recommendations.engine import generate_recommendations
 from recommendations.models import Recommendation
 from users.models import Profile
 
@@ -60,10 +61,8 @@ def test_recommendation_algorithm():
     # 4. Limpiar recomendaciones existentes
     Recommendation.objects.filter(user=user).delete()
     
-    # 5. Regenerar recomendaciones usando ProfileSerializer
-    from users.serializers import ProfileSerializer
-    serializer = ProfileSerializer()
-    serializer.regenerate_recommendations(user)
+    # 5. Regenerar recomendaciones con el motor de recomendaciones
+    generate_recommendations(user)
     
     # 6. Mostrar las recomendaciones generadas
     recommendations = Recommendation.objects.filter(user=user).order_by('-score')
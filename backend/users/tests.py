@@ -1,3 +1,39 @@
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from articles.models import Tag
+from .models import Profile, User
+
+
+class UpdateInterestsTests(TestCase):
+    """
+    Cambiar los intereses encola el recalculo de recomendaciones; guardar los
+    mismos no
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='lector@example.com', password='x')
+        cls.tags = [Tag.objects.create(name=f'Tag {i}', slug=f'tag-{i}') for i in range(3)]
+        Profile.objects.create(user=cls.user).interests.set(cls.tags[:2])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def put(self, tag_ids):
+        with mock.patch('recommendations.tasks.enqueue_recommendation_refresh') as enqueue:
+            response = self.client.put('/api/users/interests/', {'interest_ids': tag_ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), enqueue
+
+    def test_changed_interests_enqueue_refresh(self):
+        data, enqueue = self.put([self.tags[2].pk, 999])
+        self.assertEqual([tag['id'] for tag in data['interests']], [self.tags[2].pk])
+        enqueue.assert_called_once_with(self.user.pk)
 
-# Create your tests here.
+    def test_same_interests_do_not_enqueue(self):
+        _, enqueue = self.put([tag.pk for tag in self.tags[:2]])
+        enqueue.assert_not_called()
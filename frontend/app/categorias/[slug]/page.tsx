@@ -16,7 +16,8 @@ interface Article {
   id: number;
   title: string;
   slug: string;
-  content: string;
+  content?: string;
+  excerpt?: string;
   image: string | null;
   tags: Tag[];
   avg_rating: number | null;
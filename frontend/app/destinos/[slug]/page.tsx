@@ -38,7 +38,8 @@ interface RelatedArticle {
   id: number;
   title: string;
   slug: string;
-  content: string;
+  content?: string;
+  excerpt?: string;
   image: string | null;
   author: Author;
   tags: Tag[];
@@ -454,7 +455,7 @@ export default function DestinationPage() {
                     </h3>
                     
                     <p className="text-gray-600 mb-4 line-clamp-3 flex-grow">
-                      {getExcerpt(article.content, 120)}
+                      {getExcerpt(article.excerpt ?? article.content ?? '', 120)}
                     </p>
                     
                     <div className="flex justify-between items-center mt-auto pt-4 border-t border-gray-100">
@@ -23,7 +23,8 @@ interface Article {
   id: number;
   title: string;
   slug: string;
-  content: string;
+  content?: string;
+  excerpt?: string;
   image: string | null;
   author?: Author;
   tags: Tag[];
@@ -33,10 +34,11 @@ interface Article {
 }
 
 interface Recommendation {
-  id: number;
+  // null en los artículos populares que completan la lista mientras se recalculan
+  id: number | null;
   article: Article;
   score: number;
-  created_at: string;
+  created_at: string | null;
 }
 
 export default function RecommendationsPage() {
@@ -154,7 +156,7 @@ export default function RecommendationsPage() {
         ) : (
           <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
             {displayRecommendations.map(recommendation => (
-              <div key={recommendation.id} className="relative">
+              <div key={recommendation.article.id} className="relative">
                 <div className="absolute top-4 right-4 bg-yellow-400 text-gray-900 font-bold px-3 py-1 rounded-full z-10">
                   {Math.min(Math.round(recommendation.score * 100), 100)}% match
                 </div>
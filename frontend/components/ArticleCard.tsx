@@ -57,7 +57,8 @@ interface ArticleCardProps {
   id: number;
   title: string;
   slug: string;
-  content: string;
+  content?: string;
+  excerpt?: string;
   image?: string | null;
   tags: ArticleTag[];
   author?: ArticleAuthor;
@@ -72,6 +73,7 @@ const ArticleCard = ({
   title,
   slug,
   content,
+  excerpt: precomputedExcerpt,
   image,
   tags,
   author,
@@ -90,8 +92,9 @@ const ArticleCard = ({
     year: 'numeric'
   });
 
-  // Obtener un extracto del contenido limpiando el HTML
-  const cleanText = typeof window !== 'undefined' ? stripHtml(content) : content.replace(/<[^>]*>/g, '');
+  // Los listados envían el extracto ya calculado; si no, se obtiene del contenido limpiando el HTML
+  const cleanText = precomputedExcerpt
+    ?? (typeof window !== 'undefined' ? stripHtml(content ?? '') : (content ?? '').replace(/<[^>]*>/g, ''));
   const excerpt = cleanText.length > 150 
     ? cleanText.substring(0, 150) + '...' 
     : cleanText;